@@ -1,30 +1,11 @@
 import streamlit as st
 import os
-import base64
 import json
 from datetime import datetime
 from utility_function.initilize_dbconnection import supabase
+from utility_function.static_media import get_poster_urls, get_pdf_documents, get_pdf_page_count, get_pdf_preview_url
+from utility_function.rule_search import search_rules
 import pandas as pd
-def load_images_as_dataurls(folder):
-    dataurls = []
-    if not os.path.exists(folder):
-        return dataurls
-    for fn in sorted(os.listdir(folder)):
-        if fn.lower().endswith(('.png', '.jpg', '.jpeg', '.gif', '.webp')):
-            path = os.path.join(folder, fn)
-            with open(path, "rb") as f:
-                b = f.read()
-                mime = "image/png"
-                if fn.lower().endswith(".jpg") or fn.lower().endswith(".jpeg"):
-                    mime = "image/jpeg"
-                elif fn.lower().endswith(".gif"):
-                    mime = "image/gif"
-                elif fn.lower().endswith(".webp"):
-                    mime = "image/webp"
-                data = base64.b64encode(b).decode("utf-8")
-                dataurls.append(f"data:{mime};base64,{data}")
-    return dataurls
-
 
 def main():
     st.set_page_config(page_title="Archery Management System", layout="wide")
@@ -60,12 +41,13 @@ def main():
     # -----------------------
     st.subheader("📸 Upcoming Archery Events")
 
-    poster_folder = os.path.join(os.path.dirname(__file__), "posters")
-    pos = load_images_as_dataurls(poster_folder)
+    # Resized posters and thumbnails are served as static files and referenced by URL
+    posters = get_poster_urls()
 
-    if pos:
+    if posters:
         interval_ms = 7000
-        images_json = json.dumps(pos)
+        images_json = json.dumps([p["url"] for p in posters])
+        thumbs_json = json.dumps([p["thumbnail_url"] for p in posters])
         html = f"""
         <style>
         .carousel-wrapper {{
@@ -109,19 +91,21 @@ def main():
         </style>
 
         <div id="carousel" class="carousel-wrapper">
-            <img id="carousel-main" class="carousel-main" src="{pos[0]}">
+            <img id="carousel-main" class="carousel-main" src="{posters[0]['url']}">
         </div>
         <div id="thumbs" class="thumbs"></div>
 
         <script>
         const images = {images_json};
+        const thumbImages = {thumbs_json};
         let idx = 0;
         const main = document.getElementById("carousel-main");
         const thumbs = document.getElementById("thumbs");
 
         images.forEach((src, i) => {{
             const t = document.createElement("img");
-            t.src = src;
+            t.src = thumbImages[i];
+            t.loading = "lazy";
             t.dataset.index = i;
             if(i===0) t.classList.add("active");
             t.onclick = () => {{
@@ -208,31 +192,55 @@ def main():
     # -----------------------
     st.subheader("📘 Further Information and Documentation")
 
-    pdf_folder = os.path.join(os.path.dirname(__file__), "pdfs")
-    if not os.path.exists(pdf_folder):
+    # PDFs are served as static files; nothing is read until a viewer is opened
+    pdf_documents = get_pdf_documents()
+    if not os.path.exists(os.path.join(os.path.dirname(__file__), "pdfs")):
         st.warning("⚠️ 'pdfs' folder not found.")
+    elif not pdf_documents:
+        st.warning("⚠️ No PDF files found in the 'pdfs' folder.")
     else:
-        pdf_files = [f for f in sorted(os.listdir(pdf_folder)) if f.lower().endswith(".pdf")]
-        if not pdf_files:
-            st.warning("⚠️ No PDF files found in the 'pdfs' folder.")
-        else:
-            for pdf in pdf_files:
-                pdf_path = os.path.join(pdf_folder, pdf)
-                with st.expander(f"📄 {pdf}"):
-                    with open(pdf_path, "rb") as f:
-                        pdf_bytes = f.read()
-                        b64 = base64.b64encode(pdf_bytes).decode("utf-8")
-
-                    st.download_button(
-                        label="⬇️ Download PDF",
-                        data=pdf_bytes,
-                        file_name=pdf,
-                        mime="application/pdf"
-                    )
-
+        rule_query = st.text_input("🔍 Search the AA Rules", placeholder="e.g. arrow touching line, shoot-off, 4.2.1")
+        if rule_query.strip():
+            with st.spinner("Searching rules..."):
+                rule_results = search_rules(rule_query)
+            if not rule_results:
+                st.caption("No matching rules found.")
+            pdf_urls = {doc["name"]: doc["url"] for doc in pdf_documents}
+            for result in rule_results:
+                st.markdown(
+                    f'**[{result["document"]} — page {result["page"]}]({pdf_urls.get(result["document"], "")}#page={result["page"]})**  \n{result["snippet"]}'
+                )
+
+        for i, doc in enumerate(pdf_documents):
+            with st.expander(f"📄 {doc['name']}"):
+                st.markdown(
+                    f'<a href="{doc["url"]}" download="{doc["name"]}">⬇️ Download PDF</a> ({doc["size"] / 1024 / 1024:.1f} MB)',
+                    unsafe_allow_html=True
+                )
+
+                view = st.radio(
+                    "Viewer",
+                    ["Closed", "Page range", "Whole document"],
+                    horizontal=True,
+                    key=f"pdf_view_{i}"
+                )
+
+                pdf_url = None
+                if view == "Page range":
+                    page_count = get_pdf_page_count(doc)
+                    col1, col2 = st.columns(2)
+                    with col1:
+                        first_page = st.number_input("From page", min_value=1, max_value=page_count, value=1, key=f"pdf_first_{i}")
+                    with col2:
+                        last_page = st.number_input("To page", min_value=1, max_value=page_count, value=min(5, page_count), key=f"pdf_last_{i}")
+                    pdf_url = get_pdf_preview_url(doc, first_page, max(first_page, last_page))
+                elif view == "Whole document":
+                    pdf_url = doc["url"]
+
+                if pdf_url:
                     st.markdown(
                         f"""
-                        <iframe src="data:application/pdf;base64,{b64}" width="100%" height="800" style="border:none;"></iframe>
+                        <iframe src="{pdf_url}" width="100%" height="800" style="border:none;"></iframe>
                         """,
                         unsafe_allow_html=True
                     )
@@ -1,12 +1,18 @@
 import streamlit as st
 import pandas as pd
-from utility_function.initilize_dbconnection import supabase
+from utility_function.initilize_dbconnection import supabase, get_pool_stats
 from utility_function.admin_utility import (
     get_total_accounts, get_deactivated_accounts_count, get_accounts_by_role,
     filter_accounts, search_account_by_email, update_account,
     get_pending_reports, update_report_status, delete_report
 )
 from utility_function.sign_up_log_in_utility import get_countries
+from utility_function.reference_cache import get_cache_stats, invalidate
+from utility_function import score_cube
+from utility_function.category_percentile import refresh_percentiles
+from utility_function.chatbot_utility import get_chat_stats
+from utility_function.response_cache import get_response_cache_stats, clear_response_cache
+from utility_function.chatbot_router import get_router_stats
 from datetime import date
 
 # Check if user is logged in and is an admin
@@ -68,6 +74,114 @@ with tab1:
         if total_accounts > 0:
             inactive_percentage = (deactivated_accounts / total_accounts) * 100
             st.metric("Inactive Percentage", f"{inactive_percentage:.1f}%")
+    
+    # Reference data cache statistics
+    st.divider()
+    st.subheader("Reference Data Cache")
+    cache_stats = get_cache_stats()
+    total_hits = sum(s['hits'] for s in cache_stats.values())
+    total_misses = sum(s['misses'] for s in cache_stats.values())
+    
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        st.metric("Cache Hits", total_hits)
+    with col2:
+        st.metric("Cache Misses", total_misses)
+    with col3:
+        if total_hits + total_misses > 0:
+            st.metric("Hit Rate", f"{total_hits / (total_hits + total_misses) * 100:.1f}%")
+    
+    st.dataframe(pd.DataFrame.from_dict(cache_stats, orient='index'), use_container_width=True)
+    if st.button("🔄 Clear Reference Cache"):
+        invalidate()
+        st.rerun()
+    
+    # Performance score cube statistics
+    st.divider()
+    st.subheader("Performance Score Cubes")
+    cube_stats = score_cube.get_cube_stats()
+    
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        st.metric("Cube Hits", cube_stats['hits'])
+    with col2:
+        st.metric("Cube Misses", cube_stats['misses'])
+    with col3:
+        st.metric("Cached Memory", f"{sum(c['bytes'] for c in cube_stats['cubes']) / 1024:.1f} KB")
+    
+    if cube_stats['cubes']:
+        st.dataframe(pd.DataFrame(cube_stats['cubes']), use_container_width=True, hide_index=True)
+    if st.button("🔄 Clear Score Cubes"):
+        score_cube.invalidate()
+        st.rerun()
+    
+    # Category rating percentiles (normally refreshed incrementally from changed scores)
+    st.divider()
+    st.subheader("Category Rating Percentiles")
+    st.caption("Percentiles are recomputed automatically for categories with new or changed scores. Run a full recompute after deleting scores.")
+    if st.button("🔄 Recompute All Percentiles"):
+        recomputed = refresh_percentiles(full=True)
+        st.success(f"Recomputed percentiles for {len(recomputed)} categories")
+    
+    # Chatbot latency (time to first streamed token)
+    st.divider()
+    st.subheader("Chatbot Queue and Latency")
+    chat_stats = get_chat_stats()
+    
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        st.metric("Replies", chat_stats['replies_total'])
+        st.metric("Errors", chat_stats['errors_total'])
+    with col2:
+        st.metric("Avg First Token", f"{chat_stats['avg_first_token_seconds'] or 0:.2f}s")
+        st.metric("P95 First Token", f"{chat_stats['p95_first_token_seconds'] or 0:.2f}s")
+    with col3:
+        st.metric("P50 First Token", f"{chat_stats['p50_first_token_seconds'] or 0:.2f}s")
+        st.metric("Avg Full Reply", f"{chat_stats['avg_reply_seconds'] or 0:.2f}s")
+    st.caption(
+        f"Backend: {chat_stats['backend']} · Model: {chat_stats['model']} · "
+        f"Workers busy: {chat_stats['running']} / {chat_stats['max_concurrency']} · "
+        f"Queued: {chat_stats['queue_depth']} (peak {chat_stats['peak_queue_depth']}, max {chat_stats['max_queue']}) · "
+        f"Timeouts: {chat_stats['timeouts_total']} · Rejected: {chat_stats['rejected_total']} · "
+        f"Summaries pending: {chat_stats['summaries_pending']} (skipped {chat_stats['summaries_skipped']})"
+    )
+    
+    # Cached chatbot replies (answered without calling the model)
+    response_cache_stats = get_response_cache_stats()
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        st.metric("Cached Replies", f"{response_cache_stats['entries']} / {response_cache_stats['max_entries']}")
+    with col2:
+        st.metric("Cache Hit Rate", f"{(response_cache_stats['hit_rate'] or 0) * 100:.1f}%")
+    with col3:
+        st.metric("Cache Size", f"{response_cache_stats['bytes'] / 1024:.1f} KB")
+    st.caption(f"Hits: {response_cache_stats['hits']} (similar questions: {response_cache_stats['similar_hits']}) · Misses: {response_cache_stats['misses']}")
+    router_stats = get_router_stats()
+    st.caption(
+        "Answered from app data without the model: "
+        + (", ".join(f"{intent.replace('_', ' ')} {count}" for intent, count in router_stats['routed'].items()) or "none yet")
+        + f" · Sent to the model: {router_stats['passed_to_model']}"
+    )
+    if st.button("🔄 Clear Chatbot Response Cache"):
+        clear_response_cache()
+        st.rerun()
+    
+    # Supabase HTTP connection pool statistics
+    st.divider()
+    st.subheader("Database Connection Pool")
+    pool_stats = get_pool_stats()
+    
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        st.metric("In-flight Requests", f"{pool_stats['in_flight']} / {pool_stats['max_connections']}")
+        st.metric("Peak In-flight", pool_stats['peak_in_flight'])
+    with col2:
+        st.metric("Saturation", f"{pool_stats['saturation'] * 100:.1f}%")
+        st.metric("Peak Saturation", f"{pool_stats['peak_saturation'] * 100:.1f}%")
+    with col3:
+        st.metric("Pool Timeouts", pool_stats['pool_timeouts'])
+        st.metric("Request Errors", pool_stats['errors_total'])
+    st.caption(f"Total requests: {pool_stats['requests_total']} · Avg request time: {pool_stats['avg_request_seconds'] or 0:.3f}s · HTTP/2: {'on' if pool_stats['http2'] else 'off'}")
 
 with tab2:
     st.header("Browse Accounts")
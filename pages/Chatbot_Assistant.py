@@ -1,29 +1,12 @@
-import os
 from datetime import datetime
 import streamlit as st
-from dotenv import load_dotenv
-import google.generativeai as genai
 from utility_function.initilize_dbconnection import supabase
-
-# --- Load API key ---
-load_dotenv()
-google_api_key = os.getenv("GOOGLE_API_KEY")
-genai.configure(api_key=google_api_key)
-
-# --- Khởi tạo model Gemini ---
-model = genai.GenerativeModel(
-    "gemini-2.0-flash-lite",
-    system_instruction="""You are a chatbot assistant for an archery management system.
-
-Your goals:
-1. Automatically detect the user's language (English or Vietnamese).
-2. Respond in the same language as the user.
-3. Restrict your knowledge and conversation scope strictly to topics related to archery — 
-   including techniques, equipment, rules, training, event organization, and system management.
-4. If the user asks a question unrelated to archery, respond:
-   - English: "Sorry, I only assist with archery-related topics."
-   - Vietnamese: "Xin lỗi, tôi chỉ hỗ trợ các vấn đề liên quan đến bắn cung."""
+from utility_function.chatbot_utility import (
+    stream_reply, get_model_name, build_context,
+    get_rolling_summary, refresh_rolling_summary, delete_rolling_summary
 )
+from utility_function.response_cache import lookup_response, store_response
+from utility_function.chatbot_router import route_question
 
 # --- Cấu hình giao diện ---
 st.set_page_config(page_title="Archery Chatbot", page_icon="🏹")
@@ -39,14 +22,15 @@ user_id = st.session_state["user_id"]
 # --- Sidebar: Chat sessions ---
 st.sidebar.header("💬 Chat Sessions")
 
-# Lấy danh sách hội thoại từ DB
-conversations = supabase.table("ai_conversation_history") \
-    .select("conversation_order") \
+# Lấy danh sách hội thoại từ DB (một dòng cho mỗi hội thoại, cập nhật bởi trigger khi lưu tin nhắn)
+conversations = supabase.table("ai_conversation") \
+    .select("conversation_order, title, message_count, last_activity_at, next_prompt_response_order") \
     .eq("account_id", user_id) \
-    .execute()
+    .order("conversation_order", desc=False) \
+    .execute().data or []
 
-# Trích xuất danh sách chat unique
-chat_ids = sorted(list({c["conversation_order"] for c in conversations.data})) if conversations.data else []
+conversation_by_id = {c["conversation_order"]: c for c in conversations}
+chat_ids = list(conversation_by_id)
 
 # Session state giữ chat hiện tại
 if "current_chat" not in st.session_state:
@@ -61,18 +45,24 @@ if st.sidebar.button("➕ New Chat"):
 
 # --- Danh sách chat trong sidebar ---
 for cid in chat_ids:
+    conversation = conversation_by_id[cid]
     col1, col2 = st.sidebar.columns([4, 1])
-    if col1.button(f"Chat {cid}", key=f"select_{cid}"):
+    if col1.button(
+        conversation["title"] or f"Chat {cid}",
+        key=f"select_{cid}",
+        help=f"Chat {cid} · {conversation['message_count']} message{'s' if conversation['message_count'] != 1 else ''} · last active {str(conversation['last_activity_at'])[:16].replace('T', ' ')}"
+    ):
         st.session_state.current_chat = cid
         st.rerun()
 
     if col2.button("🗑", key=f"delete_{cid}"):
-        # Xóa toàn bộ conversation khỏi DB
+        # Xóa toàn bộ conversation khỏi DB (trigger xóa luôn dòng ai_conversation)
         supabase.table("ai_conversation_history") \
             .delete() \
             .eq("account_id", user_id) \
             .eq("conversation_order", cid) \
             .execute()
+        delete_rolling_summary(user_id, cid)
 
         # Xóa khỏi session state
         st.session_state.conversations = [
@@ -97,39 +87,92 @@ if st.session_state.current_chat:
         .order("prompt_response_order", desc=False) \
         .execute().data or []
 
+    # Câu trả lời lấy từ cache trong phiên này: (chat_id, prompt_response_order) -> ghi chú
+    cached_replies = st.session_state.setdefault("cached_replies", {})
+
     # Hiển thị tin nhắn cũ
     for msg in messages:
         with st.chat_message("user"):
             st.markdown(msg["prompt"])
         with st.chat_message("assistant"):
             st.markdown(msg["response"])
+            cache_note = cached_replies.get((chat_id, msg["prompt_response_order"]))
+            if cache_note:
+                st.caption(cache_note)
 
     # Nhập câu hỏi mới
     user_input = st.chat_input("Enter your question...")
     if user_input:
         st.chat_message("user").markdown(user_input)
 
-        # Gọi model Gemini
-        response = model.generate_content(user_input)
-        bot_reply = response.text.strip()
+        # Xác định thứ tự tin nhắn tiếp theo
+        next_order = conversation_by_id[chat_id]["next_prompt_response_order"] if chat_id in conversation_by_id else 1
+
+        # Câu hỏi về dữ liệu (điểm, lịch thi đấu, giải đã tham gia) được trả lời trực tiếp, không gọi model
+        routed = route_question(user_input, user_id)
+
+        # Câu hỏi lặp lại (hoặc gần giống) được trả lời từ cache, không gọi model.
+        # Chỉ dùng cache cho câu hỏi đầu tiên: câu sau phụ thuộc vào ngữ cảnh hội thoại.
+        model_name = get_model_name()
+        cached = lookup_response(user_input, model_name) if not messages and not routed else None
+
+        # Ngữ cảnh: tóm tắt các lượt cũ + các lượt gần nhất vừa với ngân sách token
+        summary = get_rolling_summary(user_id, chat_id) if messages else None
+        context = build_context(messages, user_input, summary)
 
-        # Hiển thị phản hồi chatbot
         with st.chat_message("assistant"):
-            st.markdown(bot_reply)
+            if routed:
+                bot_reply = routed["answer"]
+                st.markdown(bot_reply)
+                cache_note = "📊 Answered from your Archery Management System data"
+                cached_replies[(chat_id, next_order)] = cache_note
+                st.caption(cache_note)
+            elif cached:
+                bot_reply = cached["response"]
+                st.markdown(bot_reply)
+                # Cache dùng chung cho mọi người dùng: không hiển thị câu hỏi gốc đã lưu
+                if cached["match"] == "exact":
+                    cache_note = "⚡ Cached answer"
+                else:
+                    cache_note = "⚡ Cached answer to a similar question"
+                cached_replies[(chat_id, next_order)] = cache_note
+                st.caption(cache_note)
+            else:
+                # Hiển thị phản hồi chatbot trong lúc model đang sinh
+                placeholder = st.empty()
+                bot_reply = ""
+
+                def show_queue_position(position):
+                    placeholder.markdown(f"⏳ Queued, position {position} — the assistant is answering other questions...")
+
+                try:
+                    for chunk in stream_reply(user_input, on_queued=show_queue_position, context=context):
+                        bot_reply += chunk
+                        placeholder.markdown(bot_reply + "▌")
+                except Exception as e:
+                    # Không lưu câu trả lời dở dang
+                    placeholder.error(f"⚠️ The assistant could not answer right now: {e}")
+                    st.stop()
+                bot_reply = bot_reply.strip()
+                placeholder.markdown(bot_reply)
+                if not messages:
+                    store_response(user_input, model_name, bot_reply)
 
-        # Xác định thứ tự tin nhắn tiếp theo
-        next_order = (max([m["prompt_response_order"] for m in messages], default=0)) + 1
         now = datetime.utcnow().isoformat()
 
-        # Ghi vào DB
-        supabase.table("ai_conversation_history").insert({
+        # Ghi vào DB sau khi đã nhận đủ câu trả lời
+        new_message = {
             "account_id": user_id,
             "conversation_order": chat_id,
             "prompt_response_order": next_order,
             "prompt": user_input,
             "response": bot_reply,
             "created_at": now
-        }).execute()
+        }
+        supabase.table("ai_conversation_history").insert(new_message).execute()
+
+        # Tóm tắt các lượt cũ (chạy nền, không làm chậm câu trả lời)
+        refresh_rolling_summary(user_id, chat_id, messages + [new_message], summary)
 
         st.rerun()
 
@@ -3,6 +3,8 @@ import pandas as pd
 import uuid
 from datetime import date
 from utility_function.initilize_dbconnection import supabase
+from utility_function.batch_loader import load_many
+from utility_function.reference_cache import invalidate
 from utility_function.club_utility import (
     get_all_clubs, get_club_by_id, get_archer_club, create_club,
     join_club, get_club_members, get_pending_enrollment_forms,
@@ -298,6 +300,7 @@ if user_role == 'archer':
                                 }).eq("club_id", my_club['club_id']).execute()
                                 
                                 if response.data:
+                                    invalidate("club")
                                     st.success("✅ Club settings updated successfully!")
                                     st.rerun()
                                 else:
@@ -376,17 +379,22 @@ if user_role == 'archer':
                     pending_forms = pd.DataFrame()
                     other_forms = pd.DataFrame()
                 
+                # Fetch all applicant accounts in one query instead of one per form
+                applicants = load_many(
+                    "account", "account_id",
+                    all_enrollment_forms['sender_id'].tolist() if not all_enrollment_forms.empty else [],
+                    "fullname, email_address, avatar_url"
+                )
+                
                 # Display pending forms
                 if not pending_forms.empty:
                     st.success(f"Found {len(pending_forms)} pending enrollment request(s)")
                     
                     for idx, form in pending_forms.iterrows():
                         # Get applicant information
-                        applicant = supabase.table("account").select("fullname, email_address, avatar_url").eq("account_id", form['sender_id']).execute()
+                        applicant_info = applicants.get(form['sender_id'])
                         
-                        if applicant.data:
-                            applicant_info = applicant.data[0]
-                            
+                        if applicant_info:
                             with st.expander(f"📝 Request from {applicant_info['fullname']}"):
                                 col1, col2 = st.columns([1, 3])
                                 
@@ -452,11 +460,9 @@ if user_role == 'archer':
                     
                     for idx, form in other_forms.iterrows():
                         # Get applicant information
-                        applicant = supabase.table("account").select("fullname, email_address, avatar_url").eq("account_id", form['sender_id']).execute()
+                        applicant_info = applicants.get(form['sender_id'])
                         
-                        if applicant.data:
-                            applicant_info = applicant.data[0]
-                            
+                        if applicant_info:
                             with st.expander(f"📝 {applicant_info['fullname']} - Status: {form['status']}"):
                                 col1, col2 = st.columns([1, 3])
                                 
@@ -7,6 +7,7 @@ from datetime import datetime, date
 import time
 from utility_function.initilize_dbconnection import supabase
 import utility_function.event_utility as event_utility
+from utility_function.reference_cache import get_table
 
 # Check if user is logged in
 if not st.session_state.get('logged_in', False):
@@ -90,6 +91,7 @@ with tab_browse:
                 eligible_group_id = None # None means all eligible groups
         elif event_type == "club competition":
             date_start = st.date_input("Start Date (From)", value=None, help="choose the start date to filter competitions starting from this date or after this date")
+            date_end = st.date_input("Start Date (To)", value=None, help="choose the date to filter competitions starting on this date or before this date")
             category_map = event_utility.get_category_map()
             category_name = st.selectbox("Category", ["All"] + list(category_map.keys()))
             if category_name != "All":
@@ -140,113 +142,40 @@ with tab_browse:
     
     apply_filter_btn = st.button("🔍 Apply Filters", type="primary", use_container_width=True, disabled=disable_apply, key="apply_filters_events")
     if apply_filter_btn:
+        # Remember the filters so result pages can be browsed on later reruns
+        st.session_state["event_search_filters"] = {
+            "event_type": event_type,
+            "year": year,
+            "date_start": date_start,
+            "date_end": date_end,
+            "category_id": category_id,
+            "eligible_group_id": eligible_group_id,
+        }
+        st.session_state["event_search_page"] = 1
+    
+    event_search_filters = st.session_state.get("event_search_filters")
+    if event_search_filters and event_search_filters["event_type"] == event_type:
         with st.spinner("Fetching events..."):
-            if event_type == "yearly club championship":
-                #apply filter for year, category_id, eligible_group_id by supabase query
-                #for filtering based on category_id, we need to explore event_context table:
-                #particularly, fisrtly we need to exclude rows with "yearly_club_championship_id" == NULL
-                #then only keep rows where round_id is in round table where category_id == selected category_id
-                yearly_championships_df = supabase.table("yearly_club_championship").select("*").eq("year", year).execute().data
-                yearly_championships_df = pd.DataFrame(yearly_championships_df)
-                if not yearly_championships_df.empty:
-                    # Only filter by category if a specific category is selected
-                    if category_id is not None:
-                        event_contexts = supabase.table("event_context").select("yearly_club_championship_id, round_id").not_.is_("yearly_club_championship_id", "null").execute().data
-                        event_contexts_df = pd.DataFrame(event_contexts)
-                        
-                        rounds = supabase.table("round").select("round_id").eq("category_id", category_id).execute().data
-                        rounds_df = pd.DataFrame(rounds)
-                        
-                        # Only filter if we have data
-                        if not event_contexts_df.empty and not rounds_df.empty:
-                            filtered_event_contexts = event_contexts_df[event_contexts_df['round_id'].isin(rounds_df['round_id'])]
-                            if not filtered_event_contexts.empty:
-                                valid_championship_ids = filtered_event_contexts['yearly_club_championship_id'].unique().tolist()
-                                yearly_championships_df = yearly_championships_df[yearly_championships_df['yearly_club_championship_id'].isin(valid_championship_ids)]
-                            else:
-                                # No matching championships for this category
-                                yearly_championships_df = pd.DataFrame()
-                        else:
-                            # No rounds or event contexts found
-                            yearly_championships_df = pd.DataFrame()
-                    
-                    # Filter by eligible group if specified
-                    if eligible_group_id is not None and not yearly_championships_df.empty:
-                        yearly_championships_df = yearly_championships_df[yearly_championships_df['eligible_group_of_club_id'] == eligible_group_id]
-                    
-                    # Save to session state
-                    st.session_state["yearly_championships_df"] = yearly_championships_df
-                else:
-                    st.session_state["yearly_championships_df"] = pd.DataFrame()
-                
-                # Display the results
-                if not st.session_state.get("yearly_championships_df", pd.DataFrame()).empty:
-                    st.dataframe(st.session_state["yearly_championships_df"], use_container_width=True)
-                else:
-                    st.info("No yearly club championships found matching the filters.")
-                    
-            elif event_type == "club competition":
-                #apply filter for date range, category_id, eligible_group_id by supabase query
-                # First, get club competitions that are NOT linked to any yearly club championship
-                event_contexts = supabase.table("event_context").select("club_competition_id, yearly_club_championship_id").not_.is_("club_competition_id", "null").execute().data
-                event_contexts_df = pd.DataFrame(event_contexts)
-                
-                # Find competition IDs that have null yearly_club_championship_id
-                if not event_contexts_df.empty:
-                    standalone_competition_ids = event_contexts_df[event_contexts_df['yearly_club_championship_id'].isna()]['club_competition_id'].unique().tolist()
-                else:
-                    standalone_competition_ids = []
-                
-                # Get club competitions data
-                club_competitions_df = supabase.table("club_competition").select("*").execute().data
-                club_competitions_df = pd.DataFrame(club_competitions_df)
-                
-                if not club_competitions_df.empty:
-                    # Filter to only include standalone competitions (not part of any championship)
-                    if standalone_competition_ids:
-                        club_competitions_df = club_competitions_df[club_competitions_df['club_competition_id'].isin(standalone_competition_ids)]
-                    else:
-                        # No standalone competitions found
-                        club_competitions_df = pd.DataFrame()
-                    
-                    if not club_competitions_df.empty and date_start:
-                        club_competitions_df = club_competitions_df[pd.to_datetime(club_competitions_df['date_start']) >= pd.to_datetime(date_start)]
-
-                    
-                    # Only filter by category if a specific category is selected
-                    if category_id is not None and not club_competitions_df.empty:
-                        event_contexts = supabase.table("event_context").select("club_competition_id, round_id").not_.is_("club_competition_id", "null").execute().data
-                        event_contexts_df = pd.DataFrame(event_contexts)
-                        rounds = supabase.table("round").select("round_id").eq("category_id", category_id).execute().data
-                        rounds_df = pd.DataFrame(rounds)
-                        
-                        # Only filter if we have data
-                        if not event_contexts_df.empty and not rounds_df.empty:
-                            filtered_event_contexts = event_contexts_df[event_contexts_df['round_id'].isin(rounds_df['round_id'])]
-                            if not filtered_event_contexts.empty:
-                                valid_competition_ids = filtered_event_contexts['club_competition_id'].unique().tolist()
-                                club_competitions_df = club_competitions_df[club_competitions_df['club_competition_id'].isin(valid_competition_ids)]
-                            else:
-                                # No matching competitions for this category
-                                club_competitions_df = pd.DataFrame()
-                        else:
-                            # No rounds or event contexts found
-                            club_competitions_df = pd.DataFrame()
-                    
-                    # Filter by eligible group if specified
-                    if eligible_group_id is not None and not club_competitions_df.empty:
-                        club_competitions_df = club_competitions_df[club_competitions_df['eligible_group_of_club_id'] == eligible_group_id]
-                    
-                    # Save to session state
-                    st.session_state["club_competitions_df"] = club_competitions_df
-                else:
-                    st.session_state["club_competitions_df"] = pd.DataFrame()
-                
-                # Display the results
-                if not st.session_state.get("club_competitions_df", pd.DataFrame()).empty:
-                    st.dataframe(st.session_state["club_competitions_df"], use_container_width=True)
-                else:
-                    st.info("No club competitions found matching the filters.")
+            # Filtering, category matching and paging all happen in the search RPC
+            events_df, total_events = event_utility.search_events(
+                **event_search_filters, page=st.session_state.get("event_search_page", 1)
+            )
+        
+        if event_type == "yearly club championship":
+            st.session_state["yearly_championships_df"] = events_df
+        else:
+            st.session_state["club_competitions_df"] = events_df
+        
+        # Display the results
+        if not events_df.empty:
+            st.dataframe(events_df, use_container_width=True)
+            total_pages = -(-total_events // event_utility.EVENT_SEARCH_PAGE_SIZE)
+            if total_pages > 1:
+                st.number_input(f"Page (of {total_pages}, {total_events} events)", min_value=1, max_value=total_pages, key="event_search_page")
+        elif event_type == "yearly club championship":
+            st.info("No yearly club championships found matching the filters.")
+        else:
+            st.info("No club competitions found matching the filters.")
 
 
     # Section 3: Event Hierarchy Visualization
@@ -286,46 +215,70 @@ with tab_browse:
     visualize_btn = st.button("🎨 Show Hierarchy", type="primary", key="visualize_hierarchy")
     
     if visualize_btn:
+        # Remember the event so drilling into a round keeps the chart on later reruns
+        st.session_state["hierarchy_event"] = (hierarchy_event_type, hierarchy_event_id)
+        st.session_state.pop("hierarchy_expanded_round", None)
+    
+    if st.session_state.get("hierarchy_event") == (hierarchy_event_type, hierarchy_event_id):
         with st.spinner("Building hierarchy visualization..."):
-            # Get hierarchy data using utility function
-            hierarchy_df = event_utility.get_event_hierarchy_for_icicle(
+            # Overview down to round level; ranges and ends are only added for the round picked below
+            overview_df = event_utility.get_event_hierarchy_level_of_detail(
                 event_type=hierarchy_event_type,
                 event_id=hierarchy_event_id
             )
+        
+        if not overview_df.empty:
+            node_labels = overview_df.set_index('ids')['labels']
+            round_rows = overview_df[overview_df['ids'].str.startswith('round_')]
+            round_options = {f"{row.labels} ({node_labels.get(row.parents, '')})": row.ids for row in round_rows.itertuples()}
+            expanded_round = st.selectbox(
+                "🔎 Drill into Round",
+                options=["None"] + list(round_options.keys()),
+                key="hierarchy_expanded_round",
+                help="Load the ranges of one round; its ends are summarized as counts"
+            )
             
-            if not hierarchy_df.empty:
-                # Create icicle chart using graph_objects for better control
-                fig = go.Figure()
-                
-                fig.add_trace(go.Icicle(
-                    ids=hierarchy_df['ids'],
-                    labels=hierarchy_df['labels'],
-                    parents=hierarchy_df['parents'],
-                    customdata=hierarchy_df[['hover_info']] if 'hover_info' in hierarchy_df.columns else None,
-                    hovertemplate='<b>%{label}</b><br>%{customdata[0]}<extra></extra>' if 'hover_info' in hierarchy_df.columns else '<b>%{label}</b><extra></extra>',
-                    textinfo="label",  # Only show label, no percentages
-                    textposition="middle center",  # Center text in boxes
-                    root_color="lightblue",
-                    tiling=dict(
-                        orientation='h'  # Horizontal orientation (children span parent height)
-                    ),
-                    textfont=dict(size=16)  # Bigger font size
-                ))
-                
-                fig.update_layout(
-                    title=f"Event Hierarchy: {event_name}",
-                    margin=dict(t=80, l=25, r=25, b=25),
-                    height=700,
-                    font=dict(size=14)
+            if expanded_round != "None":
+                hierarchy_df = event_utility.get_event_hierarchy_level_of_detail(
+                    event_type=hierarchy_event_type,
+                    event_id=hierarchy_event_id,
+                    expanded_round_node_id=round_options[expanded_round]
                 )
-                
-                st.plotly_chart(fig, use_container_width=True)
-                
-                # Add instructions
-                st.info("💡 **Interactive Chart**: Click on any block to zoom in and explore deeper levels. Click on the parent (top bar) to zoom out. Hover over blocks to see more information. The deepest children are always **End**.")
-                
             else:
-                st.warning("No hierarchy data found for this event. The event may not have any rounds or competitions configured.")
+                hierarchy_df = overview_df
+            
+            # Create icicle chart using graph_objects for better control
+            fig = go.Figure()
+            
+            fig.add_trace(go.Icicle(
+                ids=hierarchy_df['ids'],
+                labels=hierarchy_df['labels'],
+                parents=hierarchy_df['parents'],
+                customdata=hierarchy_df[['hover_info']] if 'hover_info' in hierarchy_df.columns else None,
+                hovertemplate='<b>%{label}</b><br>%{customdata[0]}<extra></extra>' if 'hover_info' in hierarchy_df.columns else '<b>%{label}</b><extra></extra>',
+                textinfo="label",  # Only show label, no percentages
+                textposition="middle center",  # Center text in boxes
+                root_color="lightblue",
+                tiling=dict(
+                    orientation='h'  # Horizontal orientation (children span parent height)
+                ),
+                textfont=dict(size=16)  # Bigger font size
+            ))
+            
+            fig.update_layout(
+                title=f"Event Hierarchy: {event_name}",
+                margin=dict(t=80, l=25, r=25, b=25),
+                height=700,
+                font=dict(size=14)
+            )
+            
+            st.plotly_chart(fig, use_container_width=True)
+            
+            # Add instructions
+            st.info("💡 **Interactive Chart**: Click on any block to zoom in and explore deeper levels. Click on the parent (top bar) to zoom out. Hover over blocks to see more information. The chart shows levels down to **Round**; pick a round in **Drill into Round** to load its ranges, with each range's ends summarized as a count.")
+            
+        else:
+            st.warning("No hierarchy data found for this event. The event may not have any rounds or competitions configured.")
     
 
 
@@ -1423,11 +1376,11 @@ if user_role == 'recorder':
                     st.session_state.event_builder_data['ranges_config'] = {}
                 
                 # Get available ranges with target face information
-                ranges_response = supabase.table("range").select("*").execute()
-                target_faces_response = supabase.table("target_face").select("*").execute()
+                ranges_data = get_table("range")
+                target_faces_data = get_table("target_face")
                 
                 # Create a mapping of target_face_id to target face details
-                target_faces_map = {tf['target_face_id']: tf for tf in target_faces_response.data} if target_faces_response.data else {}
+                target_faces_map = {tf['target_face_id']: tf for tf in target_faces_data}
                 
                 for idx, round_info in enumerate(st.session_state.event_builder_data['rounds']):
                     round_name = round_info['name']
@@ -1443,7 +1396,7 @@ if user_role == 'recorder':
                                 col1, col2, col3 = st.columns([2, 2, 1])
                                 with col1:
                                     # Get range details to show target face info
-                                    range_details = next((r for r in ranges_response.data if r['range_id'] == range_config['range_id']), None)
+                                    range_details = next((r for r in ranges_data if r['range_id'] == range_config['range_id']), None)
                                     if range_details and range_details.get('target_face_id'):
                                         target_face = target_faces_map.get(range_details['target_face_id'])
                                         if target_face:
@@ -1463,10 +1416,10 @@ if user_role == 'recorder':
                         # Add new range
                         col1, col2, col3 = st.columns([2, 2, 1])
                         with col1:
-                            if ranges_response.data:
+                            if ranges_data:
                                 # Build range options with target face information
                                 range_options = {}
-                                for r in ranges_response.data:
+                                for r in ranges_data:
                                     target_face = target_faces_map.get(r.get('target_face_id'))
                                     if target_face:
                                         range_label = f"Range {r['range_id']} ({r['distance']}{r['unit_of_length']}) - Target Face Diameter: {target_face['diameter']}{target_face['unit_of_length']}"
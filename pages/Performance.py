@@ -39,10 +39,7 @@ with tab1:
         horizontal=True
     )
 
-    club_map = perf.get_club_competitions()
-    round_map = perf.get_rounds()
-    yc_map = perf.get_yearly_championships()
-    archer_map = perf.get_archers()
+    club_map, round_map, yc_map, archer_map = perf.get_filter_maps()
 
     if mode in ["per end", "per range", "per round"]:
         colA, colB, colC = st.columns([1.2, 1, 1])
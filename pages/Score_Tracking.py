@@ -109,9 +109,11 @@ if st.session_state['role'] == 'archer':
                 if edited_df.equals(df):
                     st.info("No changes detected.")
                 else:
-                    # Prepare updates - only for rows where status is not "eligible"
+                    # Prepare updates - only for rows the editor changed and whose status is not "eligible"
+                    edited_rows = st.session_state["archer_score_editor"].get("edited_rows", {})
                     updates = []
-                    for idx, row in edited_df.iterrows():
+                    for idx in sorted(edited_rows):
+                        row = edited_df.iloc[idx]
                         original_row = df.iloc[idx]
                         
                         # Check if status is "eligible" - if so, skip
@@ -139,16 +141,22 @@ if st.session_state['role'] == 'archer':
                                     'score_2nd_arrow': int(row['Arrow 2']),
                                     'score_3rd_arrow': int(row['Arrow 3']),
                                     'score_4th_arrow': int(row['Arrow 4']),
-                                    'score_5st_arrow': int(row['Arrow 5']),
-                                    'score_6st_arrow': int(row['Arrow 6'])
+                                    'score_5th_arrow': int(row['Arrow 5']),
+                                    'score_6th_arrow': int(row['Arrow 6']),
+                                    'label': f"End Order {row['End Order']}"
                                 })
                     
                     if updates:
-                        if score_tracking_utility.update_participating_scores(updates):
-                            st.success(f"Successfully updated {len(updates)} score record(s)!")
+                        result = score_tracking_utility.update_participating_scores(updates)
+                        if result['success']:
+                            st.success(f"Successfully updated {result['updated_count']} score record(s)!")
                             st.rerun()
                         else:
-                            st.error("Failed to update scores. Please try again.")
+                            if result['updated_count']:
+                                st.warning(f"Updated {result['updated_count']} of {len(updates)} score record(s).")
+                            for update, row_result in zip(updates, result['results']):
+                                if not row_result['success']:
+                                    st.error(f"{update['label']}: {row_result['error']}")
                     else:
                         st.info("No valid changes to update.")
     else:
@@ -257,9 +265,11 @@ elif st.session_state['role'] == 'recorder':
                 if edited_df.equals(df):
                     st.info("No changes detected.")
                 else:
-                    # Prepare updates
+                    # Prepare updates - only for rows the editor changed
+                    edited_rows = st.session_state["recorder_score_editor"].get("edited_rows", {})
                     updates = []
-                    for idx, row in edited_df.iterrows():
+                    for idx in sorted(edited_rows):
+                        row = edited_df.iloc[idx]
                         original_row = df.iloc[idx]
                         
                         # Check if this row was modified
@@ -272,17 +282,23 @@ elif st.session_state['role'] == 'recorder':
                                 'score_2nd_arrow': int(row['Arrow 2']),
                                 'score_3rd_arrow': int(row['Arrow 3']),
                                 'score_4th_arrow': int(row['Arrow 4']),
-                                'score_5st_arrow': int(row['Arrow 5']),
-                                'score_6st_arrow': int(row['Arrow 6']),
-                                'status': row['Status']
+                                'score_5th_arrow': int(row['Arrow 5']),
+                                'score_6th_arrow': int(row['Arrow 6']),
+                                'status': row['Status'],
+                                'label': f"{row['Archer']} - End Order {row['End Order']}"
                             })
                     
                     if updates:
-                        if score_tracking_utility.update_participating_scores(updates):
-                            st.success(f"Successfully updated {len(updates)} score record(s)!")
+                        result = score_tracking_utility.update_participating_scores(updates)
+                        if result['success']:
+                            st.success(f"Successfully updated {result['updated_count']} score record(s)!")
                             st.rerun()
                         else:
-                            st.error("Failed to update scores. Please try again.")
+                            if result['updated_count']:
+                                st.warning(f"Updated {result['updated_count']} of {len(updates)} score record(s).")
+                            for update, row_result in zip(updates, result['results']):
+                                if not row_result['success']:
+                                    st.error(f"{update['label']}: {row_result['error']}")
                     else:
                         st.info("No changes to update.")
     else:
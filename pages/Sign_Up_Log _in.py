@@ -3,6 +3,7 @@ import hashlib
 import uuid
 from datetime import date, datetime
 from utility_function.initilize_dbconnection import supabase
+from utility_function.reference_cache import get_table
 from utility_function.sign_up_log_in_utility import get_countries
 
 tab1, tab2 = st.tabs(["Sign Up", "Log In"])
@@ -43,8 +44,8 @@ with tab1:
             st.subheader("Archer-Specific Information")
             
             # Get available equipment
-            equipment_list = supabase.table("equipment").select("equipment_id, name").execute()
-            equipment_options = {eq['name']: eq['equipment_id'] for eq in equipment_list.data} if equipment_list.data else {}
+            equipment_list = get_table("equipment")
+            equipment_options = {eq['name']: eq['equipment_id'] for eq in equipment_list}
             
             if equipment_options:
                 default_equipment = st.selectbox("Default Equipment (Bow Type)*", 
@@ -0,0 +1,664 @@
+--Server-side functions, tables and triggers used by the application
+--Run after "Archery ERD.sql" (safe to re-run: every object uses CREATE OR REPLACE / IF NOT EXISTS)
+
+--Function 1: create_complete_event
+--Builds a championship or standalone competition with its rounds, event contexts (one per end),
+--round schedules and creator recording rows in a single transaction.
+--p_event shape (built by event_utility.create_complete_event):
+--  {event_type, name, year, address, date_start, date_end, eligible_group_id,
+--   competitions: [{name, address, date_start, date_end}],
+--   rounds: [{round_key, name, category_id}],
+--   ranges: [{round_key, range_id, num_ends}],
+--   schedules: [{round_key, datetime_to_start, datetime_to_end}]}
+--Returns {championship_id, competition_ids, event_context_ids, round_ids}
+CREATE OR REPLACE FUNCTION create_complete_event(p_creator_id int, p_event jsonb)
+RETURNS jsonb
+LANGUAGE plpgsql
+AS $$
+DECLARE
+  v_now timestamptz := now();
+  v_eligible_group_id int := (p_event->>'eligible_group_id')::int;
+  v_championship_id int;
+  v_competitions jsonb;
+  v_round_map jsonb;
+  v_round_ids int[];
+  v_competition_ids int[];
+  v_context_ids int[];
+BEGIN
+  --Rounds (names are unique, so they identify the returned rows)
+  WITH input AS (
+    SELECT r.ord, r.value->>'round_key' AS round_key, r.value->>'name' AS name, (r.value->>'category_id')::int AS category_id
+    FROM jsonb_array_elements(coalesce(p_event->'rounds', '[]'::jsonb)) WITH ORDINALITY AS r(value, ord)
+  ), inserted AS (
+    INSERT INTO "round" (name, category_id, created_at)
+    SELECT name, category_id, v_now FROM input ORDER BY ord
+    RETURNING round_id, name
+  )
+  SELECT coalesce(jsonb_object_agg(input.round_key, inserted.round_id), '{}'::jsonb),
+         coalesce(array_agg(inserted.round_id ORDER BY input.ord), '{}')
+  INTO v_round_map, v_round_ids
+  FROM input JOIN inserted USING (name);
+
+  --Championship, or a single standalone competition
+  IF p_event->>'event_type' = 'Yearly Club Championship' THEN
+    INSERT INTO yearly_club_championship (creator_id, year, name, eligible_group_of_club_id, created_at, updated_at)
+    VALUES (p_creator_id, (p_event->>'year')::int, p_event->>'name', v_eligible_group_id, v_now, v_now)
+    RETURNING yearly_club_championship_id INTO v_championship_id;
+    v_competitions := coalesce(p_event->'competitions', '[]'::jsonb);
+  ELSE
+    v_competitions := jsonb_build_array(jsonb_build_object(
+      'name', p_event->'name',
+      'address', p_event->'address',
+      'date_start', p_event->'date_start',
+      'date_end', p_event->'date_end'
+    ));
+  END IF;
+
+  --Competitions (names are unique as well)
+  WITH input AS (
+    SELECT c.ord, c.value->>'name' AS name, c.value->>'address' AS address,
+           (c.value->>'date_start')::date AS date_start, (c.value->>'date_end')::date AS date_end
+    FROM jsonb_array_elements(v_competitions) WITH ORDINALITY AS c(value, ord)
+  ), inserted AS (
+    INSERT INTO club_competition (creator_id, name, address, date_start, date_end, eligible_group_of_club_id, created_at, updated_at)
+    SELECT p_creator_id, name, address, date_start, date_end, v_eligible_group_id, v_now, v_now FROM input ORDER BY ord
+    RETURNING club_competition_id, name
+  )
+  SELECT coalesce(array_agg(inserted.club_competition_id ORDER BY input.ord), '{}')
+  INTO v_competition_ids
+  FROM input JOIN inserted USING (name);
+
+  --One event context per competition x round x range x end
+  WITH inserted AS (
+    INSERT INTO event_context (yearly_club_championship_id, club_competition_id, round_id, range_id, end_order)
+    SELECT v_championship_id, comp.id, (v_round_map->>(rc.value->>'round_key'))::int, (rc.value->>'range_id')::int, e.end_order
+    FROM unnest(v_competition_ids) WITH ORDINALITY AS comp(id, ord)
+    CROSS JOIN jsonb_array_elements(coalesce(p_event->'ranges', '[]'::jsonb)) WITH ORDINALITY AS rc(value, ord)
+    CROSS JOIN LATERAL generate_series(1, (rc.value->>'num_ends')::int) AS e(end_order)
+    WHERE v_round_map ? (rc.value->>'round_key')
+    ORDER BY comp.ord, rc.ord, e.end_order
+    RETURNING event_context_id
+  )
+  SELECT coalesce(array_agg(event_context_id ORDER BY event_context_id), '{}')
+  INTO v_context_ids
+  FROM inserted;
+
+  --Round schedules for every competition
+  INSERT INTO round_schedule (club_competition_id, round_id, datetime_to_start, datetime_to_end, created_at, updated_at)
+  SELECT comp.id, (v_round_map->>(s.value->>'round_key'))::int,
+         (s.value->>'datetime_to_start')::timestamptz, (s.value->>'datetime_to_end')::timestamptz, v_now, v_now
+  FROM unnest(v_competition_ids) AS comp(id)
+  CROSS JOIN jsonb_array_elements(coalesce(p_event->'schedules', '[]'::jsonb)) AS s(value)
+  WHERE v_round_map ? (s.value->>'round_key');
+
+  --The creator records every competition of the event
+  INSERT INTO recording (recording_id, yearly_club_championship_id, club_competition_id, created_at)
+  SELECT p_creator_id, v_championship_id, comp.id, v_now
+  FROM unnest(v_competition_ids) AS comp(id);
+
+  RETURN jsonb_build_object(
+    'championship_id', v_championship_id,
+    'competition_ids', to_jsonb(v_competition_ids),
+    'event_context_ids', to_jsonb(v_context_ids),
+    'round_ids', to_jsonb(v_round_ids)
+  );
+END;
+$$;
+
+GRANT EXECUTE ON FUNCTION create_complete_event(int, jsonb) TO anon, authenticated, service_role;
+
+--Function 2: update_participating_scores
+--Bulk score update for the Score Tracking page. sum_score is recomputed on the server and status is
+--only changed when the row provides one (recorder edits).
+--p_updates: [{participating_id, event_context_id, type, score_1st_arrow .. score_6th_arrow, status?}]
+--Returns the keys of the rows that were updated; keys that are missing did not match any row.
+CREATE OR REPLACE FUNCTION update_participating_scores(p_updates jsonb)
+RETURNS TABLE (participating_id int, event_context_id int, type text)
+LANGUAGE sql
+AS $$
+  UPDATE participating AS p
+  SET score_1st_arrow = u.score_1st_arrow,
+      score_2nd_arrow = u.score_2nd_arrow,
+      score_3rd_arrow = u.score_3rd_arrow,
+      score_4th_arrow = u.score_4th_arrow,
+      score_5th_arrow = u.score_5th_arrow,
+      score_6th_arrow = u.score_6th_arrow,
+      sum_score = u.score_1st_arrow + u.score_2nd_arrow + u.score_3rd_arrow
+                + u.score_4th_arrow + u.score_5th_arrow + u.score_6th_arrow,
+      status = coalesce(u.status, p.status),
+      updated_at = now()
+  FROM jsonb_to_recordset(p_updates) AS u(
+    participating_id int, event_context_id int, type type_participant_score_enum,
+    score_1st_arrow smallint, score_2nd_arrow smallint, score_3rd_arrow smallint,
+    score_4th_arrow smallint, score_5th_arrow smallint, score_6th_arrow smallint,
+    status status_enum
+  )
+  WHERE p.participating_id = u.participating_id
+    AND p.event_context_id = u.event_context_id
+    AND p.type = u.type
+  RETURNING p.participating_id, p.event_context_id, p.type::text;
+$$;
+
+GRANT EXECUTE ON FUNCTION update_participating_scores(jsonb) TO anon, authenticated, service_role;
+
+--Function 3: aggregate_participant_scores
+--Score totals for the Performance page when no club competition or championship is
+--chosen, grouped on the server so only one row per participant x group is returned
+--instead of every end (scoped views use the cached score cube).
+--p_group_by: 'end_order', 'range_id', 'round_id', or NULL for one total per participant (ranking)
+--Filters are optional; only competition scores are counted.
+CREATE OR REPLACE FUNCTION aggregate_participant_scores(
+  p_group_by text DEFAULT NULL,
+  p_club_competition_id int DEFAULT NULL,
+  p_round_id int DEFAULT NULL,
+  p_archer_account_id int DEFAULT NULL,
+  p_yearly_championship_id int DEFAULT NULL
+)
+RETURNS TABLE (participating_id int, fullname varchar, group_key int, sum_score bigint)
+LANGUAGE sql
+STABLE
+AS $$
+  SELECT p.participating_id,
+         a.fullname,
+         CASE p_group_by
+           WHEN 'end_order' THEN ec.end_order
+           WHEN 'range_id' THEN ec.range_id
+           WHEN 'round_id' THEN ec.round_id
+         END AS group_key,
+         sum(p.score_1st_arrow + p.score_2nd_arrow + p.score_3rd_arrow
+           + p.score_4th_arrow + p.score_5th_arrow + p.score_6th_arrow)::bigint AS sum_score
+  FROM participating p
+  JOIN event_context ec ON ec.event_context_id = p.event_context_id
+  JOIN archer ar ON ar.archer_id = p.participating_id
+  JOIN account a ON a.account_id = ar.archer_id
+  WHERE p.type = 'competition'
+    AND (p_club_competition_id IS NULL OR ec.club_competition_id = p_club_competition_id)
+    AND (p_yearly_championship_id IS NULL OR ec.yearly_club_championship_id = p_yearly_championship_id)
+    AND (p_round_id IS NULL OR ec.round_id = p_round_id)
+    AND (p_archer_account_id IS NULL OR p.participating_id = p_archer_account_id)
+  GROUP BY 1, 2, 3
+$$;
+
+GRANT EXECUTE ON FUNCTION aggregate_participant_scores(text, int, int, int, int) TO anon, authenticated, service_role;
+
+--Table 1: round_leaderboard
+--Running total of competition scores per (club competition, round, archer), kept current by the
+--participating trigger below so ranking a round is a single indexed read.
+CREATE TABLE IF NOT EXISTS "round_leaderboard" (
+  "club_competition_id" int NOT NULL REFERENCES "club_competition" ("club_competition_id") ON DELETE CASCADE ON UPDATE CASCADE,
+  "round_id" int NOT NULL REFERENCES "round" ("round_id") ON DELETE CASCADE ON UPDATE CASCADE,
+  "archer_id" int NOT NULL REFERENCES "archer" ("archer_id") ON DELETE CASCADE ON UPDATE CASCADE,
+  "yearly_club_championship_id" int REFERENCES "yearly_club_championship" ("yearly_club_championship_id") ON DELETE CASCADE ON UPDATE CASCADE,
+  "total_score" int NOT NULL DEFAULT 0,
+  "ends_shot" int NOT NULL DEFAULT 0,
+  "updated_at" timestamptz NOT NULL DEFAULT now(),
+  PRIMARY KEY ("club_competition_id", "round_id", "archer_id")
+);
+
+CREATE INDEX IF NOT EXISTS "round_leaderboard_ranking" ON "round_leaderboard" ("club_competition_id", "round_id", "total_score" DESC);
+
+CREATE INDEX IF NOT EXISTS "round_leaderboard_yearly_round" ON "round_leaderboard" ("yearly_club_championship_id", "round_id");
+
+GRANT SELECT ON "round_leaderboard" TO anon, authenticated;
+GRANT ALL ON "round_leaderboard" TO service_role;
+
+--Adds a score/end delta for one archer to the leaderboard row of an event context's competition and round
+CREATE OR REPLACE FUNCTION apply_round_leaderboard_delta(p_event_context_id int, p_archer_id int, p_score int, p_ends int)
+RETURNS void
+LANGUAGE sql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+  INSERT INTO round_leaderboard (club_competition_id, round_id, archer_id, yearly_club_championship_id, total_score, ends_shot, updated_at)
+  SELECT ec.club_competition_id, ec.round_id, p_archer_id, ec.yearly_club_championship_id, p_score, p_ends, now()
+  FROM event_context ec
+  WHERE ec.event_context_id = p_event_context_id
+  ON CONFLICT (club_competition_id, round_id, archer_id) DO UPDATE
+  SET total_score = round_leaderboard.total_score + EXCLUDED.total_score,
+      ends_shot = round_leaderboard.ends_shot + EXCLUDED.ends_shot,
+      updated_at = EXCLUDED.updated_at;
+$$;
+
+--Trigger 1: keep round_leaderboard in sync with competition scores (applies only the changed end's difference)
+CREATE OR REPLACE FUNCTION round_leaderboard_on_participating_change()
+RETURNS trigger
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+DECLARE
+  v_old_score int;
+  v_new_score int;
+BEGIN
+  IF TG_OP IN ('UPDATE', 'DELETE') THEN
+    IF OLD.type = 'competition' AND OLD.participating_id IS NOT NULL THEN
+      v_old_score := OLD.score_1st_arrow + OLD.score_2nd_arrow + OLD.score_3rd_arrow
+                   + OLD.score_4th_arrow + OLD.score_5th_arrow + OLD.score_6th_arrow;
+    END IF;
+  END IF;
+  IF TG_OP IN ('INSERT', 'UPDATE') THEN
+    IF NEW.type = 'competition' AND NEW.participating_id IS NOT NULL THEN
+      v_new_score := NEW.score_1st_arrow + NEW.score_2nd_arrow + NEW.score_3rd_arrow
+                   + NEW.score_4th_arrow + NEW.score_5th_arrow + NEW.score_6th_arrow;
+    END IF;
+  END IF;
+
+  IF v_old_score IS NOT NULL AND v_new_score IS NOT NULL
+     AND OLD.participating_id = NEW.participating_id
+     AND OLD.event_context_id = NEW.event_context_id THEN
+    --Same end edited in place: apply the score difference only
+    IF v_new_score <> v_old_score THEN
+      PERFORM apply_round_leaderboard_delta(NEW.event_context_id, NEW.participating_id, v_new_score - v_old_score, 0);
+    END IF;
+  ELSE
+    IF v_old_score IS NOT NULL THEN
+      PERFORM apply_round_leaderboard_delta(OLD.event_context_id, OLD.participating_id, -v_old_score, -1);
+    END IF;
+    IF v_new_score IS NOT NULL THEN
+      PERFORM apply_round_leaderboard_delta(NEW.event_context_id, NEW.participating_id, v_new_score, 1);
+    END IF;
+  END IF;
+
+  RETURN NULL;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS "round_leaderboard_sync" ON "participating";
+CREATE TRIGGER "round_leaderboard_sync"
+AFTER INSERT OR UPDATE OR DELETE ON "participating"
+FOR EACH ROW EXECUTE FUNCTION round_leaderboard_on_participating_change();
+
+--Backfill / rebuild from existing scores
+INSERT INTO round_leaderboard (club_competition_id, round_id, archer_id, yearly_club_championship_id, total_score, ends_shot, updated_at)
+SELECT ec.club_competition_id, ec.round_id, p.participating_id, max(ec.yearly_club_championship_id),
+       sum(p.score_1st_arrow + p.score_2nd_arrow + p.score_3rd_arrow + p.score_4th_arrow + p.score_5th_arrow + p.score_6th_arrow),
+       count(*), now()
+FROM participating p
+JOIN event_context ec ON ec.event_context_id = p.event_context_id
+WHERE p.type = 'competition' AND p.participating_id IS NOT NULL
+GROUP BY ec.club_competition_id, ec.round_id, p.participating_id
+ON CONFLICT (club_competition_id, round_id, archer_id) DO UPDATE
+SET total_score = EXCLUDED.total_score,
+    ends_shot = EXCLUDED.ends_shot,
+    yearly_club_championship_id = EXCLUDED.yearly_club_championship_id,
+    updated_at = EXCLUDED.updated_at;
+
+--Table 2: round_structure
+--End structure and maximum score of each round (distinct range/end pairs of its event contexts),
+--kept current by the event_context trigger below so normalizing a round total needs no scan.
+--Only total_ends is derived from data. arrows_per_end and max_score_per_arrow are placeholders: the
+--schema has no per-round or per-discipline arrow definition, so they hold the score sheet's limits
+--(six arrow columns in participating, 0-10 per arrow on Score Tracking) and nothing updates them.
+--Set them per round here (and in the score sheet) when rounds with other end sizes or scoring are added.
+CREATE TABLE IF NOT EXISTS "round_structure" (
+  "round_id" int PRIMARY KEY REFERENCES "round" ("round_id") ON DELETE CASCADE ON UPDATE CASCADE,
+  "total_ends" int NOT NULL DEFAULT 0,
+  "arrows_per_end" int NOT NULL DEFAULT 6,
+  "max_score_per_arrow" int NOT NULL DEFAULT 10,
+  "max_total_score" int GENERATED ALWAYS AS ("total_ends" * "arrows_per_end" * "max_score_per_arrow") STORED,
+  "updated_at" timestamptz NOT NULL DEFAULT now()
+);
+
+COMMENT ON COLUMN "round_structure"."arrows_per_end" IS 'placeholder: arrow score columns per participating row (6), not read from the round';
+COMMENT ON COLUMN "round_structure"."max_score_per_arrow" IS 'placeholder: highest score per arrow accepted on the score sheet (10), not read from the round or discipline';
+
+CREATE INDEX IF NOT EXISTS "event_context_round_id-range_id-end_order" ON "event_context" ("round_id", "range_id", "end_order");
+
+GRANT SELECT ON "round_structure" TO anon, authenticated;
+GRANT ALL ON "round_structure" TO service_role;
+
+--Recounts the ends of the given rounds
+CREATE OR REPLACE FUNCTION refresh_round_structure(p_round_ids int[])
+RETURNS void
+LANGUAGE sql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+  INSERT INTO round_structure (round_id, total_ends, updated_at)
+  SELECT r.round_id,
+         (SELECT count(DISTINCT (ec.range_id, ec.end_order)) FROM event_context ec WHERE ec.round_id = r.round_id),
+         now()
+  FROM round r
+  WHERE r.round_id = ANY (p_round_ids)
+  ON CONFLICT (round_id) DO UPDATE
+  SET total_ends = EXCLUDED.total_ends,
+      updated_at = EXCLUDED.updated_at;
+$$;
+
+--Trigger 2: keep round_structure in sync with event contexts (once per statement, for the rounds it touched)
+CREATE OR REPLACE FUNCTION round_structure_on_event_context_change()
+RETURNS trigger
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+BEGIN
+  IF TG_OP = 'INSERT' THEN
+    PERFORM refresh_round_structure(ARRAY(SELECT DISTINCT round_id FROM new_rows));
+  ELSIF TG_OP = 'UPDATE' THEN
+    PERFORM refresh_round_structure(ARRAY(SELECT round_id FROM new_rows UNION SELECT round_id FROM old_rows));
+  ELSE
+    PERFORM refresh_round_structure(ARRAY(SELECT DISTINCT round_id FROM old_rows));
+  END IF;
+  RETURN NULL;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS "round_structure_sync_insert" ON "event_context";
+CREATE TRIGGER "round_structure_sync_insert"
+AFTER INSERT ON "event_context"
+REFERENCING NEW TABLE AS new_rows
+FOR EACH STATEMENT EXECUTE FUNCTION round_structure_on_event_context_change();
+
+DROP TRIGGER IF EXISTS "round_structure_sync_update" ON "event_context";
+CREATE TRIGGER "round_structure_sync_update"
+AFTER UPDATE ON "event_context"
+REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+FOR EACH STATEMENT EXECUTE FUNCTION round_structure_on_event_context_change();
+
+DROP TRIGGER IF EXISTS "round_structure_sync_delete" ON "event_context";
+CREATE TRIGGER "round_structure_sync_delete"
+AFTER DELETE ON "event_context"
+REFERENCING OLD TABLE AS old_rows
+FOR EACH STATEMENT EXECUTE FUNCTION round_structure_on_event_context_change();
+
+--Backfill / rebuild for every round
+SELECT refresh_round_structure(ARRAY(SELECT round_id FROM round));
+
+--Table 3: category rating percentiles computed from verified scores
+--category_rating_percentile gains the rating it ranks (c in the ERD formula: the archer's average of
+--round score / round max score over the rounds of the category, stored as a percentage), and
+--category_percentile_cursor remembers when the percentiles were last refreshed.
+ALTER TABLE "category_rating_percentile" ADD COLUMN IF NOT EXISTS "rating" numeric(6,2) NOT NULL DEFAULT 0;
+ALTER TABLE "category_rating_percentile" ADD COLUMN IF NOT EXISTS "updated_at" timestamptz NOT NULL DEFAULT now();
+
+CREATE TABLE IF NOT EXISTS "category_percentile_cursor" (
+  "id" boolean PRIMARY KEY DEFAULT true CHECK ("id"),
+  "last_refreshed_at" timestamptz
+);
+
+INSERT INTO "category_percentile_cursor" ("id", "last_refreshed_at") VALUES (true, NULL) ON CONFLICT ("id") DO NOTHING;
+
+CREATE INDEX IF NOT EXISTS "participating_updated_at" ON "participating" ("updated_at");
+
+GRANT SELECT ON "category_percentile_cursor" TO anon, authenticated;
+GRANT ALL ON "category_percentile_cursor" TO service_role;
+
+--Function 4: refresh_category_rating_percentiles
+--Recomputes rating and percentile (0-100, share of archers rated at or below) for the categories whose
+--scores changed since the last refresh (found through participating.updated_at) or whose competitions
+--ended since then. p_full recomputes every category (use after deleting scores). Only verified
+--('eligible') competition scores count, and only once their club competition's date_end has passed.
+--Each round an archer shot in a competition is scored as its total / round_structure.max_total_score.
+--The cursor is stored 10 minutes behind the refresh, so score writes that commit after a refresh with
+--an earlier updated_at are still picked up by the next one (their categories may be recomputed twice).
+--Returns the category ids that were recomputed.
+CREATE OR REPLACE FUNCTION refresh_category_rating_percentiles(p_full boolean DEFAULT false)
+RETURNS TABLE (category_id int)
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+DECLARE
+  c_overlap constant interval := interval '10 minutes';
+  v_cursor timestamptz;
+  v_categories int[];
+BEGIN
+  --Lock the cursor so concurrent refreshes run one after another
+  SELECT c.last_refreshed_at INTO v_cursor FROM category_percentile_cursor c WHERE c.id FOR UPDATE;
+
+  IF p_full OR v_cursor IS NULL THEN
+    v_categories := ARRAY(
+      SELECT r.category_id FROM participating p
+      JOIN event_context ec ON ec.event_context_id = p.event_context_id
+      JOIN round r ON r.round_id = ec.round_id
+      UNION
+      SELECT crp.category_id FROM category_rating_percentile crp
+    );
+  ELSE
+    v_categories := ARRAY(
+      SELECT r.category_id FROM participating p
+      JOIN event_context ec ON ec.event_context_id = p.event_context_id
+      JOIN round r ON r.round_id = ec.round_id
+      WHERE p.updated_at > v_cursor
+      UNION
+      --Competitions that ended since the last refresh: their scores start to count
+      SELECT r.category_id FROM club_competition cc
+      JOIN event_context ec ON ec.club_competition_id = cc.club_competition_id
+      JOIN round r ON r.round_id = ec.round_id
+      WHERE cc.date_end >= v_cursor::date AND cc.date_end < current_date
+    );
+  END IF;
+
+  IF cardinality(v_categories) > 0 THEN
+    DELETE FROM category_rating_percentile crp WHERE crp.category_id = ANY (v_categories);
+
+    INSERT INTO category_rating_percentile (archer_id, category_id, rating, percentile, updated_at)
+    SELECT s.archer_id, s.category_id, s.rating,
+           round(100 * cume_dist() OVER (PARTITION BY s.category_id ORDER BY s.rating))::smallint,
+           now()
+    FROM (
+      --c = average over the archer's rounds of b / a (round score / round max score)
+      SELECT b.archer_id, b.category_id, round(100 * avg(b.round_score::numeric / rs.max_total_score), 2) AS rating
+      FROM (
+        --b = the archer's score in one round of one competition
+        SELECT p.participating_id AS archer_id, r.category_id, ec.club_competition_id, ec.round_id,
+               sum(p.score_1st_arrow + p.score_2nd_arrow + p.score_3rd_arrow
+                 + p.score_4th_arrow + p.score_5th_arrow + p.score_6th_arrow) AS round_score
+        FROM participating p
+        JOIN event_context ec ON ec.event_context_id = p.event_context_id
+        JOIN club_competition cc ON cc.club_competition_id = ec.club_competition_id
+        JOIN round r ON r.round_id = ec.round_id
+        WHERE p.type = 'competition' AND p.status = 'eligible' AND p.participating_id IS NOT NULL
+          AND cc.date_end < current_date
+          AND r.category_id = ANY (v_categories)
+        GROUP BY p.participating_id, r.category_id, ec.club_competition_id, ec.round_id
+      ) b
+      --a = the round's max score
+      JOIN round_structure rs ON rs.round_id = b.round_id AND rs.max_total_score > 0
+      GROUP BY b.archer_id, b.category_id
+    ) s;
+  END IF;
+
+  --now() is the start of this transaction; writes still open then commit later with an earlier updated_at
+  UPDATE category_percentile_cursor c SET last_refreshed_at = now() - c_overlap WHERE c.id;
+
+  RETURN QUERY SELECT unnest(v_categories);
+END;
+$$;
+
+GRANT EXECUTE ON FUNCTION refresh_category_rating_percentiles(boolean) TO anon, authenticated, service_role;
+
+--View 1: enrollment_events
+--Events archers and recorders can enrol in, with their start date: yearly championships (start = earliest
+--start of their competitions) and club competitions that are not part of a championship. The enrollment
+--form filters it on date_start >= today in one query.
+CREATE OR REPLACE VIEW "enrollment_events" AS
+SELECT 'yearly club championship'::text AS event_type,
+       ycc.yearly_club_championship_id AS event_id,
+       ycc.name,
+       min(cc.date_start) AS date_start
+FROM yearly_club_championship ycc
+JOIN event_context ec ON ec.yearly_club_championship_id = ycc.yearly_club_championship_id
+JOIN club_competition cc ON cc.club_competition_id = ec.club_competition_id
+GROUP BY ycc.yearly_club_championship_id, ycc.name
+UNION ALL
+SELECT 'club competition'::text,
+       cc.club_competition_id,
+       cc.name,
+       cc.date_start
+FROM club_competition cc
+WHERE EXISTS (
+  SELECT 1 FROM event_context ec
+  WHERE ec.club_competition_id = cc.club_competition_id AND ec.yearly_club_championship_id IS NULL
+);
+
+GRANT SELECT ON "enrollment_events" TO anon, authenticated, service_role;
+
+--Function 5: search_yearly_club_championships
+--"Apply Filters" on the Browse Events tab. Every filter is optional; the category filter is an EXISTS
+--probe on the (yearly_club_championship_id, round_id) event_context index, so only matching
+--championships are returned. Page with .order()/.range() on the RPC.
+CREATE OR REPLACE FUNCTION search_yearly_club_championships(
+  p_year int DEFAULT NULL,
+  p_category_id int DEFAULT NULL,
+  p_eligible_group_id int DEFAULT NULL
+)
+RETURNS SETOF yearly_club_championship
+LANGUAGE sql
+STABLE
+AS $$
+  SELECT ycc.*
+  FROM yearly_club_championship ycc
+  WHERE (p_year IS NULL OR ycc.year = p_year)
+    AND (p_eligible_group_id IS NULL OR ycc.eligible_group_of_club_id = p_eligible_group_id)
+    AND (p_category_id IS NULL OR EXISTS (
+      SELECT 1 FROM event_context ec
+      JOIN round r ON r.round_id = ec.round_id
+      WHERE ec.yearly_club_championship_id = ycc.yearly_club_championship_id
+        AND r.category_id = p_category_id
+    ));
+$$;
+
+GRANT EXECUTE ON FUNCTION search_yearly_club_championships(int, int, int) TO anon, authenticated, service_role;
+
+--Function 6: search_club_competitions
+--Same for club competitions that are not part of a yearly championship, filtered on a date_start range.
+CREATE OR REPLACE FUNCTION search_club_competitions(
+  p_date_start date DEFAULT NULL,
+  p_date_end date DEFAULT NULL,
+  p_category_id int DEFAULT NULL,
+  p_eligible_group_id int DEFAULT NULL
+)
+RETURNS SETOF club_competition
+LANGUAGE sql
+STABLE
+AS $$
+  SELECT cc.*
+  FROM club_competition cc
+  WHERE (p_date_start IS NULL OR cc.date_start >= p_date_start)
+    AND (p_date_end IS NULL OR cc.date_start <= p_date_end)
+    AND (p_eligible_group_id IS NULL OR cc.eligible_group_of_club_id = p_eligible_group_id)
+    AND EXISTS (
+      SELECT 1 FROM event_context ec
+      WHERE ec.club_competition_id = cc.club_competition_id AND ec.yearly_club_championship_id IS NULL
+    )
+    AND (p_category_id IS NULL OR EXISTS (
+      SELECT 1 FROM event_context ec
+      JOIN round r ON r.round_id = ec.round_id
+      WHERE ec.club_competition_id = cc.club_competition_id
+        AND r.category_id = p_category_id
+    ));
+$$;
+
+GRANT EXECUTE ON FUNCTION search_club_competitions(date, date, int, int) TO anon, authenticated, service_role;
+
+--Table 4: ai_conversation_rolling_summary
+--Rolling summary of the older turns of a chatbot conversation, written by the app once turns
+--fall out of the recent-turn window so the model keeps the gist of long conversations without
+--being sent all of ai_conversation_history. summarized_through is the last prompt_response_order
+--the summary covers.
+CREATE TABLE IF NOT EXISTS "ai_conversation_rolling_summary" (
+  "account_id" int NOT NULL REFERENCES "account" ("account_id") ON DELETE CASCADE ON UPDATE CASCADE,
+  "conversation_order" int NOT NULL,
+  "summary" text NOT NULL,
+  "summarized_through" int NOT NULL,
+  "updated_at" timestamptz NOT NULL DEFAULT now(),
+  PRIMARY KEY ("account_id", "conversation_order")
+);
+
+GRANT ALL ON "ai_conversation_rolling_summary" TO anon, authenticated, service_role;
+
+--Table 5: ai_conversation
+--One row per chatbot conversation, so the chat sidebar lists a user's conversations with one indexed query
+--instead of reading every ai_conversation_history row. Kept in sync by Trigger 3. title is the first
+--prompt (shortened), next_prompt_response_order is the order for the next message of the conversation.
+CREATE TABLE IF NOT EXISTS "ai_conversation" (
+  "account_id" int NOT NULL REFERENCES "account" ("account_id") ON DELETE CASCADE ON UPDATE CASCADE,
+  "conversation_order" int NOT NULL,
+  "title" text NOT NULL,
+  "message_count" int NOT NULL,
+  "last_activity_at" timestamptz NOT NULL,
+  "next_prompt_response_order" int NOT NULL,
+  PRIMARY KEY ("account_id", "conversation_order")
+);
+
+GRANT ALL ON "ai_conversation" TO anon, authenticated, service_role;
+
+--Trigger 3: keep ai_conversation in sync with chatbot messages (once per statement, for the conversations it touched)
+CREATE OR REPLACE FUNCTION ai_conversation_on_history_change()
+RETURNS trigger
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+BEGIN
+  IF TG_OP = 'INSERT' THEN
+    INSERT INTO ai_conversation AS c
+      (account_id, conversation_order, title, message_count, last_activity_at, next_prompt_response_order)
+    SELECT n.account_id, n.conversation_order,
+           btrim(left(regexp_replace(min(f.prompt), '\s+', ' ', 'g'), 60)),
+           count(*), max(n.created_at), max(n.prompt_response_order) + 1
+    FROM new_rows n
+    JOIN (
+      SELECT DISTINCT ON (account_id, conversation_order) account_id, conversation_order, prompt
+      FROM new_rows
+      ORDER BY account_id, conversation_order, prompt_response_order
+    ) f USING (account_id, conversation_order)
+    GROUP BY n.account_id, n.conversation_order
+    ON CONFLICT (account_id, conversation_order) DO UPDATE SET
+      message_count = c.message_count + EXCLUDED.message_count,
+      last_activity_at = greatest(c.last_activity_at, EXCLUDED.last_activity_at),
+      next_prompt_response_order = greatest(c.next_prompt_response_order, EXCLUDED.next_prompt_response_order);
+  ELSE
+    --Conversations left without messages are removed, the others are recounted
+    DELETE FROM ai_conversation c
+    USING (SELECT DISTINCT account_id, conversation_order FROM old_rows) o
+    WHERE c.account_id = o.account_id AND c.conversation_order = o.conversation_order
+      AND NOT EXISTS (
+        SELECT 1 FROM ai_conversation_history h
+        WHERE h.account_id = o.account_id AND h.conversation_order = o.conversation_order
+      );
+
+    UPDATE ai_conversation c
+    SET message_count = s.message_count,
+        last_activity_at = s.last_activity_at,
+        next_prompt_response_order = s.next_prompt_response_order
+    FROM (
+      SELECT h.account_id, h.conversation_order, count(*) AS message_count,
+             max(h.created_at) AS last_activity_at, max(h.prompt_response_order) + 1 AS next_prompt_response_order
+      FROM ai_conversation_history h
+      JOIN (SELECT DISTINCT account_id, conversation_order FROM old_rows) o USING (account_id, conversation_order)
+      GROUP BY h.account_id, h.conversation_order
+    ) s
+    WHERE c.account_id = s.account_id AND c.conversation_order = s.conversation_order;
+  END IF;
+  RETURN NULL;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS "ai_conversation_sync_insert" ON "ai_conversation_history";
+CREATE TRIGGER "ai_conversation_sync_insert"
+AFTER INSERT ON "ai_conversation_history"
+REFERENCING NEW TABLE AS new_rows
+FOR EACH STATEMENT EXECUTE FUNCTION ai_conversation_on_history_change();
+
+DROP TRIGGER IF EXISTS "ai_conversation_sync_delete" ON "ai_conversation_history";
+CREATE TRIGGER "ai_conversation_sync_delete"
+AFTER DELETE ON "ai_conversation_history"
+REFERENCING OLD TABLE AS old_rows
+FOR EACH STATEMENT EXECUTE FUNCTION ai_conversation_on_history_change();
+
+--Backfill / rebuild from the existing messages
+INSERT INTO ai_conversation
+  (account_id, conversation_order, title, message_count, last_activity_at, next_prompt_response_order)
+SELECT h.account_id, h.conversation_order,
+       btrim(left(regexp_replace((array_agg(h.prompt ORDER BY h.prompt_response_order))[1], '\s+', ' ', 'g'), 60)),
+       count(*), max(h.created_at), max(h.prompt_response_order) + 1
+FROM ai_conversation_history h
+GROUP BY h.account_id, h.conversation_order
+ON CONFLICT (account_id, conversation_order) DO UPDATE SET
+  title = EXCLUDED.title,
+  message_count = EXCLUDED.message_count,
+  last_activity_at = EXCLUDED.last_activity_at,
+  next_prompt_response_order = EXCLUDED.next_prompt_response_order;
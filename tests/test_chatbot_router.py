@@ -0,0 +1,148 @@
+"""
+Tests for the chatbot data-question router.
+
+Reference tables and data readers are replaced with small in-memory fixtures,
+so no database is needed: python -m pytest tests
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("SUPABASE_URL", "http://127.0.0.1:54321")
+os.environ.setdefault("SUPABASE_ANON_KEY", "test-key")
+
+import pytest
+from utility_function import chatbot_router
+
+ROUNDS = [
+    {"round_id": 1, "name": "Olympic Round (Outdoor Target Archery · 21-49 · Recurve Bow)"},
+    {"round_id": 2, "name": "Olympic Round (Outdoor Target Archery · 50+ · Recurve Bow)"},
+    {"round_id": 3, "name": "Indoor 18m (Indoor Target Archery · 21-49 · Recurve Bow)"},
+]
+COMPETITIONS = [
+    {"club_competition_id": 10, "name": "Summer Open Tournament", "date_start": "2026-01-15", "date_end": "2026-01-17"},
+    {"club_competition_id": 11, "name": "Sydney Local Cup", "date_start": "2026-03-10", "date_end": "2026-03-11"},
+]
+TABLES = {"round": ROUNDS, "club_competition": COMPETITIONS}
+
+
+@pytest.fixture
+def router(monkeypatch):
+    monkeypatch.setattr(chatbot_router, "get_table", lambda table: TABLES[table])
+    monkeypatch.setattr(chatbot_router, "_get_championships", lambda: [])
+    monkeypatch.setattr(chatbot_router, "_answer_score_total", lambda *args: "score answer")
+    monkeypatch.setattr(chatbot_router, "_answer_joined_events", lambda *args: "joined answer")
+    monkeypatch.setattr(chatbot_router, "_answer_event_dates", lambda *args: "dates answer")
+    return chatbot_router
+
+
+def _intent(router, question):
+    routed = router.route_question(question, user_id=7)
+    return routed["intent"] if routed else None
+
+
+@pytest.mark.parametrize("question", [
+    "What was my total in the Olympic Round?",
+    "what is my score at Summer Open Tournament",
+    "What’s my score in the indoor 18m",
+    "Show me my scores in the Olympic Round at Sydney Local Cup",
+    "What did I score in the olympic round?",
+    "How many points did I score at the Summer Open Tournament?",
+])
+def test_score_questions_are_routed(router, question):
+    assert _intent(router, question) == "score_total"
+
+
+@pytest.mark.parametrize("question", [
+    "Which competitions have I joined?",
+    "What events am I enrolled in?",
+    "What are my upcoming events?",
+    "Show my competitions",
+    "my upcoming events",
+])
+def test_joined_event_questions_are_routed(router, question):
+    assert _intent(router, question) == "joined_events"
+
+
+@pytest.mark.parametrize("question", [
+    "When does the Summer Open Tournament start?",
+    "When is the Sydney Local Cup?",
+    "What is the schedule for the Summer Open Tournament?",
+    "What are the dates of Sydney Local Cup",
+])
+def test_event_date_questions_are_routed(router, question):
+    assert _intent(router, question) == "event_dates"
+
+
+@pytest.mark.parametrize("question", [
+    # Coaching / advice questions mention scores and events but belong to the model
+    "How do I improve my score in the olympic round?",
+    "Why is my score lower in the Olympic Round?",
+    "what is the next event I should train for as a beginner",
+    "My scores are bad in the olympic round, any tips?",
+    "What score should I aim for in the Olympic Round?",
+    "When should I start training for the Summer Open Tournament?",
+    "How should I prepare for my next competition?",
+    "Could you recommend events for me to join?",
+    # Not an explicit question form
+    "I shot a great total in the Olympic Round today",
+    "Tell me about the Summer Open Tournament",
+    # Explicit form, but nothing the app knows about is named
+    "What was my total in the moon round?",
+    "When does the world cup start?",
+])
+def test_other_questions_go_to_the_model(router, question):
+    assert _intent(router, question) is None
+
+
+def test_round_name_matches_every_division_variant():
+    matches = chatbot_router._find_entities("what was my total in the olympic round", ROUNDS)
+    assert [r["round_id"] for r in matches] == [1, 2]
+
+    full_name = ROUNDS[1]["name"].lower()
+    matches = chatbot_router._find_entities(f"what was my total in the {full_name}", ROUNDS)
+    assert [r["round_id"] for r in matches] == [2]
+
+
+class _RecordingQuery:
+    """Stand-in for the PostgREST query builder that records filters"""
+
+    def __init__(self):
+        self.filters = []
+
+    def eq(self, column, value):
+        self.filters.append(("eq", column, value))
+        return self
+
+    def in_(self, column, values):
+        self.filters.append(("in", column, list(values)))
+        return self
+
+
+def test_score_total_reads_only_the_archers_rows_for_all_round_variants(monkeypatch):
+    queries = []
+
+    def fake_chunks(select_cols, apply_filters, chunk_size=None, as_dataframe=False):
+        queries.append(apply_filters(_RecordingQuery()).filters)
+        arrows = {f"score_{n}_arrow": 9 for n in ("1st", "2nd", "3rd", "4th", "5th", "6th")}
+        yield [
+            {**arrows, "event_context": {"club_competition_id": 10, "round_id": 1}},
+            {**arrows, "event_context": {"club_competition_id": 10, "round_id": 1}},
+            {**arrows, "event_context": {"club_competition_id": 11, "round_id": 2}},
+        ]
+
+    monkeypatch.setattr(chatbot_router, "get_table", lambda table: TABLES[table])
+    monkeypatch.setattr(chatbot_router, "_get_championships", lambda: [])
+    monkeypatch.setattr(chatbot_router, "iter_participating_chunks", fake_chunks)
+
+    routed = chatbot_router.route_question("What was my total in the Olympic Round?", user_id=7)
+
+    assert routed["intent"] == "score_total"
+    assert queries == [[
+        ("eq", "participating_id", 7),
+        ("eq", "type", "competition"),
+        ("in", "event_context.round_id", [1, 2]),
+    ]]
+    assert "**Olympic Round**" in routed["answer"]
+    assert "Summer Open Tournament — Olympic Round (Outdoor Target Archery · 21-49 · Recurve Bow): **108** points over 2 ends" in routed["answer"]
+    assert "Sydney Local Cup — Olympic Round (Outdoor Target Archery · 50+ · Recurve Bow): **54** points over 1 ends" in routed["answer"]
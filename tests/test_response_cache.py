@@ -0,0 +1,56 @@
+"""
+Tests for the chatbot response cache's prompt matching.
+
+Each test uses a fresh SQLite file under pytest's tmp_path: python -m pytest tests
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+from utility_function import response_cache
+
+MODEL = "test-model"
+
+
+@pytest.fixture
+def cache(monkeypatch, tmp_path):
+    monkeypatch.setattr(response_cache, "RESPONSE_CACHE_PATH", str(tmp_path / "responses.sqlite3"))
+    response_cache._get_cache_state.clear()
+    yield response_cache
+    response_cache._get_cache_state().get("connection").close()
+    response_cache._get_cache_state.clear()
+
+
+@pytest.mark.parametrize("cached, asked", [
+    ("what is a recurve bow", "what is recurve bow"),
+    ("what is a recurve bow", "What's a recurve bow?"),
+    ("what is a recurve bow", "what is the recurve bow"),
+    ("how is an end scored", "how is the end scored"),
+])
+def test_rewording_reuses_reply(cache, cached, asked):
+    cache.store_response(cached, MODEL, "reply")
+    found = cache.lookup_response(asked, MODEL)
+    assert found is not None and found["response"] == "reply"
+
+
+@pytest.mark.parametrize("cached, asked", [
+    ("what is the maximum score of a round", "what is the minimum score of a round"),
+    ("what is an indoor round", "what is an outdoor round"),
+    ("what is a clout", "how is a clout scored"),
+    ("what is a recurve bow", "what isn't a recurve bow"),
+])
+def test_different_question_misses(cache, cached, asked):
+    cache.store_response(cached, MODEL, "reply")
+    assert cache.lookup_response(asked, MODEL) is None
+
+
+def test_exact_match_and_model_scope(cache):
+    cache.store_response("How is an end scored?", MODEL, "reply")
+    assert cache.lookup_response("how is an END scored", MODEL) == {"response": "reply", "match": "exact"}
+    assert cache.lookup_response("how is an end scored", "other-model") is None
+
+
+def test_contractions_expand():
+    assert response_cache.normalize_prompt("What’s the score? I can't see it") == "what is the score i can not see it"
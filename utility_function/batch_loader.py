@@ -0,0 +1,72 @@
+"""
+Request-scoped batch loader for Supabase lookups.
+
+Utilities that used to query one row at a time (round name per schedule row,
+account per club member, ...) collect their keys and resolve them here with a
+single `in_()` query per table. Results are memoized for the current Streamlit
+rerun, so the same key is never fetched twice while a page renders, and the
+memo is dropped automatically when the next rerun starts.
+"""
+from utility_function.initilize_dbconnection import supabase
+import streamlit as st
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+# Keep in_() filters short enough to stay well under URL length limits
+IN_CHUNK_SIZE = 200
+
+_MEMO_KEY = "_batch_loader_memo"
+
+
+def _get_rerun_memo():
+    """
+    Return the memo dict for the current rerun, or None outside a Streamlit script run.
+
+    Streamlit replaces `ctx.cursors` with a fresh dict at the start of every rerun,
+    so holding a reference to it tells us whether the stored memo is still current.
+    """
+    ctx = get_script_run_ctx()
+    if ctx is None:
+        return None
+
+    memo = st.session_state.get(_MEMO_KEY)
+    if memo is None or memo["run"] is not ctx.cursors:
+        memo = {"run": ctx.cursors, "tables": {}}
+        st.session_state[_MEMO_KEY] = memo
+    return memo["tables"]
+
+
+def load_many(table, key_column, keys, columns="*"):
+    """
+    Fetch rows of a table for many keys at once.
+
+    Args:
+        table: Table name, e.g. "account"
+        key_column: Column the keys are matched against, e.g. "account_id"
+        keys: Iterable of key values (duplicates and None are ignored)
+        columns: Columns to select; the key column is always included
+
+    Returns:
+        dict mapping each requested key to its row dict, or to None if no row exists
+    """
+    select_cols = columns
+    if columns != "*" and key_column not in [c.strip() for c in columns.split(",")]:
+        select_cols = f"{key_column}, {columns}"
+
+    wanted = list(dict.fromkeys(k for k in keys if k is not None))
+    memo = _get_rerun_memo()
+    cache = memo.setdefault((table, key_column, select_cols), {}) if memo is not None else {}
+
+    missing = [k for k in wanted if k not in cache]
+    for start in range(0, len(missing), IN_CHUNK_SIZE):
+        chunk = missing[start:start + IN_CHUNK_SIZE]
+        try:
+            response = supabase.table(table).select(select_cols).in_(key_column, chunk).execute()
+        except Exception as e:
+            print(f"Error batch loading {table}: {e}")
+            continue
+        found = {row[key_column]: row for row in (response.data or [])}
+        for key in chunk:
+            # Remember misses too so absent keys are not queried again this rerun
+            cache[key] = found.get(key)
+
+    return {k: cache.get(k) for k in wanted}
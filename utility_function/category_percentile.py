@@ -0,0 +1,131 @@
+"""
+Category rating percentile engine.
+
+refresh_category_rating_percentiles (SERVER_SIDE_FUNCTIONS.sql) recomputes the
+percentiles of only the categories whose scores changed since its last run, using
+participating.updated_at as the cursor. This module triggers that refresh at most
+every PERCENTILE_REFRESH_INTERVAL seconds and keeps, per category, the archers'
+percentiles as a sorted NumPy array shared by all sessions, so locating one
+archer is a binary search instead of a sort per request. Categories recomputed by
+a refresh are dropped from the cache and reloaded on their next read.
+"""
+from utility_function.initilize_dbconnection import supabase
+import streamlit as st
+import numpy as np
+import threading
+import time
+import os
+
+PERCENTILE_REFRESH_INTERVAL = int(os.getenv("PERCENTILE_REFRESH_INTERVAL", "60"))
+
+# Rows per request when loading a category (PostgREST caps one response at its max-rows setting)
+PAGE_SIZE = 1000
+
+
+@st.cache_resource
+def _get_percentile_state():
+    """Shared state for every session in this process"""
+    return {
+        "lock": threading.Lock(),
+        "categories": {},   # category_id -> {"archer_ids", "percentiles", "order"}
+        "last_refresh": None,
+    }
+
+
+def refresh_percentiles(full=False):
+    """
+    Recompute percentiles on the server for categories with new or changed scores.
+
+    Args:
+        full: Recompute every category instead of only the changed ones
+
+    Returns:
+        list of category ids that were recomputed (their cached arrays are dropped)
+    """
+    state = _get_percentile_state()
+    try:
+        res = supabase.rpc("refresh_category_rating_percentiles", {"p_full": full}).execute()
+        touched = [row["category_id"] for row in (res.data or [])]
+    except Exception as e:
+        st.warning(f"Could not refresh category percentiles: {e}")
+        return []
+
+    with state["lock"]:
+        state["last_refresh"] = time.monotonic()
+        if full:
+            state["categories"].clear()
+        for category_id in touched:
+            state["categories"].pop(category_id, None)
+    return touched
+
+
+def _refresh_if_due():
+    state = _get_percentile_state()
+    with state["lock"]:
+        due = state["last_refresh"] is None or time.monotonic() - state["last_refresh"] >= PERCENTILE_REFRESH_INTERVAL
+        if due:
+            # Claim this refresh so other sessions keep using the cache meanwhile
+            state["last_refresh"] = time.monotonic()
+    if due:
+        refresh_percentiles()
+
+
+def get_category_distribution(category_id):
+    """
+    Get the percentile distribution of a category, loading it on a miss.
+
+    Returns:
+        dict with "archer_ids" and "percentiles" (both sorted by percentile, ascending) and
+        "order" {archer_id: percentile}; shared between sessions, do not modify
+    """
+    _refresh_if_due()
+
+    state = _get_percentile_state()
+    with state["lock"]:
+        entry = state["categories"].get(category_id)
+    if entry is not None:
+        return entry
+
+    # Keyset pagination on (percentile, archer_id), so categories larger than max-rows load completely
+    rows = []
+    while True:
+        query = (
+            supabase.table("category_rating_percentile")
+            .select("archer_id, percentile")
+            .eq("category_id", category_id)
+        )
+        if rows:
+            last = rows[-1]
+            query = query.or_(
+                f"percentile.gt.{last['percentile']},"
+                f"and(percentile.eq.{last['percentile']},archer_id.gt.{last['archer_id']})"
+            )
+        page = query.order("percentile").order("archer_id").limit(PAGE_SIZE).execute().data or []
+        # Stop on an empty page rather than a short one: a short page may just be the server's max-rows cap
+        if not page:
+            break
+        rows.extend(page)
+    entry = {
+        "archer_ids": np.array([r["archer_id"] for r in rows], dtype=np.int64),
+        "percentiles": np.array([r["percentile"] for r in rows], dtype=np.int16),
+    }
+    entry["order"] = dict(zip(entry["archer_ids"].tolist(), entry["percentiles"].tolist()))
+
+    with state["lock"]:
+        state["categories"][category_id] = entry
+    return entry
+
+
+def archer_percentile(category_id, archer_id):
+    """
+    Rank of an archer within a category's distribution, (position + 1) / size * 100.
+
+    Returns:
+        float between 0 and 100, or None if the archer has no rating in the category
+    """
+    entry = get_category_distribution(category_id)
+    percentile = entry["order"].get(archer_id)
+    if percentile is None:
+        return None
+    position = int(np.searchsorted(entry["percentiles"], percentile, side="left"))
+    return (position + 1) / len(entry["percentiles"]) * 100.0
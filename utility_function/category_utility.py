@@ -1,4 +1,6 @@
 from utility_function.initilize_dbconnection import supabase
+from utility_function.batch_loader import load_many
+from utility_function.reference_cache import invalidate
 import pandas as pd
 from datetime import datetime
 def get_all_equipment():
@@ -37,24 +39,28 @@ def get_all_categories():
             return pd.DataFrame()
         
         df = pd.DataFrame(response.data)
-        
-        # Enrich with related information
+
+        # Enrich with related information (one query per related table)
+        disciplines = load_many("discipline", "discipline_id", df['discipline_id'].tolist(), "name")
+        age_divs = load_many("age_division", "age_division_id", df['age_division_id'].tolist(), "min_age, max_age")
+        equipments = load_many("equipment", "equipment_id", df['equipment_id'].tolist(), "name")
+
         for idx, row in df.iterrows():
             # Get discipline name
-            discipline = supabase.table("discipline").select("name").eq("discipline_id", row['discipline_id']).execute()
-            if discipline.data:
-                df.at[idx, 'discipline_name'] = discipline.data[0]['name']
-            
+            discipline = disciplines.get(row['discipline_id'])
+            if discipline:
+                df.at[idx, 'discipline_name'] = discipline['name']
+
             # Get age division
-            age_div = supabase.table("age_division").select("min_age, max_age").eq("age_division_id", row['age_division_id']).execute()
-            if age_div.data:
-                df.at[idx, 'age_range'] = f"{age_div.data[0]['min_age']}-{age_div.data[0]['max_age']}"
-            
+            age_div = age_divs.get(row['age_division_id'])
+            if age_div:
+                df.at[idx, 'age_range'] = f"{age_div['min_age']}-{age_div['max_age']}"
+
             # Get equipment name
-            equipment = supabase.table("equipment").select("name").eq("equipment_id", row['equipment_id']).execute()
-            if equipment.data:
-                df.at[idx, 'equipment_name'] = equipment.data[0]['name']
-        
+            equipment = equipments.get(row['equipment_id'])
+            if equipment:
+                df.at[idx, 'equipment_name'] = equipment['name']
+
         return df
     except Exception as e:
         print(f"Error fetching categories: {e}")
@@ -87,6 +93,7 @@ def add_equipment(equipment_name, description, photo_url=None):
             "photo_url": photo_url or "https://ghcpcyvethwdzzgyymfp.supabase.co/storage/v1/object/public/User%20Uploaded/Equipment_Photo/Default_Equipment_Photo.png",
             "created_at": datetime.now().isoformat()
         }).execute()
+        invalidate("equipment")
         return response.data[0] if response.data else None
     except Exception as e:
         print(f"Error adding equipment: {e}")
@@ -100,6 +107,7 @@ def add_discipline(discipline_name, description):
             "description": description,
             "created_at": datetime.now().isoformat()
         }).execute()
+        invalidate("discipline")
         return response.data[0] if response.data else None
     except Exception as e:
         print(f"Error adding discipline: {e}")
@@ -113,6 +121,7 @@ def add_age_division(min_age, max_age):
             "max_age": max_age,
             "created_at": datetime.now().isoformat()
         }).execute()
+        invalidate("age_division")
         return response.data[0] if response.data else None
     except Exception as e:
         print(f"Error adding age division: {e}")
@@ -126,6 +135,7 @@ def add_target_face(diameter, unit_of_length):
             "unit_of_length": unit_of_length,
             "created_at": datetime.now().isoformat()
         }).execute()
+        invalidate("target_face")
         return response.data[0] if response.data else None
     except Exception as e:
         print(f"Error adding target face: {e}")
@@ -141,6 +151,7 @@ def add_range(distance, unit_of_length, target_face_id):
             "target_face_id": target_face_id,
             "created_at": datetime.now().isoformat()
         }).execute()
+        invalidate("range")
         return response.data[0] if response.data else None
     except Exception as e:
         print(f"Error adding range: {e}")
@@ -156,6 +167,7 @@ def add_round(round_name, category_id):
             "category_id": category_id,
             "created_at": datetime.now().isoformat()
         }).execute()
+        invalidate("round")
         return response.data[0] if response.data else None
     except Exception as e:
         print(f"Error adding round: {e}")
@@ -0,0 +1,328 @@
+"""
+Answers data questions for the chatbot without calling the model.
+
+route_question() recognises a few explicitly phrased questions about the user's
+own data and the event calendar, resolves the rounds / competitions /
+championships they name against the cached reference tables, and answers from
+the existing utilities:
+
+- "what was my total in <round> [at <competition>]"  -> the asking archer's competition scores
+- "when does <competition | championship> start"      -> competition dates and round schedule
+- "which competitions have I joined / what are my upcoming events" -> get_user_joined_events
+
+How / why / should questions ("how do I improve my score in ...") and anything
+else return None and go to the model. Schedule and joined-event answers are
+cached for CHATBOT_ROUTER_CACHE_TTL seconds; score totals are read fresh, and
+only for the asking archer.
+"""
+from utility_function.reference_cache import get_table
+from utility_function.participating_reader import iter_participating_chunks
+from utility_function.score_cube import ARROW_COLUMNS
+from utility_function.event_utility import (
+    get_round_schedule, get_user_joined_events,
+    get_yearly_club_championship_map, get_all_club_competition_by_a_yearly_championship
+)
+from datetime import date, datetime
+import streamlit as st
+import pandas as pd
+import threading
+import re
+import os
+
+CHATBOT_ROUTER_CACHE_TTL = int(os.getenv("CHATBOT_ROUTER_CACHE_TTL", "60"))
+
+# Rows listed in one answer
+MAX_ANSWER_ROWS = 10
+
+# Advice and explanation questions always go to the model, even when they mention a score or an event
+# ("how many" / "how much" are still allowed: "how many points did I score in ...")
+REJECT_PATTERN = re.compile(
+    r"^(how|why)\b(?!\s+(many|much)\b)"
+    r"|\b(should|shall|could|would|improve|improving|better|tips?|advice|advise|recommend\w*|train|training|practi[cs]e)\b"
+)
+
+# Each intent is anchored to explicit question forms at the start of the question
+EVENT_WORDS = r"(events?|competitions?|championships?|tournaments?)"
+SCORE_PATTERN = re.compile(
+    r"^(what('s| is| was| were| are)|show( me)?|tell me|give me|list)\s+(all\s+)?my\s+(total|totals|score|scores|points|results?)\b"
+    r"|^what\s+did\s+i\s+(score|shoot|get)\b"
+    r"|^how\s+(many\s+points|much)\s+did\s+i\s+(score|shoot|get)\b"
+)
+JOINED_PATTERN = re.compile(
+    rf"^(which|what)\s+(upcoming\s+)?{EVENT_WORDS}\s+(have|did|am|do)\s+i\s+"
+    r"(joined|join|enrolled|enrol|enroll|registered|register|signed up|sign up|entered|enter)\b"
+    rf"|^(what('s| is| are)|show( me)?|list)\s+(all\s+)?my\s+(upcoming\s+|next\s+)?({EVENT_WORDS}|enrolments?|enrollments?)\b"
+    rf"|^my\s+(upcoming\s+|next\s+)?({EVENT_WORDS}|enrolments?|enrollments?)\b"
+)
+UPCOMING_WORDS = re.compile(r"\b(upcoming|next|coming|future)\b")
+WHEN_PATTERN = re.compile(
+    r"^when\s+(does|do|is|are|will|was|did)\b"
+    r"|^(what|which)('s| is| are| were)?\s+(the\s+)?(start\s+|end\s+)?(dates?|schedule|timetable|times?)\s+(of|for)\b"
+    r"|^(show( me)?|list)\s+(the\s+)?(dates?|schedule|timetable)\b"
+)
+
+
+def _base_name(name):
+    """'Olympic Round (Outdoor Target Archery · 21-49 · Recurve Bow)' -> 'olympic round'"""
+    return name.split(" (")[0].strip().lower()
+
+
+def _find_entities(question, rows):
+    """
+    Rows whose name (or name without its bracketed details) appears in the question; longest match wins.
+    Every row tied on the longest match is returned, so "olympic round" finds all of its division variants.
+    """
+    best, best_length = [], 0
+    for row in rows:
+        name = row.get("name")
+        if not name:
+            continue
+        length = max(
+            (len(candidate) for candidate in {name.lower(), _base_name(name)}
+             if re.search(rf"(?<!\w){re.escape(candidate)}(?!\w)", question)),
+            default=0
+        )
+        if length and length > best_length:
+            best, best_length = [row], length
+        elif length and length == best_length:
+            best.append(row)
+    return best
+
+
+def _find_entity(question, rows):
+    """The first row of _find_entities, or None"""
+    matches = _find_entities(question, rows)
+    return matches[0] if matches else None
+
+
+def _display_name(rows):
+    """Name of one row, or the shared base name of several variants"""
+    return rows[0]["name"] if len(rows) == 1 else rows[0]["name"].split(" (")[0].strip()
+
+
+def _format_date(value):
+    if not value:
+        return "not set"
+    try:
+        return date.fromisoformat(str(value)[:10]).strftime("%a %d %b %Y")
+    except ValueError:
+        return str(value)
+
+
+def _format_datetime(value):
+    if value is None or pd.isna(value):
+        return "not set"
+    try:
+        return datetime.fromisoformat(str(value)).strftime("%a %d %b %Y %H:%M")
+    except ValueError:
+        return str(value)
+
+
+@st.cache_resource
+def _get_router_state():
+    """Counters of routed questions for this process"""
+    return {"lock": threading.Lock(), "routed": {}, "passed_to_model": 0}
+
+
+@st.cache_data(ttl=CHATBOT_ROUTER_CACHE_TTL, show_spinner=False)
+def _get_championships():
+    """Yearly championships as [{"yearly_club_championship_id", "name"}] (not a reference-cached table)"""
+    return [
+        {"yearly_club_championship_id": championship_id, "name": name}
+        for name, championship_id in get_yearly_club_championship_map().items()
+    ]
+
+
+def _archer_end_totals(user_id, round_ids, competition_id, championship_id):
+    """
+    Yield (club_competition_id, round_id, end total) for the archer's competition ends only.
+    archer.archer_id is the account_id, so the archer's scores are those with participating_id = user_id,
+    which leads the participating primary key.
+    """
+    select_cols = (
+        "participating_id, event_context_id, type, " + ",".join(ARROW_COLUMNS) + ", "
+        "event_context!inner(club_competition_id,yearly_club_championship_id,round_id)"
+    )
+
+    def apply_filters(query):
+        query = query.eq("participating_id", user_id).eq("type", "competition")
+        if round_ids:
+            query = query.in_("event_context.round_id", round_ids)
+        if competition_id:
+            query = query.eq("event_context.club_competition_id", competition_id)
+        if championship_id:
+            query = query.eq("event_context.yearly_club_championship_id", championship_id)
+        return query
+
+    for chunk in iter_participating_chunks(select_cols, apply_filters):
+        for row in chunk:
+            context = row.get("event_context") or {}
+            yield context.get("club_competition_id"), context.get("round_id"), sum(row.get(c) or 0 for c in ARROW_COLUMNS)
+
+
+def _answer_score_total(user_id, round_rows, competition_row, championship_row):
+    competition_id = competition_row["club_competition_id"] if competition_row else None
+    championship_id = championship_row["yearly_club_championship_id"] if championship_row else None
+    round_ids = [r["round_id"] for r in round_rows]
+
+    # With rounds: one total per competition (and round variant) they were shot in;
+    # otherwise one total per round of the event
+    competitions = {c["club_competition_id"]: c.get("name") for c in get_table("club_competition")}
+    rounds = {r["round_id"]: r.get("name") for r in get_table("round")}
+    totals = {}
+    for club_competition_id, round_id, end_total in _archer_end_totals(user_id, round_ids, competition_id, championship_id):
+        key = (club_competition_id, round_id) if round_ids else round_id
+        total = totals.setdefault(key, [0, 0])
+        total[0] += end_total
+        total[1] += 1
+
+    def label(key):
+        if not round_ids:
+            return rounds.get(key) or f"Round {key}"
+        club_competition_id, round_id = key
+        name = competitions.get(club_competition_id) or f"Competition {club_competition_id}"
+        return f"{name} — {rounds.get(round_id) or f'Round {round_id}'}" if len(round_ids) > 1 else name
+
+    named = [_display_name(round_rows)] if round_rows else []
+    named += [row["name"] for row in (competition_row, championship_row) if row]
+    where = " at ".join(f"**{name}**" for name in named)
+    if not totals:
+        return f"I couldn't find any competition scores for you in {where}."
+
+    lines = [
+        f"- {label(key)}: **{total}** points over {ends} ends"
+        for key, (total, ends) in sorted(totals.items(), key=lambda item: str(item[0]))
+    ][:MAX_ANSWER_ROWS]
+    if len(totals) > MAX_ANSWER_ROWS:
+        lines.append(f"- … and {len(totals) - MAX_ANSWER_ROWS} more (see the Performance page)")
+    return f"Your competition totals in {where}:\n" + "\n".join(lines)
+
+
+def _competition_dates(competition):
+    return f"{_format_date(competition.get('date_start'))} to {_format_date(competition.get('date_end'))}"
+
+
+@st.cache_data(ttl=CHATBOT_ROUTER_CACHE_TTL, show_spinner=False)
+def _answer_event_dates(competition_id, championship_id, round_ids=()):
+    competitions = {c["club_competition_id"]: c for c in get_table("club_competition")}
+
+    if championship_id:
+        members = [competitions[i] for i in get_all_club_competition_by_a_yearly_championship(championship_id) if i in competitions]
+        if not members:
+            return None
+        members.sort(key=lambda c: str(c.get("date_start")))
+        name = next((c["name"] for c in _get_championships() if c["yearly_club_championship_id"] == championship_id), "The championship")
+        lines = [f"- {c['name']}: {_competition_dates(c)}" for c in members[:MAX_ANSWER_ROWS]]
+        return (
+            f"**{name}** starts {_format_date(members[0].get('date_start'))} "
+            f"and ends {_format_date(max(str(c.get('date_end')) for c in members))}.\n\n"
+            "Competitions:\n" + "\n".join(lines)
+        )
+
+    competition = competitions.get(competition_id)
+    if competition is None:
+        return None
+    answer = f"**{competition['name']}** runs from {_competition_dates(competition)}."
+    schedule = get_round_schedule(competition_id)
+    if not schedule.empty:
+        if round_ids:
+            schedule = schedule[schedule["round_id"].isin(round_ids)]
+        schedule = schedule.sort_values("datetime_to_start")
+        lines = [
+            f"- {name}: {_format_datetime(start)} to {_format_datetime(end)}"
+            for name, start, end in zip(schedule["round_name"], schedule["datetime_to_start"], schedule["datetime_to_end"])
+        ][:MAX_ANSWER_ROWS]
+        if lines:
+            answer += "\n\nRound schedule:\n" + "\n".join(lines)
+    return answer
+
+
+@st.cache_data(ttl=CHATBOT_ROUTER_CACHE_TTL, show_spinner=False)
+def _answer_joined_events(user_id, upcoming_only):
+    events = get_user_joined_events(user_id)
+    today = date.today().isoformat()
+    lines = []
+
+    championships = events["championships"]
+    if not championships.empty:
+        for row in championships.sort_values("year").itertuples():
+            if upcoming_only and int(row.year) < date.today().year:
+                continue
+            lines.append(f"- 🏆 {row.name} ({row.year})")
+
+    competitions = events["competitions"]
+    if not competitions.empty:
+        for row in competitions.sort_values("date_start").itertuples():
+            if upcoming_only and str(row.date_end) < today:
+                continue
+            lines.append(f"- 🎯 {row.name}: {_format_date(row.date_start)} to {_format_date(row.date_end)}")
+
+    kind = "upcoming events" if upcoming_only else "events"
+    if not lines:
+        return f"You have no approved enrolments in {kind}. You can enrol from the Event page."
+    more = len(lines) - MAX_ANSWER_ROWS
+    lines = lines[:MAX_ANSWER_ROWS] + ([f"- … and {more} more (see the Event page)"] if more > 0 else [])
+    return f"Your {kind} (approved enrolments):\n" + "\n".join(lines)
+
+
+def route_question(question, user_id):
+    """
+    Answer a structured data question from the app's own data.
+
+    Args:
+        question: The user's chat message
+        user_id: account_id of the user asking (used for "my" questions)
+
+    Returns:
+        dict with "intent" ("score_total", "event_dates" or "joined_events") and markdown "answer",
+        or None when the question should go to the model
+    """
+    text = " ".join(question.lower().replace("’", "'").split())
+    routed = None
+    try:
+        if REJECT_PATTERN.search(text):
+            routed = None   # advice / explanation question: leave it to the model
+        elif SCORE_PATTERN.search(text):
+            round_rows = _find_entities(text, get_table("round"))
+            competition_row = _find_entity(text, get_table("club_competition"))
+            championship_row = _find_entity(text, _get_championships())
+            if round_rows or competition_row or championship_row:
+                routed = ("score_total", _answer_score_total(user_id, round_rows, competition_row, championship_row))
+
+        elif JOINED_PATTERN.search(text):
+            routed = ("joined_events", _answer_joined_events(user_id, bool(UPCOMING_WORDS.search(text))))
+
+        elif WHEN_PATTERN.search(text):
+            competition_row = _find_entity(text, get_table("club_competition"))
+            championship_row = None if competition_row else _find_entity(text, _get_championships())
+            if competition_row or championship_row:
+                round_ids = tuple(r["round_id"] for r in _find_entities(text, get_table("round")))
+                answer = _answer_event_dates(
+                    competition_row["club_competition_id"] if competition_row else None,
+                    championship_row["yearly_club_championship_id"] if championship_row else None,
+                    round_ids,
+                )
+                if answer:
+                    routed = ("event_dates", answer)
+    except Exception as e:
+        print(f"Error answering data question: {e}")
+        routed = None
+
+    state = _get_router_state()
+    with state["lock"]:
+        if routed is None:
+            state["passed_to_model"] += 1
+        else:
+            state["routed"][routed[0]] = state["routed"].get(routed[0], 0) + 1
+    if routed is None:
+        return None
+    return {"intent": routed[0], "answer": routed[1]}
+
+
+def get_router_stats():
+    """
+    Get counts of questions answered locally (per intent) and passed to the model.
+    """
+    state = _get_router_state()
+    with state["lock"]:
+        return {"routed": dict(state["routed"]), "passed_to_model": state["passed_to_model"]}
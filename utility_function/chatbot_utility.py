@@ -0,0 +1,437 @@
+"""
+Model access for the Chatbot Assistant page.
+
+Replies are generated as a stream of text chunks so the page can render the
+first words as soon as the model produces them. CHATBOT_BACKEND selects the
+model: "gemini" (default) calls Google Generative AI, "stub" is a local canned
+model for working offline and testing without an API key.
+
+Each prompt is sent with multi-turn context: a rolling summary of the older
+turns of the conversation (persisted in ai_conversation_rolling_summary and
+extended in the background every SUMMARY_BATCH_TURNS turns) plus as many recent
+turns as fit CHATBOT_CONTEXT_TOKENS, so cost and latency stay flat as
+conversations grow. Summary updates run on their own pool of
+SUMMARY_MAX_CONCURRENCY threads, so they never take a worker from a waiting
+reply; at most CHATBOT_MAX_QUEUE are pending and each has the CHATBOT_TIMEOUT
+deadline (a skipped update is retried after the next turn).
+
+Generations run on a process-wide pool of CHATBOT_MAX_CONCURRENCY worker
+threads; further requests wait in a queue of at most CHATBOT_MAX_QUEUE and can
+report their position. Each request has a CHATBOT_TIMEOUT deadline covering the
+wait and the generation, so a slow or failing model never holds a session's
+script thread (or more than the pool's threads) for longer than that. Queue
+depth, time to first token and total generation time are kept in process-wide
+statistics.
+"""
+from concurrent.futures import ThreadPoolExecutor
+from collections import deque
+from datetime import datetime
+from utility_function.initilize_dbconnection import supabase
+import streamlit as st
+import numpy as np
+import threading
+import queue
+import time
+import os
+from dotenv import load_dotenv
+
+load_dotenv()
+
+CHATBOT_BACKEND = os.getenv("CHATBOT_BACKEND", "gemini").lower()
+CHATBOT_MODEL = os.getenv("CHATBOT_MODEL", "gemini-2.0-flash-lite")
+CHATBOT_STUB_DELAY = float(os.getenv("CHATBOT_STUB_DELAY", "0.05"))
+CHATBOT_MAX_CONCURRENCY = int(os.getenv("CHATBOT_MAX_CONCURRENCY", "4"))
+CHATBOT_MAX_QUEUE = int(os.getenv("CHATBOT_MAX_QUEUE", "50"))
+CHATBOT_TIMEOUT = float(os.getenv("CHATBOT_TIMEOUT", "60"))
+CHATBOT_CONTEXT_TOKENS = int(os.getenv("CHATBOT_CONTEXT_TOKENS", "3000"))
+CHATBOT_RECENT_TURNS = int(os.getenv("CHATBOT_RECENT_TURNS", "6"))
+
+# Older turns are folded into the rolling summary once this many have left the recent window
+SUMMARY_BATCH_TURNS = 4
+SUMMARY_MAX_WORDS = 200
+SUMMARY_MAX_CONCURRENCY = 1
+SUMMARY_INSTRUCTION = (
+    f"Summarize this archery chatbot conversation in at most {SUMMARY_MAX_WORDS} words for your own memory. "
+    "Keep names, numbers, dates, equipment and decisions, and write in the conversation's language."
+)
+
+# Seconds between queue position updates while a request waits for a worker
+QUEUE_POLL_INTERVAL = 0.25
+
+# Number of recent replies the latency statistics are computed over
+CHAT_STATS_WINDOW = 200
+
+SYSTEM_INSTRUCTION = """You are a chatbot assistant for an archery management system.
+
+Your goals:
+1. Automatically detect the user's language (English or Vietnamese).
+2. Respond in the same language as the user.
+3. Restrict your knowledge and conversation scope strictly to topics related to archery —
+   including techniques, equipment, rules, training, event organization, and system management.
+4. If the user asks a question unrelated to archery, respond:
+   - English: "Sorry, I only assist with archery-related topics."
+   - Vietnamese: "Xin lỗi, tôi chỉ hỗ trợ các vấn đề liên quan đến bắn cung."""
+
+
+@st.cache_resource
+def _get_gemini_model(model_name):
+    """Configure Google Generative AI once per process"""
+    # Imported here so the stub backend works without the package or an API key
+    import google.generativeai as genai
+    genai.configure(api_key=os.getenv("GOOGLE_API_KEY"))
+    return genai.GenerativeModel(model_name, system_instruction=SYSTEM_INSTRUCTION)
+
+
+def _stream_gemini(contents):
+    response = _get_gemini_model(CHATBOT_MODEL).generate_content(
+        contents, stream=True, request_options={"timeout": CHATBOT_TIMEOUT}
+    )
+    for chunk in response:
+        # Chunks without text parts (e.g. only safety ratings) raise on .text
+        try:
+            text = chunk.text
+        except ValueError:
+            continue
+        if text:
+            yield text
+
+
+def _stream_stub(contents):
+    """Offline stand-in for the model: echoes the question word by word after a fixed delay"""
+    prompt = contents[-1]["parts"][0]
+    reply = (
+        f"(Offline stub model, {len(contents) - 1} earlier messages in context) You asked: \"{prompt.strip()}\". "
+        "Set CHATBOT_BACKEND=gemini and GOOGLE_API_KEY to get real answers about archery."
+    )
+    for word in reply.split(" "):
+        time.sleep(CHATBOT_STUB_DELAY)
+        yield word + " "
+
+
+# CHATBOT_BACKEND -> function(contents) yielding text chunks, where contents is a list of
+# {"role": "user" | "model", "parts": [text]} turns ending with the user's prompt
+MODEL_BACKENDS = {
+    "gemini": _stream_gemini,
+    "stub": _stream_stub,
+}
+
+
+def get_model_name():
+    """Name of the model replies come from, e.g. "gemini-2.0-flash-lite" or "stub" """
+    return CHATBOT_MODEL if CHATBOT_BACKEND == "gemini" else CHATBOT_BACKEND
+
+
+@st.cache_resource
+def _get_chat_state():
+    """Worker pool, request queue and latency counters shared by every session in this process"""
+    return {
+        "lock": threading.Lock(),
+        "executor": ThreadPoolExecutor(max_workers=CHATBOT_MAX_CONCURRENCY, thread_name_prefix="chatbot"),
+        "summary_executor": ThreadPoolExecutor(max_workers=SUMMARY_MAX_CONCURRENCY, thread_name_prefix="chatbot-summary"),
+        "waiting": [],   # tickets of requests waiting for a worker, oldest first
+        "summarizing": set(),   # (account_id, conversation_order) with a summary update pending or running
+        "summaries_skipped": 0,
+        "next_ticket": 0,
+        "running": 0,
+        "peak_waiting": 0,
+        "replies_total": 0,
+        "errors_total": 0,
+        "timeouts_total": 0,
+        "rejected_total": 0,
+        "first_token_seconds": deque(maxlen=CHAT_STATS_WINDOW),
+        "reply_seconds": deque(maxlen=CHAT_STATS_WINDOW),
+    }
+
+
+def _generate(state, ticket, contents, chunks, cancelled):
+    """Worker: run the backend and pass its chunks to the waiting session through a queue"""
+    with state["lock"]:
+        state["waiting"].remove(ticket)
+        state["running"] += 1
+    try:
+        if cancelled.is_set():
+            return
+        chunks.put(("started", None))
+        for chunk in MODEL_BACKENDS[CHATBOT_BACKEND](contents):
+            if cancelled.is_set():
+                return
+            chunks.put(("chunk", chunk))
+        chunks.put(("done", None))
+    except Exception as e:
+        chunks.put(("error", e))
+    finally:
+        with state["lock"]:
+            state["running"] -= 1
+
+
+def get_queue_position(ticket):
+    """1-based position of a request in the queue, or None once a worker has picked it up"""
+    state = _get_chat_state()
+    with state["lock"]:
+        try:
+            return state["waiting"].index(ticket) + 1
+        except ValueError:
+            return None
+
+
+def stream_reply(prompt, timings=None, on_queued=None, context=None):
+    """
+    Stream the model's reply to a prompt, generated on the shared worker pool.
+
+    Args:
+        prompt: Text sent to the model
+        context: Optional earlier turns from build_context()
+        timings: Optional dict that receives "queue_seconds", "first_token_seconds" and "reply_seconds"
+        on_queued: Optional function(position) called while the request waits for a free worker
+
+    Yields:
+        text chunks in order; raises RuntimeError when the queue is full, TimeoutError
+        after CHATBOT_TIMEOUT seconds, or the backend's exception if generation fails
+    """
+    if CHATBOT_BACKEND not in MODEL_BACKENDS:
+        raise ValueError(f"Unknown CHATBOT_BACKEND '{CHATBOT_BACKEND}', expected one of {', '.join(MODEL_BACKENDS)}")
+
+    state = _get_chat_state()
+    timings = {} if timings is None else timings
+    started = time.monotonic()
+    deadline = started + CHATBOT_TIMEOUT
+    chunks = queue.Queue()
+    cancelled = threading.Event()
+
+    with state["lock"]:
+        if len(state["waiting"]) >= CHATBOT_MAX_QUEUE:
+            state["rejected_total"] += 1
+            raise RuntimeError("The assistant is busy, please try again in a moment.")
+        ticket = state["next_ticket"]
+        state["next_ticket"] += 1
+        state["waiting"].append(ticket)
+        state["peak_waiting"] = max(state["peak_waiting"], len(state["waiting"]))
+    contents = list(context or []) + [{"role": "user", "parts": [prompt]}]
+    state["executor"].submit(_generate, state, ticket, contents, chunks, cancelled)
+
+    try:
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise TimeoutError(f"The assistant did not answer within {CHATBOT_TIMEOUT:g} seconds.")
+            try:
+                kind, value = chunks.get(timeout=min(QUEUE_POLL_INTERVAL, remaining))
+            except queue.Empty:
+                position = get_queue_position(ticket)
+                if position is not None and on_queued:
+                    on_queued(position)
+                continue
+
+            if kind == "started":
+                timings["queue_seconds"] = time.monotonic() - started
+                continue
+            if kind == "error":
+                raise value
+            if kind == "done":
+                break
+            if "first_token_seconds" not in timings:
+                timings["first_token_seconds"] = time.monotonic() - started
+            yield value
+    except TimeoutError:
+        # Counted as a timeout only, not also as an error
+        with state["lock"]:
+            state["timeouts_total"] += 1
+        raise
+    except Exception:
+        with state["lock"]:
+            state["errors_total"] += 1
+        raise
+    finally:
+        # Stops the worker at its next chunk on timeout, error or when the page stops reading
+        cancelled.set()
+
+    timings["reply_seconds"] = time.monotonic() - started
+    timings.setdefault("first_token_seconds", timings["reply_seconds"])
+    with state["lock"]:
+        state["replies_total"] += 1
+        state["first_token_seconds"].append(timings["first_token_seconds"])
+        state["reply_seconds"].append(timings["reply_seconds"])
+
+
+def estimate_tokens(text):
+    """Rough token count (about 4 characters per token), good enough for budgeting"""
+    return len(text) // 4 + 1
+
+
+def get_rolling_summary(account_id, conversation_order):
+    """Get the rolling summary row of a conversation, or None if it has none yet"""
+    try:
+        res = (
+            supabase.table("ai_conversation_rolling_summary")
+            .select("summary, summarized_through")
+            .eq("account_id", account_id)
+            .eq("conversation_order", conversation_order)
+            .execute()
+        )
+        return res.data[0] if res.data else None
+    except Exception as e:
+        print(f"Error fetching conversation summary: {e}")
+        return None
+
+
+def delete_rolling_summary(account_id, conversation_order):
+    """Delete the rolling summary of a deleted conversation"""
+    try:
+        supabase.table("ai_conversation_rolling_summary") \
+            .delete() \
+            .eq("account_id", account_id) \
+            .eq("conversation_order", conversation_order) \
+            .execute()
+    except Exception as e:
+        print(f"Error deleting conversation summary: {e}")
+
+
+def build_context(history, prompt, summary=None):
+    """
+    Build the model context for a new prompt within CHATBOT_CONTEXT_TOKENS.
+
+    Args:
+        history: ai_conversation_history rows of the conversation, oldest first
+        prompt: The new prompt (its tokens count against the budget)
+        summary: Row from get_rolling_summary() or None
+
+    Returns:
+        list of {"role", "parts"} turns: the summary of older turns, then the most recent turns
+        not covered by it, newest ones first to be kept when the budget runs out
+    """
+    budget = CHATBOT_CONTEXT_TOKENS - estimate_tokens(prompt)
+    summarized_through = 0
+    if summary:
+        summarized_through = summary["summarized_through"]
+        budget -= estimate_tokens(summary["summary"])
+
+    recent = []
+    for msg in reversed(history):
+        if msg["prompt_response_order"] <= summarized_through:
+            break
+        cost = estimate_tokens(msg["prompt"]) + estimate_tokens(msg["response"])
+        if cost > budget:
+            break
+        budget -= cost
+        recent.append(msg)
+
+    contents = []
+    if summary:
+        contents.append({"role": "user", "parts": [f"Summary of our earlier conversation:\n{summary['summary']}"]})
+        contents.append({"role": "model", "parts": ["Understood, I will keep it in mind."]})
+    for msg in reversed(recent):
+        contents.append({"role": "user", "parts": [msg["prompt"]]})
+        contents.append({"role": "model", "parts": [msg["response"]]})
+    return contents
+
+
+def _update_rolling_summary(state, key, summary, turns, deadline):
+    """Summary worker: fold turns into the conversation's summary and save it, unless the deadline passes first"""
+    account_id, conversation_order = key
+    try:
+        if time.monotonic() >= deadline:
+            raise TimeoutError("waited too long for a summary worker")
+        transcript = "\n".join(f"User: {m['prompt']}\nAssistant: {m['response']}" for m in turns)
+        request = SUMMARY_INSTRUCTION
+        if summary:
+            request += f"\n\nSummary so far:\n{summary['summary']}"
+        request += f"\n\nConversation to add:\n{transcript}"
+
+        parts = []
+        for chunk in MODEL_BACKENDS[CHATBOT_BACKEND]([{"role": "user", "parts": [request]}]):
+            if time.monotonic() >= deadline:
+                raise TimeoutError(f"no summary within {CHATBOT_TIMEOUT:g} seconds")
+            parts.append(chunk)
+        text = " ".join("".join(parts).split()[:SUMMARY_MAX_WORDS])
+        if text:
+            supabase.table("ai_conversation_rolling_summary").upsert({
+                "account_id": account_id,
+                "conversation_order": conversation_order,
+                "summary": text,
+                "summarized_through": turns[-1]["prompt_response_order"],
+                "updated_at": datetime.utcnow().isoformat(),
+            }).execute()
+    except TimeoutError as e:
+        print(f"Skipped conversation summary update: {e}")
+        with state["lock"]:
+            state["summaries_skipped"] += 1
+    except Exception as e:
+        print(f"Error updating conversation summary: {e}")
+    finally:
+        with state["lock"]:
+            state["summarizing"].discard(key)
+
+
+def refresh_rolling_summary(account_id, conversation_order, history, summary=None):
+    """
+    Fold turns that left the recent window into the rolling summary, in the background.
+
+    The update runs once SUMMARY_BATCH_TURNS turns beyond the newest CHATBOT_RECENT_TURNS are
+    not yet summarized, so the model is asked for a summary every few turns, not every turn.
+    It is skipped when CHATBOT_MAX_QUEUE updates are already pending; the turns stay
+    unsummarized, so the next turn tries again.
+
+    Args:
+        history: ai_conversation_history rows of the conversation including the latest turn, oldest first
+        summary: Row from get_rolling_summary() or None
+
+    Returns:
+        True if an update was started
+    """
+    summarized_through = summary["summarized_through"] if summary else 0
+    unsummarized = [m for m in history if m["prompt_response_order"] > summarized_through]
+    if len(unsummarized) < CHATBOT_RECENT_TURNS + SUMMARY_BATCH_TURNS:
+        return False
+
+    state = _get_chat_state()
+    key = (account_id, conversation_order)
+    with state["lock"]:
+        if key in state["summarizing"]:
+            return False
+        if len(state["summarizing"]) >= CHATBOT_MAX_QUEUE:
+            state["summaries_skipped"] += 1
+            return False
+        state["summarizing"].add(key)
+    state["summary_executor"].submit(
+        _update_rolling_summary, state, key, summary, unsummarized[:len(unsummarized) - CHATBOT_RECENT_TURNS],
+        time.monotonic() + CHATBOT_TIMEOUT,
+    )
+    return True
+
+
+def get_chat_stats():
+    """
+    Get chatbot queue and latency metrics (latency over the last CHAT_STATS_WINDOW replies).
+
+    Returns:
+        dict with backend, model, worker/queue occupancy, reply/error/timeout/rejected totals,
+        pending and skipped summary updates and
+        average / p50 / p95 time to first token and average reply time in seconds
+        (None before the first reply)
+    """
+    state = _get_chat_state()
+    with state["lock"]:
+        first_token = np.array(state["first_token_seconds"])
+        reply = np.array(state["reply_seconds"])
+        stats = {
+            "backend": CHATBOT_BACKEND,
+            "model": get_model_name(),
+            "max_concurrency": CHATBOT_MAX_CONCURRENCY,
+            "max_queue": CHATBOT_MAX_QUEUE,
+            "running": state["running"],
+            "queue_depth": len(state["waiting"]),
+            "peak_queue_depth": state["peak_waiting"],
+            "replies_total": state["replies_total"],
+            "errors_total": state["errors_total"],
+            "timeouts_total": state["timeouts_total"],
+            "rejected_total": state["rejected_total"],
+            "summaries_pending": len(state["summarizing"]),
+            "summaries_skipped": state["summaries_skipped"],
+        }
+    stats.update({
+        "avg_first_token_seconds": round(float(first_token.mean()), 3) if len(first_token) else None,
+        "p50_first_token_seconds": round(float(np.percentile(first_token, 50)), 3) if len(first_token) else None,
+        "p95_first_token_seconds": round(float(np.percentile(first_token, 95)), 3) if len(first_token) else None,
+        "avg_reply_seconds": round(float(reply.mean()), 3) if len(reply) else None,
+    })
+    return stats
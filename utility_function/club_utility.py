@@ -1,4 +1,6 @@
 from utility_function.initilize_dbconnection import supabase
+from utility_function.batch_loader import load_many
+from utility_function.reference_cache import invalidate
 import pandas as pd
 from datetime import datetime
 
@@ -100,6 +102,7 @@ def create_club(creator_id, club_name, club_description, formation_date, club_lo
         
         if response.data:
             club_id = response.data[0]['club_id']
+            invalidate("club")
             print(f"Club created with ID: {club_id}, updating archer's club_id...")
             # Update archer's club_id
             update_response = supabase.table("archer").update({"club_id": club_id}).eq("archer_id", creator_id).execute()
@@ -189,11 +192,12 @@ def get_club_members(club_id):
             return pd.DataFrame()
         
         # Get account information for each member
+        accounts = load_many("account", "account_id", [m['archer_id'] for m in response.data], "fullname, avatar_url, email_address")
         members_data = []
         for member in response.data:
-            account_info = supabase.table("account").select("fullname, avatar_url, email_address").eq("account_id", member['archer_id']).execute()
-            if account_info.data:
-                member_data = {**member, **account_info.data[0]}
+            account_info = accounts.get(member['archer_id'])
+            if account_info:
+                member_data = {**member, "fullname": account_info['fullname'], "avatar_url": account_info['avatar_url'], "email_address": account_info['email_address']}
                 members_data.append(member_data)
         
         return pd.DataFrame(members_data) if members_data else pd.DataFrame()
@@ -1,7 +1,19 @@
-from utility_function.initilize_dbconnection import supabase
+from utility_function.initilize_dbconnection import supabase, run_queries_concurrently
+from utility_function.batch_loader import load_many
+from utility_function.reference_cache import get_table, invalidate
 import pandas as pd
 from datetime import datetime
 import streamlit as st
+import os
+
+# Seconds the enrollment event lists stay cached (they only change when events are created or start)
+ENROLLMENT_CACHE_TTL = int(os.getenv("ENROLLMENT_CACHE_TTL", "60"))
+
+# Seconds a built event hierarchy (icicle chart) stays cached
+EVENT_HIERARCHY_CACHE_TTL = int(os.getenv("EVENT_HIERARCHY_CACHE_TTL", "600"))
+
+# Rows per page of the Browse Events search results
+EVENT_SEARCH_PAGE_SIZE = 50
 
 def check_archer_club_eligibility(archer_id, event_type, event_id):
     """
@@ -16,23 +28,27 @@ def check_archer_club_eligibility(archer_id, event_type, event_id):
         tuple: (is_eligible: bool, message: str, archer_club_id: int or None)
     """
     try:
-        # Get archer's club
-        archer_response = supabase.table("archer").select("club_id").eq("archer_id", archer_id).execute()
+        # Get archer's club and the event's eligible group at the same time
+        if event_type == "yearly club championship":
+            event_query = lambda db: db.table("yearly_club_championship").select("eligible_group_of_club_id").eq("yearly_club_championship_id", event_id)
+        else:  # club competition
+            event_query = lambda db: db.table("club_competition").select("eligible_group_of_club_id").eq("club_competition_id", event_id)
+        
+        responses = run_queries_concurrently({
+            "archer": lambda db: db.table("archer").select("club_id").eq("archer_id", archer_id),
+            "event": event_query,
+        })
+        archer_response = responses["archer"]
+        event_response = responses["event"]
         
         if not archer_response.data or not archer_response.data[0].get('club_id'):
             return False, "❌ You are not a member of any club. Please join a club first.", None
         
         archer_club_id = archer_response.data[0]['club_id']
         
-        # Get club name for better error messages
-        club_response = supabase.table("club").select("name").eq("club_id", archer_club_id).execute()
-        club_name = club_response.data[0]['name'] if club_response.data else f"Club {archer_club_id}"
-        
-        # Get event's eligible_group_of_club_id
-        if event_type == "yearly club championship":
-            event_response = supabase.table("yearly_club_championship").select("eligible_group_of_club_id").eq("yearly_club_championship_id", event_id).execute()
-        else:  # club competition
-            event_response = supabase.table("club_competition").select("eligible_group_of_club_id").eq("club_competition_id", event_id).execute()
+        # Get club names for better error messages
+        club_names = {c['club_id']: c['name'] for c in get_table("club")}
+        club_name = club_names.get(archer_club_id, f"Club {archer_club_id}")
         
         if not event_response.data:
             return False, "❌ Event not found.", None
@@ -44,18 +60,15 @@ def check_archer_club_eligibility(archer_id, event_type, event_id):
             return True, f"✅ Your club ({club_name}) is eligible for this event (Open to all clubs).", archer_club_id
         
         # Check if archer's club is in the eligible group
-        eligible_check = supabase.table("eligible_club_member").select("eligible_club_id").eq("eligible_group_of_club_id", eligible_group_id).eq("eligible_club_id", archer_club_id).execute()
+        eligible_clubs_response = supabase.table("eligible_club_member").select("eligible_club_id").eq("eligible_group_of_club_id", eligible_group_id).execute()
+        eligible_club_ids = [row['eligible_club_id'] for row in eligible_clubs_response.data] if eligible_clubs_response.data else []
         
-        if eligible_check.data:
+        if archer_club_id in eligible_club_ids:
             return True, f"✅ Your club ({club_name}) is eligible for this event.", archer_club_id
         else:
-            # Get list of eligible clubs for informative error message
-            eligible_clubs_response = supabase.table("eligible_club_member").select("eligible_club_id").eq("eligible_group_of_club_id", eligible_group_id).execute()
-            
-            if eligible_clubs_response.data:
-                eligible_club_ids = [row['eligible_club_id'] for row in eligible_clubs_response.data]
-                eligible_clubs = supabase.table("club").select("name").in_("club_id", eligible_club_ids).execute()
-                eligible_club_names = [club['name'] for club in eligible_clubs.data] if eligible_clubs.data else []
+            # List eligible clubs for informative error message
+            if eligible_club_ids:
+                eligible_club_names = [club_names[club_id] for club_id in eligible_club_ids if club_id in club_names]
                 
                 return False, f"❌ Your club ({club_name}) is not eligible for this event.\n\n**Eligible clubs:** {', '.join(eligible_club_names)}", archer_club_id
             else:
@@ -104,11 +117,12 @@ def get_round_schedule(club_competition_id):
         if response.data:
             # Join with round table to get round names
             df = pd.DataFrame(response.data)
+            # Query for 'name' column, not 'round_name' (one batched lookup for all rows)
+            rounds = load_many("round", "round_id", df['round_id'].tolist(), "name")
             for idx, row in df.iterrows():
-                # Query for 'name' column, not 'round_name'
-                round_info = supabase.table("round").select("name").eq("round_id", row['round_id']).execute()
-                if round_info.data:
-                    df.at[idx, 'round_name'] = round_info.data[0]['name']
+                round_info = rounds.get(row['round_id'])
+                if round_info:
+                    df.at[idx, 'round_name'] = round_info['name']
                 else:
                     df.at[idx, 'round_name'] = f"Round {row['round_id']}"
             return df
@@ -117,52 +131,6 @@ def get_round_schedule(club_competition_id):
         print(f"Error fetching round schedule: {e}")
         return pd.DataFrame()
 
-def _create_round_schedules(club_competition_id, round_ids, round_schedules):
-    """
-    Create round_schedule entries for a competition
-    
-    Args:
-        club_competition_id: ID of the club competition
-        round_ids: List of round IDs
-        round_schedules: Dict mapping round_id to schedule info {start_date, start_time, end_date, end_time}
-    
-    Returns:
-        True if successful, False otherwise
-    """
-    try:
-        from datetime import datetime
-        
-        for round_id in round_ids:
-            schedule_info = round_schedules.get(round_id)
-            if not schedule_info:
-                print(f"Warning: No schedule info for round {round_id}, skipping")
-                continue
-            
-            # Combine date and time into datetime
-            start_datetime = datetime.combine(schedule_info['start_date'], schedule_info['start_time'])
-            end_datetime = datetime.combine(schedule_info['end_date'], schedule_info['end_time'])
-            
-            # Insert round_schedule
-            response = supabase.table("round_schedule").insert({
-                "club_competition_id": club_competition_id,
-                "round_id": round_id,
-                "datetime_to_start": start_datetime.isoformat(),
-                "datetime_to_end": end_datetime.isoformat(),
-                "created_at": datetime.now().isoformat(),
-                "updated_at": datetime.now().isoformat()
-            }).execute()
-            
-            if not response.data:
-                print(f"Failed to create schedule for round {round_id}")
-                return False
-        
-        return True
-    except Exception as e:
-        print(f"Error creating round schedules: {e}")
-        import traceback
-        traceback.print_exc()
-        return False
-
 def create_complete_event(creator_id, event_data):
     """
     Create a complete event with all components atomically
@@ -184,164 +152,75 @@ def create_complete_event(creator_id, event_data):
     
     Returns:
         Dict with success status and created IDs, or error message
+        (created_ids: championship_id, competition_ids, event_context_ids, round_ids)
     """
     try:
-        created_ids = {
-            'championship_id': None,
-            'competition_ids': [],
-            'event_context_ids': [],
-            'round_ids': []
-        }
-        
         event_type = event_data.get('event_type')
         
-        # STEP 1: Create rounds in the database first
-        rounds_info = event_data.get('rounds', [])
-        round_id_mapping = {}  # Maps round_key (e.g., "round_0") to actual round_id
-        
-        for idx, round_info in enumerate(rounds_info):
-            round_key = f"round_{idx}"
-            
-            # Create round in database
-            round_response = supabase.table("round").insert({
-                "name": round_info['name'],
-                "category_id": round_info['category_id'],
-                "created_at": datetime.now().isoformat()
-            }).execute()
-            
-            if not round_response.data:
-                return {"success": False, "error": f"Failed to create round: {round_info['name']}"}
-            
-            round_id = round_response.data[0]['round_id']
-            round_id_mapping[round_key] = round_id
-            created_ids['round_ids'].append(round_id)
-        
-        # Get actual round IDs list
-        actual_round_ids = list(round_id_mapping.values())
-        
-        # STEP 2: Remap ranges_config and round_schedules to use actual round IDs
-        remapped_ranges_config = {}
-        for round_key, range_configs in event_data.get('ranges_config', {}).items():
-            if round_key in round_id_mapping:
-                remapped_ranges_config[round_id_mapping[round_key]] = range_configs
-        
-        remapped_round_schedules = {}
-        for round_key, schedule_info in event_data.get('round_schedules', {}).items():
-            if round_key in round_id_mapping:
-                remapped_round_schedules[round_id_mapping[round_key]] = schedule_info
-        
-        # STEP 3: Create Championship or Competition
-        if event_type == "Yearly Club Championship":
-            # Create yearly championship
-            championship_response = supabase.table("yearly_club_championship").insert({
-                "creator_id": creator_id,
-                "year": event_data['year'],
-                "name": event_data['name'],
-                "eligible_group_of_club_id": event_data.get('eligible_group_id'),
-                "created_at": datetime.now().isoformat(),
-                "updated_at": datetime.now().isoformat()
-            }).execute()
+        def _iso(value):
+            return value.isoformat() if hasattr(value, 'isoformat') else str(value)
+        
+        # Flatten the builder data into the payload expected by the create_complete_event SQL function
+        rounds = [
+            {"round_key": f"round_{idx}", "name": round_info['name'], "category_id": round_info['category_id']}
+            for idx, round_info in enumerate(event_data.get('rounds', []))
+        ]
+        
+        ranges = []
+        schedules = []
+        for round_info in rounds:
+            round_key = round_info['round_key']
+            for range_config in event_data.get('ranges_config', {}).get(round_key, []):
+                ranges.append({"round_key": round_key, "range_id": range_config['range_id'], "num_ends": range_config['num_ends']})
             
-            if not championship_response.data:
-                return {"success": False, "error": "Failed to create championship"}
-            
-            championship_id = championship_response.data[0]['yearly_club_championship_id']
-            created_ids['championship_id'] = championship_id
-            
-            # Create all competitions for this championship
-            competitions_to_create = event_data.get('competitions', [])
-            
-            for comp in competitions_to_create:
-                comp_response = supabase.table("club_competition").insert({
-                    "creator_id": creator_id,
+            schedule_info = event_data.get('round_schedules', {}).get(round_key)
+            if not schedule_info:
+                print(f"Warning: No schedule info for {round_key}, skipping")
+                continue
+            schedules.append({
+                "round_key": round_key,
+                "datetime_to_start": datetime.combine(schedule_info['start_date'], schedule_info['start_time']).isoformat(),
+                "datetime_to_end": datetime.combine(schedule_info['end_date'], schedule_info['end_time']).isoformat()
+            })
+        
+        payload = {
+            "event_type": event_type,
+            "name": event_data.get('name'),
+            "year": event_data.get('year'),
+            "address": event_data.get('address'),
+            "date_start": _iso(event_data['date_start']) if event_data.get('date_start') else None,
+            "date_end": _iso(event_data['date_end']) if event_data.get('date_end') else None,
+            "eligible_group_id": event_data.get('eligible_group_id'),
+            "competitions": [
+                {
                     "name": comp['name'],
                     "address": comp['address'],
-                    "date_start": comp['date_start'].isoformat() if hasattr(comp['date_start'], 'isoformat') else str(comp['date_start']),
-                    "date_end": comp['date_end'].isoformat() if hasattr(comp['date_end'], 'isoformat') else str(comp['date_end']),
-                    "eligible_group_of_club_id": event_data.get('eligible_group_id'),
-                    "created_at": datetime.now().isoformat(),
-                    "updated_at": datetime.now().isoformat()
-                }).execute()
-                
-                if not comp_response.data:
-                    return {"success": False, "error": f"Failed to create competition: {comp['name']}"}
-                
-                comp_id = comp_response.data[0]['club_competition_id']
-                created_ids['competition_ids'].append(comp_id)
-                
-                # Create event_context records for this competition using actual round IDs
-                context_ids = _create_event_contexts(championship_id, comp_id, 
-                                                     actual_round_ids, 
-                                                     remapped_ranges_config)
-                
-                if context_ids is None:
-                    return {"success": False, "error": f"Failed to create event contexts for competition: {comp['name']}"}
-                
-                created_ids['event_context_ids'].extend(context_ids)
-                
-                # Create round_schedule entries for this competition using actual round IDs
-                schedule_success = _create_round_schedules(comp_id, actual_round_ids, 
-                                                          remapped_round_schedules)
-                if not schedule_success:
-                    return {"success": False, "error": f"Failed to create round schedules for competition: {comp['name']}"}
-                
-                # Add creator recorder to recording table for this competition
-                # Rule: recorders record in all club competitions linked with a yearly club championship
-                recording_response = supabase.table("recording").insert({
-                    "recording_id": creator_id,
-                    "yearly_club_championship_id": championship_id,
-                    "club_competition_id": comp_id,
-                    "created_at": datetime.now().isoformat()
-                }).execute()
-                
-                if not recording_response.data:
-                    return {"success": False, "error": f"Failed to add creator to recording table for competition: {comp['name']}"}
-        
-        else:  # Club Competition
-            # Create standalone club competition
-            comp_response = supabase.table("club_competition").insert({
-                "creator_id": creator_id,
-                "name": event_data['name'],
-                "address": event_data['address'],
-                "date_start": event_data['date_start'].isoformat() if hasattr(event_data['date_start'], 'isoformat') else str(event_data['date_start']),
-                "date_end": event_data['date_end'].isoformat() if hasattr(event_data['date_end'], 'isoformat') else str(event_data['date_end']),
-                "eligible_group_of_club_id": event_data.get('eligible_group_id'),
-                "created_at": datetime.now().isoformat(),
-                "updated_at": datetime.now().isoformat()
-            }).execute()
-            
-            if not comp_response.data:
-                return {"success": False, "error": "Failed to create competition"}
-            
-            comp_id = comp_response.data[0]['club_competition_id']
-            created_ids['competition_ids'].append(comp_id)
-            
-            # Create event_context records for this competition using actual round IDs
-            context_ids = _create_event_contexts(None, comp_id, 
-                                                 actual_round_ids, 
-                                                 remapped_ranges_config)
-            
-            if context_ids is None:
-                return {"success": False, "error": "Failed to create event contexts"}
-            
-            created_ids['event_context_ids'].extend(context_ids)
-            
-            # Create round_schedule entries for this competition using actual round IDs
-            schedule_success = _create_round_schedules(comp_id, actual_round_ids, 
-                                                      remapped_round_schedules)
-            if not schedule_success:
-                return {"success": False, "error": "Failed to create round schedules"}
-            
-            # Add creator recorder to recording table for this standalone competition
-            recording_response = supabase.table("recording").insert({
-                "recording_id": creator_id,
-                "yearly_club_championship_id": None,  # NULL because standalone competition
-                "club_competition_id": comp_id,
-                "created_at": datetime.now().isoformat()
-            }).execute()
-            
-            if not recording_response.data:
-                return {"success": False, "error": "Failed to add creator to recording table"}
+                    "date_start": _iso(comp['date_start']),
+                    "date_end": _iso(comp['date_end'])
+                }
+                for comp in event_data.get('competitions', [])
+            ],
+            "rounds": rounds,
+            "ranges": ranges,
+            "schedules": schedules
+        }
+        
+        # Everything is created in one transaction on the server; any failure rolls it all back
+        response = supabase.rpc("create_complete_event", {"p_creator_id": creator_id, "p_event": payload}).execute()
+        
+        if not response.data:
+            return {"success": False, "error": f"Failed to create {event_type}"}
+        
+        invalidate("round", "round_structure", "club_competition")
+        _get_enrollment_events.clear()
+        _build_event_hierarchy_rows.clear()
+        
+        created_ids = {
+            'championship_id': response.data.get('championship_id'),
+            'competition_ids': response.data.get('competition_ids') or [],
+            'event_context_ids': response.data.get('event_context_ids') or [],
+            'round_ids': response.data.get('round_ids') or []
+        }
         
         return {
             "success": True,
@@ -364,55 +243,6 @@ def create_complete_event(creator_id, event_data):
             
         return {"success": False, "error": error_msg}
 
-def _create_event_contexts(championship_id, competition_id, round_ids, ranges_config):
-    """
-    Helper function to create event_context records
-    
-    Args:
-        championship_id: ID of championship (or None for standalone competition)
-        competition_id: ID of competition
-        round_ids: List of round IDs
-        ranges_config: Dict mapping round_id to list of {range_id, num_ends}
-    
-    Returns:
-        List of created event_context_ids, or None on failure
-    """
-    try:
-        created_context_ids = []
-        
-        for round_id in round_ids:
-            range_configs = ranges_config.get(round_id, [])
-            
-            for range_config in range_configs:
-                range_id = range_config['range_id']
-                num_ends = range_config['num_ends']
-                
-                # Create event_context records for each end
-                for end_order in range(1, num_ends + 1):
-                    # Don't manually set event_context_id - let it auto-increment
-                    context_response = supabase.table("event_context").insert({
-                        "yearly_club_championship_id": championship_id,
-                        "club_competition_id": competition_id,
-                        "round_id": round_id,
-                        "range_id": range_id,
-                        "end_order": end_order
-                    }).execute()
-                    
-                    if not context_response.data:
-                        print(f"Failed to create event_context for round {round_id}, range {range_id}, end {end_order}")
-                        return None
-                    
-                    # Get the auto-generated event_context_id
-                    created_context_ids.append(context_response.data[0]['event_context_id'])
-        
-        return created_context_ids
-    
-    except Exception as e:
-        print(f"Error creating event contexts: {e}")
-        import traceback
-        traceback.print_exc()
-        return None
-
 def get_all_clubs():
     """Get all clubs from database"""
     try:
@@ -542,7 +372,7 @@ def get_all_eligible_groups():
         return []
 
 def get_club_competition_map():
-    data = supabase.table("club_competition").select("club_competition_id, name").execute().data
+    data = get_table("club_competition")
     return {c["name"] : c["club_competition_id"] for c in data}
 
 def get_yearly_club_championship_map():
@@ -550,59 +380,32 @@ def get_yearly_club_championship_map():
     data = supabase.table("yearly_club_championship").select("yearly_club_championship_id, name").execute().data
     return {c["name"]: c["yearly_club_championship_id"] for c in data}
 
+@st.cache_data(ttl=ENROLLMENT_CACHE_TTL, show_spinner=False)
+def _get_enrollment_events(today):
+    """Rows of the enrollment_events view starting today or later: [{event_type, event_id, name, date_start}]"""
+    response = supabase.table("enrollment_events")\
+        .select("event_type, event_id, name, date_start")\
+        .gte("date_start", today)\
+        .order("date_start")\
+        .execute()
+    return response.data or []
+
 def get_yearly_club_championship_map_for_enrollment():
     """Get mapping of yearly championship names to IDs, filtered to show only future championships.
     A championship is considered future if its earliest child competition starts today or later."""
     from datetime import date
     
-    # Get all yearly championships
-    championships = supabase.table("yearly_club_championship").select("yearly_club_championship_id, name").execute().data
-    
-    if not championships:
+    try:
+        events = _get_enrollment_events(date.today().isoformat())
+    except Exception as e:
+        print(f"Error fetching championships for enrollment: {e}")
         return {}
     
-    result_map = {}
-    today = date.today().isoformat()
-    
-    for championship in championships:
-        champ_id = championship['yearly_club_championship_id']
-        
-        # Get all competition IDs linked to this championship via event_context
-        event_contexts = supabase.table("event_context")\
-            .select("club_competition_id")\
-            .eq("yearly_club_championship_id", champ_id)\
-            .execute()
-        
-        if not event_contexts.data:
-            # No competitions linked yet, skip this championship
-            continue
-        
-        # Get unique competition IDs
-        comp_ids = list(set([ec['club_competition_id'] for ec in event_contexts.data if ec.get('club_competition_id')]))
-        
-        if not comp_ids:
-            continue
-        
-        # Get the earliest date_start among all linked competitions
-        competitions = supabase.table("club_competition")\
-            .select("date_start")\
-            .in_("club_competition_id", comp_ids)\
-            .execute()
-        
-        if competitions.data:
-            # Find the earliest start date
-            start_dates = [comp['date_start'] for comp in competitions.data if comp.get('date_start')]
-            if start_dates:
-                earliest_date = min(start_dates)
-                # Only include if earliest date is today or in the future
-                if earliest_date >= today:
-                    result_map[championship['name']] = champ_id
-    
-    return result_map
+    return {row['name']: row['event_id'] for row in events if row['event_type'] == 'yearly club championship'}
 
 def get_round_map():
     try:
-        data = supabase.table("round").select("round_id, name").execute().data
+        data = get_table("round")
         return {c["name"] : c["round_id"] for c in data}
     except Exception as e:
         print(f"Error fetching round map: {e}")
@@ -610,7 +413,7 @@ def get_round_map():
 
 def get_range_map():
     try:
-        data = supabase.table("range").select("range_id, distance").execute().data
+        data = get_table("range")
         return { c["distance"] : c["range_id"] for c in data}
     except Exception as e:
         print(f"Error fetching range map: {e}")
@@ -618,7 +421,7 @@ def get_range_map():
 
 def get_discipline_map():
     try:
-        data = supabase.table("discipline").select("discipline_id, name").execute().data
+        data = get_table("discipline")
         return { c["name"] : c["discipline_id"] for c in data}
     except Exception as e:
         print(f"Error fetching discipline map: {e}")
@@ -627,7 +430,7 @@ def get_discipline_map():
 def get_discipline_id_to_name_map():
     """Get mapping from discipline_id to discipline name"""
     try:
-        data = supabase.table("discipline").select("discipline_id, name").execute().data
+        data = get_table("discipline")
         return { c["discipline_id"] : c["name"] for c in data}
     except Exception as e:
         print(f"Error fetching discipline id to name map: {e}")
@@ -635,7 +438,7 @@ def get_discipline_id_to_name_map():
 
 def get_equipment_map():
     try:
-        data = supabase.table("equipment").select("equipment_id, name").execute().data
+        data = get_table("equipment")
         return { c["name"] : c["equipment_id"] for c in data}
     except Exception as e:
         print(f"Error fetching equipment map: {e}")
@@ -644,7 +447,7 @@ def get_equipment_map():
 def get_equipment_id_to_name_map():
     """Get mapping from equipment_id to equipment name"""
     try:
-        data = supabase.table("equipment").select("equipment_id, name").execute().data
+        data = get_table("equipment")
         return { c["equipment_id"] : c["name"] for c in data}
     except Exception as e:
         print(f"Error fetching equipment map: {e}")
@@ -653,7 +456,7 @@ def get_equipment_id_to_name_map():
 def get_age_division_map():
     # age_division table does not have name, just min_age and max_age, so we need to create a name like "18-25"
     try:
-        data = supabase.table("age_division").select("age_division_id, min_age, max_age").execute().data
+        data = get_table("age_division")
         return {f"{c['min_age']}-{c['max_age']}": c["age_division_id"] for c in data}
     except Exception as e:
         print(f"Error fetching age division map: {e}")
@@ -662,7 +465,7 @@ def get_age_division_map():
 def get_age_division_id_to_name_map():
     """Get mapping from age_division_id to age range string"""
     try:
-        data = supabase.table("age_division").select("age_division_id, min_age, max_age").execute().data
+        data = get_table("age_division")
         return {c["age_division_id"]: f"{c['min_age']}-{c['max_age']}" for c in data}
     except Exception as e:
         print(f"Error fetching age division id to name map: {e}")
@@ -676,7 +479,7 @@ def get_category_map():
         equipment_id_to_name = get_equipment_id_to_name_map()
 
         category_map = {}
-        for c in supabase.table("category").select("category_id, discipline_id, age_division_id, equipment_id").execute().data:
+        for c in get_table("category"):
             discipline_name = discipline_id_to_name.get(c['discipline_id'], 'Unknown Discipline')
             age_division_name = age_division_id_to_name.get(c['age_division_id'], 'Unknown Age Division')
             equipment_name = equipment_id_to_name.get(c['equipment_id'], 'Unknown Equipment')
@@ -689,7 +492,7 @@ def get_category_map():
 
 def get_club_map():
     try:
-        data = supabase.table("club").select("club_id, name").execute().data
+        data = get_table("club")
         return {c["name"]: c["club_id"] for c in data}
     except Exception as e:
         print(f"Error fetching club map: {e}")
@@ -734,184 +537,146 @@ def get_list_of_member_club_name_from_eligible_group_of_club_id(eligible_group_o
         print(f"Error fetching member clubs: {e}")
         return []
 
-def get_event_hierarchy_for_icicle(event_type, event_id):
+def get_event_hierarchy_level_of_detail(event_type, event_id, expanded_round_node_id=None):
     """
-    Get hierarchical data for icicle chart visualization
-    Handles two cases:
-    Case 1: Yearly Championship → Club Competition → Round → Range → End
-    Case 2: Club Competition → Round → Range → End
+    Get icicle data down to round level only, plus the ranges of one expanded round whose ends
+    are summarized as a single count node per range, so the figure stays small for large events
     
     Args:
-        event_type: 'yearly_club_championship' or 'club_competition'
+        event_type: 'yearly club championship' or 'club competition'
         event_id: the ID of the event
+        expanded_round_node_id: 'ids' value of the round node to expand, or None for the overview
         
     Returns: DataFrame with columns: labels, parents, ids, values, level, hover_info
     """
     try:
-        hierarchy_rows = []
-        
-        if event_type == 'yearly club championship':
-            # Case 1: Yearly Championship hierarchy
-            # Get championship info
-            championship_response = supabase.table("yearly_club_championship").select("*").eq("yearly_club_championship_id", event_id).execute()
-            if not championship_response.data:
-                return pd.DataFrame()
-            
-            championship = championship_response.data[0]
-            championship_name = championship['name']
-            
-            # Build detailed hover info for championship
-            champ_hover = f"<b>Yearly Club Championship</b><br>"
-            champ_hover += f"ID: {championship.get('yearly_club_championship_id', 'N/A')}<br>"
-            champ_hover += f"Year: {championship.get('year', 'N/A')}<br>"
-            champ_hover += f"Creator ID: {championship.get('creator_id', 'N/A')}<br>"
-            champ_hover += f"Eligible Group ID: {championship.get('eligible_group_of_club_id', 'All Clubs')}<br>"
-            champ_hover += f"Created: {championship.get('created_at', 'N/A')[:10] if championship.get('created_at') else 'N/A'}"
-            
-            # Root: Yearly Championship
-            root_id = f'championship_{event_id}'
-            hierarchy_rows.append({
-                'labels': championship_name,
-                'parents': '',
-                'ids': root_id,
-                'values': 1,
-                'level': 0,
-                'hover_info': champ_hover
-            })
-            
-            # Get all club competitions under this championship
-            event_contexts = supabase.table("event_context").select("*").eq("yearly_club_championship_id", event_id).not_.is_("club_competition_id", "null").execute()
-            
-            if not event_contexts.data:
-                return pd.DataFrame(hierarchy_rows)
-            
-            # Get unique club competition IDs
-            comp_ids = list(set([ec['club_competition_id'] for ec in event_contexts.data if ec.get('club_competition_id')]))
-            
-            # Get competition details
-            competitions = supabase.table("club_competition").select("*").in_("club_competition_id", comp_ids).execute()
-            
-            for competition in competitions.data:
-                comp_id = competition['club_competition_id']
-                comp_name = competition['name']
-                comp_node_id = f'competition_{comp_id}'
-                
-                # Build detailed hover info for competition
-                comp_hover = f"<b>Club Competition</b><br>"
-                comp_hover += f"ID: {comp_id}<br>"
-                comp_hover += f"Address: {competition.get('address', 'N/A')}<br>"
-                comp_hover += f"Start Date: {competition.get('date_start', 'N/A')}<br>"
-                comp_hover += f"End Date: {competition.get('date_end', 'N/A')}<br>"
-                comp_hover += f"Creator ID: {competition.get('creator_id', 'N/A')}<br>"
-                comp_hover += f"Eligible Group ID: {competition.get('eligible_group_of_club_id', 'All Clubs')}"
-                
-                hierarchy_rows.append({
-                    'labels': comp_name,
-                    'parents': root_id,
-                    'ids': comp_node_id,
-                    'values': 1,
-                    'level': 1,
-                    'hover_info': comp_hover
-                })
-                
-                # Get rounds for this competition
-                comp_contexts = [ec for ec in event_contexts.data if ec.get('club_competition_id') == comp_id]
-                round_ids = list(set([ec['round_id'] for ec in comp_contexts if ec.get('round_id')]))
-                
-                if round_ids:
-                    rounds = supabase.table("round").select("*, category(discipline_id, age_division_id, equipment_id, discipline(name), age_division(min_age, max_age), equipment(name))").in_("round_id", round_ids).execute()
-                    
-                    for round_data in rounds.data:
-                        round_id = round_data['round_id']
-                        round_name = round_data['name']
-                        round_node_id = f'round_{comp_id}_{round_id}'
-                        
-                        # Build detailed hover info for round
-                        round_hover = f"<b>Round</b><br>"
-                        round_hover += f"ID: {round_id}<br>"
-                        round_hover += f"Name: {round_name}<br>"
-                        round_hover += f"Category ID: {round_data.get('category_id', 'N/A')}<br>"
-                        if round_data.get('category'):
-                            cat = round_data['category']
-                            round_hover += f"<b>Category Details:</b><br>"
-                            # Discipline
-                            if cat.get('discipline') and cat['discipline'].get('name'):
-                                round_hover += f"  • Discipline: {cat['discipline']['name']}<br>"
-                            else:
-                                round_hover += f"  • Discipline ID: {cat.get('discipline_id', 'N/A')}<br>"
-                            # Age Division
-                            if cat.get('age_division'):
-                                age_div = cat['age_division']
-                                min_age = age_div.get('min_age', 'N/A')
-                                max_age = age_div.get('max_age', 'N/A')
-                                round_hover += f"  • Age Division: {min_age}-{max_age} years<br>"
-                            else:
-                                round_hover += f"  • Age Division ID: {cat.get('age_division_id', 'N/A')}<br>"
-                            # Equipment
-                            if cat.get('equipment') and cat['equipment'].get('name'):
-                                round_hover += f"  • Equipment: {cat['equipment']['name']}<br>"
-                            else:
-                                round_hover += f"  • Equipment ID: {cat.get('equipment_id', 'N/A')}<br>"
-                        round_hover += f"Created: {round_data.get('created_at', 'N/A')[:10] if round_data.get('created_at') else 'N/A'}"
-                        
-                        hierarchy_rows.append({
-                            'labels': round_name,
-                            'parents': comp_node_id,
-                            'ids': round_node_id,
-                            'values': 1,
-                            'level': 2,
-                            'hover_info': round_hover
-                        })
-                        
-                        # Get ranges and ends for this round
-                        _add_ranges_and_ends_for_icicle(hierarchy_rows, comp_contexts, round_id, round_node_id, level_offset=3)
+        rows = _build_event_hierarchy_rows(event_type, event_id)
+    except Exception as e:
+        print(f"Error getting event hierarchy for icicle: {e}")
+        return pd.DataFrame()
+    
+    visible_rows = []
+    expanded_range_rows = {}
+    end_orders = {}
+    for row in rows:
+        node_type = row['ids'].split('_', 1)[0]
+        if node_type in ('championship', 'competition', 'round'):
+            visible_rows.append(row)
+        elif node_type == 'range' and row['parents'] == expanded_round_node_id:
+            visible_rows.append(row)
+            expanded_range_rows[row['ids']] = row
+        elif node_type == 'end' and row['parents'] in expanded_range_rows:
+            end_orders.setdefault(row['parents'], []).append(int(row['ids'].rsplit('_', 1)[1]))
+    
+    # One summary node per range instead of one node per end
+    for range_node_id, orders in end_orders.items():
+        visible_rows.append({
+            'labels': f'{len(orders)} ends',
+            'parents': range_node_id,
+            'ids': f'ends_{range_node_id}',
+            'values': 1,
+            'level': expanded_range_rows[range_node_id]['level'] + 1,
+            'hover_info': f"<b>Ends</b><br>Count: {len(orders)}<br>End Orders: {min(orders)}-{max(orders)}"
+        })
+    
+    return pd.DataFrame(visible_rows)
+
+def _unique_embedded(event_contexts, embed, id_column):
+    """Distinct rows of a table embedded in every event context (e.g. each context's round), ordered by id"""
+    rows = {ec[embed][id_column]: ec[embed] for ec in event_contexts if ec.get(embed)}
+    return [rows[key] for key in sorted(rows)]
+
+# Embedded tables of an event context, fetched in the same request as the event itself
+_EVENT_CONTEXT_EMBED = (
+    "event_context(event_context_id, yearly_club_championship_id, club_competition_id, round_id, range_id, end_order, "
+    "club_competition(*), "
+    "round(*, category(discipline_id, age_division_id, equipment_id, discipline(name), age_division(min_age, max_age), equipment(name))), "
+    "range(*, target_face(*)))"
+)
+
+@st.cache_data(ttl=EVENT_HIERARCHY_CACHE_TTL, show_spinner=False)
+def _build_event_hierarchy_rows(event_type, event_id):
+    """
+    Icicle rows (with hover HTML) for an event, built from one nested select and cached per
+    (event_type, event_id). Cleared by create_complete_event. Raises on query errors.
+    """
+    hierarchy_rows = []
+    
+    if event_type == 'yearly club championship':
+        # Case 1: Yearly Championship hierarchy
+        # Get championship info with all its event contexts and their competitions, rounds and ranges
+        championship_response = supabase.table("yearly_club_championship")\
+            .select(f"*, {_EVENT_CONTEXT_EMBED}")\
+            .eq("yearly_club_championship_id", event_id)\
+            .execute()
+        if not championship_response.data:
+            return []
         
-        else:
-            # Case 2: Club Competition hierarchy (standalone)
-            # Get competition info
-            competition_response = supabase.table("club_competition").select("*").eq("club_competition_id", event_id).execute()
-            if not competition_response.data:
-                return pd.DataFrame()
-            
-            competition = competition_response.data[0]
+        championship = championship_response.data[0]
+        championship_name = championship['name']
+        
+        # Build detailed hover info for championship
+        champ_hover = f"<b>Yearly Club Championship</b><br>"
+        champ_hover += f"ID: {championship.get('yearly_club_championship_id', 'N/A')}<br>"
+        champ_hover += f"Year: {championship.get('year', 'N/A')}<br>"
+        champ_hover += f"Creator ID: {championship.get('creator_id', 'N/A')}<br>"
+        champ_hover += f"Eligible Group ID: {championship.get('eligible_group_of_club_id', 'All Clubs')}<br>"
+        champ_hover += f"Created: {championship.get('created_at', 'N/A')[:10] if championship.get('created_at') else 'N/A'}"
+        
+        # Root: Yearly Championship
+        root_id = f'championship_{event_id}'
+        hierarchy_rows.append({
+            'labels': championship_name,
+            'parents': '',
+            'ids': root_id,
+            'values': 1,
+            'level': 0,
+            'hover_info': champ_hover
+        })
+        
+        # Get all club competitions under this championship
+        event_contexts = [ec for ec in championship.get('event_context') or [] if ec.get('club_competition_id')]
+        
+        if not event_contexts:
+            return hierarchy_rows
+        
+        # Unique competitions, rounds and ranges embedded in the event contexts
+        competitions = _unique_embedded(event_contexts, 'club_competition', 'club_competition_id')
+        rounds_data = _unique_embedded(event_contexts, 'round', 'round_id')
+        ranges_data = _unique_embedded(event_contexts, 'range', 'range_id')
+        
+        for competition in competitions:
+            comp_id = competition['club_competition_id']
             comp_name = competition['name']
+            comp_node_id = f'competition_{comp_id}'
             
             # Build detailed hover info for competition
             comp_hover = f"<b>Club Competition</b><br>"
-            comp_hover += f"ID: {event_id}<br>"
+            comp_hover += f"ID: {comp_id}<br>"
             comp_hover += f"Address: {competition.get('address', 'N/A')}<br>"
             comp_hover += f"Start Date: {competition.get('date_start', 'N/A')}<br>"
             comp_hover += f"End Date: {competition.get('date_end', 'N/A')}<br>"
             comp_hover += f"Creator ID: {competition.get('creator_id', 'N/A')}<br>"
-            comp_hover += f"Eligible Group ID: {competition.get('eligible_group_of_club_id', 'All Clubs')}<br>"
-            comp_hover += f"Created: {competition.get('created_at', 'N/A')[:10] if competition.get('created_at') else 'N/A'}"
+            comp_hover += f"Eligible Group ID: {competition.get('eligible_group_of_club_id', 'All Clubs')}"
             
-            # Root: Club Competition
-            root_id = f'competition_{event_id}'
             hierarchy_rows.append({
                 'labels': comp_name,
-                'parents': '',
-                'ids': root_id,
+                'parents': root_id,
+                'ids': comp_node_id,
                 'values': 1,
-                'level': 0,
+                'level': 1,
                 'hover_info': comp_hover
             })
             
-            # Get all rounds for this competition
-            event_contexts = supabase.table("event_context").select("*").eq("club_competition_id", event_id).execute()
-            
-            if not event_contexts.data:
-                return pd.DataFrame(hierarchy_rows)
-            
-            round_ids = list(set([ec['round_id'] for ec in event_contexts.data if ec.get('round_id')]))
+            # Get rounds for this competition
+            comp_contexts = [ec for ec in event_contexts if ec.get('club_competition_id') == comp_id]
+            round_ids = list(set([ec['round_id'] for ec in comp_contexts if ec.get('round_id')]))
             
             if round_ids:
-                rounds = supabase.table("round").select("*, category(discipline_id, age_division_id, equipment_id, discipline(name), age_division(min_age, max_age), equipment(name))").in_("round_id", round_ids).execute()
-                
-                for round_data in rounds.data:
+                for round_data in [r for r in rounds_data if r['round_id'] in round_ids]:
                     round_id = round_data['round_id']
                     round_name = round_data['name']
-                    round_node_id = f'round_{round_id}'
+                    round_node_id = f'round_{comp_id}_{round_id}'
                     
                     # Build detailed hover info for round
                     round_hover = f"<b>Round</b><br>"
@@ -943,31 +708,115 @@ def get_event_hierarchy_for_icicle(event_type, event_id):
                     
                     hierarchy_rows.append({
                         'labels': round_name,
-                        'parents': root_id,
+                        'parents': comp_node_id,
                         'ids': round_node_id,
                         'values': 1,
-                        'level': 1,
+                        'level': 2,
                         'hover_info': round_hover
                     })
                     
                     # Get ranges and ends for this round
-                    _add_ranges_and_ends_for_icicle(hierarchy_rows, event_contexts.data, round_id, round_node_id, level_offset=2)
+                    _add_ranges_and_ends_for_icicle(hierarchy_rows, comp_contexts, ranges_data, round_id, round_node_id, level_offset=3)
+    
+    else:
+        # Case 2: Club Competition hierarchy (standalone)
+        # Get competition info with all its event contexts and their rounds and ranges
+        competition_response = supabase.table("club_competition")\
+            .select(f"*, {_EVENT_CONTEXT_EMBED}")\
+            .eq("club_competition_id", event_id)\
+            .execute()
+        if not competition_response.data:
+            return []
         
-        return pd.DataFrame(hierarchy_rows)
+        competition = competition_response.data[0]
+        comp_name = competition['name']
+        
+        # Build detailed hover info for competition
+        comp_hover = f"<b>Club Competition</b><br>"
+        comp_hover += f"ID: {event_id}<br>"
+        comp_hover += f"Address: {competition.get('address', 'N/A')}<br>"
+        comp_hover += f"Start Date: {competition.get('date_start', 'N/A')}<br>"
+        comp_hover += f"End Date: {competition.get('date_end', 'N/A')}<br>"
+        comp_hover += f"Creator ID: {competition.get('creator_id', 'N/A')}<br>"
+        comp_hover += f"Eligible Group ID: {competition.get('eligible_group_of_club_id', 'All Clubs')}<br>"
+        comp_hover += f"Created: {competition.get('created_at', 'N/A')[:10] if competition.get('created_at') else 'N/A'}"
+        
+        # Root: Club Competition
+        root_id = f'competition_{event_id}'
+        hierarchy_rows.append({
+            'labels': comp_name,
+            'parents': '',
+            'ids': root_id,
+            'values': 1,
+            'level': 0,
+            'hover_info': comp_hover
+        })
+        
+        # Get all rounds for this competition
+        event_contexts = competition.get('event_context') or []
+        
+        if not event_contexts:
+            return hierarchy_rows
+        
+        rounds_data = _unique_embedded(event_contexts, 'round', 'round_id')
+        ranges_data = _unique_embedded(event_contexts, 'range', 'range_id')
+        
+        if rounds_data:
+            for round_data in rounds_data:
+                round_id = round_data['round_id']
+                round_name = round_data['name']
+                round_node_id = f'round_{round_id}'
+                
+                # Build detailed hover info for round
+                round_hover = f"<b>Round</b><br>"
+                round_hover += f"ID: {round_id}<br>"
+                round_hover += f"Name: {round_name}<br>"
+                round_hover += f"Category ID: {round_data.get('category_id', 'N/A')}<br>"
+                if round_data.get('category'):
+                    cat = round_data['category']
+                    round_hover += f"<b>Category Details:</b><br>"
+                    # Discipline
+                    if cat.get('discipline') and cat['discipline'].get('name'):
+                        round_hover += f"  • Discipline: {cat['discipline']['name']}<br>"
+                    else:
+                        round_hover += f"  • Discipline ID: {cat.get('discipline_id', 'N/A')}<br>"
+                    # Age Division
+                    if cat.get('age_division'):
+                        age_div = cat['age_division']
+                        min_age = age_div.get('min_age', 'N/A')
+                        max_age = age_div.get('max_age', 'N/A')
+                        round_hover += f"  • Age Division: {min_age}-{max_age} years<br>"
+                    else:
+                        round_hover += f"  • Age Division ID: {cat.get('age_division_id', 'N/A')}<br>"
+                    # Equipment
+                    if cat.get('equipment') and cat['equipment'].get('name'):
+                        round_hover += f"  • Equipment: {cat['equipment']['name']}<br>"
+                    else:
+                        round_hover += f"  • Equipment ID: {cat.get('equipment_id', 'N/A')}<br>"
+                round_hover += f"Created: {round_data.get('created_at', 'N/A')[:10] if round_data.get('created_at') else 'N/A'}"
+                
+                hierarchy_rows.append({
+                    'labels': round_name,
+                    'parents': root_id,
+                    'ids': round_node_id,
+                    'values': 1,
+                    'level': 1,
+                    'hover_info': round_hover
+                })
+                
+                # Get ranges and ends for this round
+                _add_ranges_and_ends_for_icicle(hierarchy_rows, event_contexts, ranges_data, round_id, round_node_id, level_offset=2)
     
-    except Exception as e:
-        print(f"Error getting event hierarchy for icicle: {e}")
-        import traceback
-        traceback.print_exc()
-        return pd.DataFrame()
+    return hierarchy_rows
 
-def _add_ranges_and_ends_for_icicle(hierarchy_rows, event_contexts, round_id, parent_node_id, level_offset):
+def _add_ranges_and_ends_for_icicle(hierarchy_rows, event_contexts, ranges_data, round_id, parent_node_id, level_offset):
     """
     Helper function to add ranges and ends to the hierarchy for icicle chart
     
     Args:
         hierarchy_rows: list to append hierarchy data to
         event_contexts: list of event context records
+        ranges_data: list of range records (with target_face) already fetched for the event
         round_id: the round ID to get contexts for
         parent_node_id: the parent node ID (round node)
         level_offset: the level offset for range nodes
@@ -979,9 +828,7 @@ def _add_ranges_and_ends_for_icicle(hierarchy_rows, event_contexts, round_id, pa
     range_ids = list(set([ec['range_id'] for ec in round_contexts if ec.get('range_id')]))
     
     if range_ids:
-        ranges = supabase.table("range").select("*, target_face(*)").in_("range_id", range_ids).execute()
-        
-        for range_data in ranges.data:
+        for range_data in [r for r in ranges_data if r['range_id'] in range_ids]:
             range_id = range_data['range_id']
             range_distance = range_data.get('distance', 'N/A')
             range_unit = range_data.get('unit_of_length', 'm')
@@ -1450,15 +1297,51 @@ def get_club_competition_map_of_no_yearly_club_championship_for_enrollment() ->
     Only includes competitions where date_start is today or in the future.'''
     from datetime import date
     
-    competition_ids = get_all_club_competition_ids_of_no_yearly_club_championship()
-    if not competition_ids:
+    try:
+        events = _get_enrollment_events(date.today().isoformat())
+    except Exception as e:
+        print(f"Error fetching club competitions for enrollment: {e}")
         return {}
     
-    today = date.today().isoformat()
+    return {row['name']: row['event_id'] for row in events if row['event_type'] == 'club competition'}
+
+def search_events(event_type, year=None, date_start=None, date_end=None, category_id=None, eligible_group_id=None,
+                  page=1, page_size=EVENT_SEARCH_PAGE_SIZE):
+    """
+    Search events on the server, returning one page of matches
+    
+    Args:
+        event_type: 'yearly club championship' or 'club competition' (standalone competitions only)
+        year: Championship year (championships only)
+        date_start: Earliest competition start date (competitions only)
+        date_end: Latest competition start date (competitions only)
+        category_id: Only events with a round of this category
+        eligible_group_id: Only events open to this eligible group of clubs
+        page: 1-based page number
+        page_size: Rows per page
     
-    response = supabase.table("club_competition").select("club_competition_id, name, date_start")\
-        .in_("club_competition_id", competition_ids)\
-        .gte("date_start", today)\
-        .execute()
+    Returns:
+        tuple: (DataFrame of the page's events, total number of matching events)
+    """
+    if event_type == "yearly club championship":
+        function_name, id_column = "search_yearly_club_championships", "yearly_club_championship_id"
+        params = {"p_year": year}
+    else:
+        function_name, id_column = "search_club_competitions", "club_competition_id"
+        params = {
+            "p_date_start": date_start.isoformat() if date_start else None,
+            "p_date_end": date_end.isoformat() if date_end else None,
+        }
+    params["p_category_id"] = category_id
+    params["p_eligible_group_id"] = eligible_group_id
     
-    return {row['name']: row['club_competition_id'] for row in response.data}
+    try:
+        offset = (page - 1) * page_size
+        response = supabase.rpc(function_name, params, count="exact")\
+            .order(id_column)\
+            .range(offset, offset + page_size - 1)\
+            .execute()
+        return pd.DataFrame(response.data or []), response.count or 0
+    except Exception as e:
+        print(f"Error searching events: {e}")
+        return pd.DataFrame(), 0
@@ -1,11 +1,167 @@
 import os
-from supabase import create_client, Client
+import asyncio
+import threading
+import time
+import httpx
+from supabase import create_client, acreate_client, Client
 import streamlit as st
 from dotenv import load_dotenv
 
 # Load environment variables
 load_dotenv()
 
+# HTTP connection pool settings (shared by every session in this process)
+SUPABASE_MAX_CONNECTIONS = int(os.getenv("SUPABASE_MAX_CONNECTIONS", "100"))
+SUPABASE_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("SUPABASE_MAX_KEEPALIVE_CONNECTIONS", "20"))
+SUPABASE_KEEPALIVE_EXPIRY = float(os.getenv("SUPABASE_KEEPALIVE_EXPIRY", "30"))
+SUPABASE_HTTP2 = os.getenv("SUPABASE_HTTP2", "true").lower() in ("1", "true", "yes")
+SUPABASE_TIMEOUT = float(os.getenv("SUPABASE_TIMEOUT", "30"))
+SUPABASE_POOL_TIMEOUT = float(os.getenv("SUPABASE_POOL_TIMEOUT", "10"))
+
+@st.cache_resource
+def _get_pool_state():
+    """Request counters for the shared HTTP clients"""
+    return {
+        "lock": threading.Lock(),
+        "in_flight": 0,
+        "peak_in_flight": 0,
+        "requests_total": 0,
+        "errors_total": 0,
+        "pool_timeouts": 0,
+        "seconds_total": 0.0,
+    }
+
+def _track_request(state, started, error=None):
+    """Update pool counters when a request starts (started=None) or finishes"""
+    with state["lock"]:
+        if started is None:
+            state["in_flight"] += 1
+            state["requests_total"] += 1
+            state["peak_in_flight"] = max(state["peak_in_flight"], state["in_flight"])
+            return
+        state["in_flight"] -= 1
+        state["seconds_total"] += time.monotonic() - started
+        if isinstance(error, httpx.PoolTimeout):
+            state["pool_timeouts"] += 1
+        elif error is not None:
+            state["errors_total"] += 1
+
+def _pool_settings():
+    """httpx limits/timeout built from the SUPABASE_* environment variables"""
+    limits = httpx.Limits(
+        max_connections=SUPABASE_MAX_CONNECTIONS,
+        max_keepalive_connections=SUPABASE_MAX_KEEPALIVE_CONNECTIONS,
+        keepalive_expiry=SUPABASE_KEEPALIVE_EXPIRY,
+    )
+    timeout = httpx.Timeout(SUPABASE_TIMEOUT, pool=SUPABASE_POOL_TIMEOUT)
+    return limits, timeout
+
+def _build_http_client():
+    """Thread-safe pooled httpx client whose transport records pool metrics"""
+    limits, timeout = _pool_settings()
+    transport = httpx.HTTPTransport(http2=SUPABASE_HTTP2, limits=limits)
+    handle_request = transport.handle_request
+    state = _get_pool_state()
+
+    def metered_handle_request(request):
+        started = time.monotonic()
+        _track_request(state, None)
+        try:
+            response = handle_request(request)
+        except Exception as e:
+            _track_request(state, started, e)
+            raise
+
+        # The connection is in use until the body is read and closed, not just until the headers arrive
+        close = response.stream.close
+        finished = []
+
+        def metered_close():
+            try:
+                close()
+            finally:
+                if not finished:
+                    finished.append(True)
+                    _track_request(state, started)
+
+        response.stream.close = metered_close
+        return response
+
+    transport.handle_request = metered_handle_request
+    return httpx.Client(transport=transport, timeout=timeout, follow_redirects=True)
+
+def _build_async_http_client():
+    """Async counterpart of _build_http_client, sharing the same metrics"""
+    limits, timeout = _pool_settings()
+    transport = httpx.AsyncHTTPTransport(http2=SUPABASE_HTTP2, limits=limits)
+    handle_async_request = transport.handle_async_request
+    state = _get_pool_state()
+
+    async def metered_handle_async_request(request):
+        started = time.monotonic()
+        _track_request(state, None)
+        try:
+            response = await handle_async_request(request)
+        except Exception as e:
+            _track_request(state, started, e)
+            raise
+
+        aclose = response.stream.aclose
+        finished = []
+
+        async def metered_aclose():
+            try:
+                await aclose()
+            finally:
+                if not finished:
+                    finished.append(True)
+                    _track_request(state, started)
+
+        response.stream.aclose = metered_aclose
+        return response
+
+    transport.handle_async_request = metered_handle_async_request
+    return httpx.AsyncClient(transport=transport, timeout=timeout, follow_redirects=True)
+
+def get_pool_stats():
+    """
+    Get connection pool metrics for the shared Supabase clients.
+
+    Returns:
+        dict with pool settings, in-flight/peak request counts, totals, pool timeouts,
+        average request time and saturation (in-flight requests / max connections)
+    """
+    state = _get_pool_state()
+    with state["lock"]:
+        finished = state["requests_total"] - state["in_flight"]
+        return {
+            "max_connections": SUPABASE_MAX_CONNECTIONS,
+            "max_keepalive_connections": SUPABASE_MAX_KEEPALIVE_CONNECTIONS,
+            "http2": SUPABASE_HTTP2,
+            "in_flight": state["in_flight"],
+            "peak_in_flight": state["peak_in_flight"],
+            "requests_total": state["requests_total"],
+            "errors_total": state["errors_total"],
+            "pool_timeouts": state["pool_timeouts"],
+            "avg_request_seconds": round(state["seconds_total"] / finished, 4) if finished else None,
+            "saturation": round(state["in_flight"] / SUPABASE_MAX_CONNECTIONS, 3),
+            "peak_saturation": round(state["peak_in_flight"] / SUPABASE_MAX_CONNECTIONS, 3),
+        }
+
+def _use_pooled_postgrest(client, http_client):
+    """
+    Route only the PostgREST sub-client (table/rpc queries) through the pooled httpx client.
+
+    supabase-py hands ClientOptions.httpx_client to postgrest, storage, functions and auth
+    alike, and each of them rewrites the client's base_url and headers, so one httpx client
+    cannot be shared between them. Storage, functions and auth keep their own default clients.
+    The override survives the postgrest client being rebuilt after an auth token change.
+    """
+    init_postgrest_client = type(client)._init_postgrest_client
+    client._init_postgrest_client = lambda **kwargs: init_postgrest_client(**{**kwargs, "http_client": http_client})
+    client._postgrest = None
+    return client
+
 # Initialize Supabase client
 @st.cache_resource
 def init_supabase():
@@ -16,6 +172,76 @@ def init_supabase():
         st.error(f"Missing Supabase environment variables. URL: {url}, Key: {'***' if key else None}")
         st.stop()
     
-    return create_client(url, key)
+    return _use_pooled_postgrest(create_client(url, key), _build_http_client())
 
 supabase: Client = init_supabase()
+
+# Initialize async Supabase client on its own event loop thread
+@st.cache_resource
+def init_async_supabase():
+    """
+    Create an async Supabase client bound to a background event loop.
+
+    Streamlit scripts are synchronous, so the loop runs forever in a daemon thread
+    and callers submit coroutines to it. Returns (client, loop). If the client cannot
+    be created the loop is stopped and the error is raised; cache_resource does not
+    cache exceptions, so the next call tries again.
+    """
+    url = os.getenv("SUPABASE_URL")
+    key = os.getenv("SUPABASE_ANON_KEY")
+
+    loop = asyncio.new_event_loop()
+    thread = threading.Thread(target=loop.run_forever, name="supabase-async-loop", daemon=True)
+    thread.start()
+    try:
+        client = asyncio.run_coroutine_threadsafe(acreate_client(url, key), loop).result(SUPABASE_TIMEOUT)
+    except Exception:
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join()
+        loop.close()
+        raise
+    _use_pooled_postgrest(client, _build_async_http_client())
+    return client, loop
+
+def run_queries_concurrently(queries, timeout=SUPABASE_TIMEOUT):
+    """
+    Run independent Supabase queries at the same time and wait for all of them.
+
+    Args:
+        queries: Dict mapping a name to a function that takes a client and returns an
+                 unexecuted query, e.g. {"archer": lambda db: db.table("archer").select("*").eq("archer_id", 1)}
+        timeout: Seconds to wait for all queries (defaults to SUPABASE_TIMEOUT; None waits forever)
+
+    Returns:
+        Dict mapping each name to its response (same object `.execute()` returns)
+
+    Raises:
+        The first exception raised by any query, after all of them have finished,
+        or TimeoutError if they do not finish within timeout
+    """
+    try:
+        client, loop = init_async_supabase()
+    except Exception as e:
+        # Same builders work on the sync client, just one after another
+        print(f"Error creating async Supabase client, falling back to sequential queries: {e}")
+        return {name: build(supabase).execute() for name, build in queries.items()}
+
+    async def _gather():
+        names = list(queries)
+        results = await asyncio.gather(
+            *(queries[name](client).execute() for name in names),
+            return_exceptions=True
+        )
+        return dict(zip(names, results))
+
+    future = asyncio.run_coroutine_threadsafe(_gather(), loop)
+    try:
+        results = future.result(timeout)
+    except Exception:
+        # Do not leave a hung request running on the loop
+        future.cancel()
+        raise
+    for result in results.values():
+        if isinstance(result, Exception):
+            raise result
+    return results
@@ -0,0 +1,65 @@
+"""
+Keyset-paginated reader for the participating table.
+
+A single `.execute()` is silently capped by PostgREST's max-rows setting, so large
+championships came back truncated. These generators page through participating in
+primary key order (participating_id, event_context_id, type) and yield one chunk at a
+time, so callers can aggregate incrementally with bounded memory.
+"""
+from utility_function.initilize_dbconnection import supabase
+import pandas as pd
+import os
+
+PARTICIPATING_CHUNK_SIZE = int(os.getenv("PARTICIPATING_CHUNK_SIZE", "1000"))
+
+_KEY_COLUMNS = ["participating_id", "event_context_id", "type"]
+
+
+def _after_key_filter(last_row):
+    """PostgREST or-filter selecting rows whose primary key sorts after last_row"""
+    pid = last_row["participating_id"]
+    ecid = last_row["event_context_id"]
+    ptype = last_row["type"]
+    return (
+        f"participating_id.gt.{pid},"
+        f"and(participating_id.eq.{pid},event_context_id.gt.{ecid}),"
+        f"and(participating_id.eq.{pid},event_context_id.eq.{ecid},type.gt.{ptype})"
+    )
+
+
+def iter_participating_chunks(select_cols="*", apply_filters=None, chunk_size=None, as_dataframe=False):
+    """
+    Yield participating rows one page at a time.
+
+    Args:
+        select_cols: PostgREST select string (embeds allowed); key columns are added if missing
+        apply_filters: Optional function taking the query builder and returning it with filters applied,
+                       e.g. lambda q: q.eq("type", "competition").eq("event_context.round_id", 3)
+        chunk_size: Rows per request (defaults to PARTICIPATING_CHUNK_SIZE)
+        as_dataframe: Yield pandas DataFrames instead of lists of dicts
+
+    Yields:
+        list of row dicts (or DataFrame) per page, until the table is exhausted
+    """
+    chunk_size = chunk_size or PARTICIPATING_CHUNK_SIZE
+    listed = [c.strip() for c in select_cols.split(",")]
+    if "*" not in listed:
+        missing = [k for k in _KEY_COLUMNS if k not in listed]
+        if missing:
+            select_cols = ", ".join(missing) + ", " + select_cols
+
+    last_row = None
+    while True:
+        query = supabase.table("participating").select(select_cols)
+        if apply_filters:
+            query = apply_filters(query)
+        if last_row is not None:
+            query = query.or_(_after_key_filter(last_row))
+        query = query.order("participating_id").order("event_context_id").order("type").limit(chunk_size)
+
+        rows = query.execute().data or []
+        # Stop on an empty page rather than a short one: a short page may just be the server's max-rows cap
+        if not rows:
+            return
+        last_row = rows[-1]
+        yield pd.DataFrame(rows) if as_dataframe else rows
@@ -1,5 +1,9 @@
 
-from utility_function.initilize_dbconnection import supabase
+from utility_function.initilize_dbconnection import supabase, run_queries_concurrently
+from utility_function.reference_cache import get_table
+from utility_function.participating_reader import PARTICIPATING_CHUNK_SIZE
+from utility_function.score_cube import get_score_cube, group_totals
+from utility_function.category_percentile import get_category_distribution, archer_percentile
 import streamlit as st
 import pandas as pd
 
@@ -15,8 +19,7 @@ def _safe_dict(lst, key_name, id_name):
 
 def get_club_competitions():
     try:
-        res = supabase.table("club_competition").select("club_competition_id,name").execute()
-        return _safe_dict(res.data or [], "name", "club_competition_id")
+        return _safe_dict(get_table("club_competition"), "name", "club_competition_id")
     except Exception as e:
         st.warning(f"Could not load club competitions: {e}")
         return {}
@@ -31,8 +34,7 @@ def get_yearly_championships():
 
 def get_rounds():
     try:
-        res = supabase.table("round").select("round_id,name").execute()
-        return _safe_dict(res.data or [], "name", "round_id")
+        return _safe_dict(get_table("round"), "name", "round_id")
     except Exception as e:
         st.warning(f"Could not load rounds: {e}")
         return {}
@@ -59,16 +61,31 @@ def get_archers():
         st.warning(f"Could not load archers: {e}")
         return {}
 
+def get_filter_maps():
+    """
+    Load the club competition, round, yearly championship and archer maps together.
+    Club competitions and rounds come from the reference cache; the other two
+    tables are queried concurrently.
+
+    Returns: (club_map, round_map, yc_map, archer_map)
+    """
+    try:
+        responses = run_queries_concurrently({
+            "yearly": lambda db: db.table("yearly_club_championship").select("yearly_club_championship_id,name"),
+            "archers": lambda db: db.table("account").select("account_id,fullname,role").eq("role","archer"),
+        })
+    except Exception:
+        # Fall back to loading each map on its own (each one reports its own error)
+        return get_club_competitions(), get_rounds(), get_yearly_championships(), get_archers()
+
+    yc_map = _safe_dict(responses["yearly"].data or [], "name", "yearly_club_championship_id")
+    archer_map = {row["fullname"]: row["account_id"] for row in (responses["archers"].data or []) if row.get("fullname") and row.get("account_id")}
+    return get_club_competitions(), get_rounds(), yc_map, archer_map
+
 # ========================
 # Helper utilities
 # ========================
 
-def _compute_sum_score(row):
-    keys = ["score_1st_arrow","score_2nd_arrow","score_3rd_arrow","score_4th_arrow","score_5th_arrow","score_6th_arrow"]
-    if all(k in row for k in keys):
-        return sum((row.get(k) or 0) for k in keys)
-    return row.get("sum_score", 0)
-
 def _participant_label(rec):
     """Return a display label for the archer: 'fullname (participating_id)'."""
     name = None
@@ -85,96 +102,95 @@ def _participant_label(rec):
 # Core fetcher
 # ========================
 
-def _fetch_participating_base(club_competition_id=None, round_id=None, archer_account_id=None, yearly_championship_id=None):
+def _fetch_score_totals_on_server(group_by=None, round_id=None, archer_account_id=None):
     """
-    Base fetcher: participating + event_context + archer→account join.
-    Joins are implicit based on FKs:
-        participating.participating_id → archer.archer_id → account.account_id
+    aggregate_participant_scores over every competition, filtered on the round and archer on the server,
+    paged so results are complete past PostgREST's max-rows limit.
+    Returns a DataFrame with columns participant, [group_by], sum_score.
     """
+    rows = []
     try:
-        select_cols = (
-            "participating_id, sum_score, "
-            "score_1st_arrow,score_2nd_arrow,score_3rd_arrow,"
-            "score_4th_arrow,score_5th_arrow,score_6th_arrow, "
-            "event_context!inner(event_context_id,yearly_club_championship_id,club_competition_id,round_id,range_id,end_order), "
-            "archer!inner(account!inner(fullname))"
-        )
-        query = supabase.table("participating").select(select_cols).eq("type","competition")
+        while True:
+            page = supabase.rpc("aggregate_participant_scores", {
+                "p_group_by": group_by,
+                "p_round_id": round_id or None,
+                "p_archer_account_id": archer_account_id or None,
+            }).order("participating_id").order("group_key").range(len(rows), len(rows) + PARTICIPATING_CHUNK_SIZE - 1).execute().data or []
+            if not page:
+                break
+            rows.extend(page)
+    except Exception as e:
+        st.warning(f"Error fetching aggregated scores: {e}")
+        return pd.DataFrame()
+    if not rows: return pd.DataFrame()
 
-        if club_competition_id:
-            query = query.eq("event_context.club_competition_id", club_competition_id)
-        if yearly_championship_id:
-            query = query.eq("event_context.yearly_club_championship_id", yearly_championship_id)
-        if round_id:
-            query = query.eq("event_context.round_id", round_id)
-        if archer_account_id:
-            # nested filter through archer → account
-            query = query.eq("archer.account.account_id", archer_account_id)
+    df = pd.DataFrame({
+        "participant": [_participant_label(r) for r in rows],
+        "group_key": [r.get("group_key") for r in rows],
+        "sum_score": [r.get("sum_score") or 0 for r in rows],
+    })
+    if group_by:
+        df = df.rename(columns={"group_key": group_by}).sort_values(["participant", group_by])
+    else:
+        df = df.drop(columns="group_key").sort_values("participant")
+    return df.reset_index(drop=True)
 
-        res = query.execute()
-        return res.data or []
+def _fetch_score_totals(group_by=None, club_competition_id=None, round_id=None, archer_account_id=None, yearly_championship_id=None):
+    """
+    Vectorized group-by over the cached score cube of a club competition or yearly championship:
+    one row per participant (and per group_by value when given). Without either, the totals are
+    aggregated on the server instead, so no cube of the whole participating table is built.
+    group_by: 'end_order', 'range_id', 'round_id' or None.
+    Returns a DataFrame with columns participant, [group_by], sum_score.
+    """
+    if not club_competition_id and not yearly_championship_id:
+        return _fetch_score_totals_on_server(group_by, round_id, archer_account_id)
+
+    try:
+        cube = get_score_cube(club_competition_id, yearly_championship_id)
     except Exception as e:
         st.warning(f"Error fetching participating data: {e}")
-        return []
+        return pd.DataFrame()
+
+    # archer.archer_id is the account_id, so the participant filter is on participating_id
+    totals = group_totals(cube, group_by, round_id=round_id or None, participating_id=archer_account_id or None)
+    if totals.empty: return pd.DataFrame()
+
+    names = cube["names"]
+    totals.insert(0, "participant", [
+        _participant_label({"participating_id": pid, "fullname": names.get(pid)}) for pid in totals["participating_id"]
+    ])
+    df = totals.drop(columns=["participating_id", "count"])
+    df = df.sort_values(["participant", group_by] if group_by else "participant")
+    return df.reset_index(drop=True)
 
 # ---------------------------
 # View Sum Score - helpers
 # ---------------------------
 def fetch_scores_per_end(club_competition_id=None, round_id=None, archer_account_id=None):
-    rows = _fetch_participating_base(club_competition_id, round_id, archer_account_id)
-    if not rows: return pd.DataFrame()
-    out = []
-    for r in rows:
-        out.append({
-            "participant": _participant_label(r),
-            "end_order": (r.get("event_context") or {}).get("end_order"),
-            "sum_score": _compute_sum_score(r)
-        })
-    df = pd.DataFrame(out)
-    return df.groupby(["participant","end_order"], as_index=False)["sum_score"].sum()
+    return _fetch_score_totals("end_order", club_competition_id, round_id, archer_account_id)
 
 def fetch_scores_per_range(club_competition_id=None, round_id=None, archer_account_id=None):
-    rows = _fetch_participating_base(club_competition_id, round_id, archer_account_id)
-    if not rows: return pd.DataFrame()
-    out = []
-    for r in rows:
-        out.append({
-            "participant": _participant_label(r),
-            "range_id": (r.get("event_context") or {}).get("range_id"),
-            "sum_score": _compute_sum_score(r)
-        })
-    df = pd.DataFrame(out)
-    return df.groupby(["participant","range_id"], as_index=False)["sum_score"].sum()
+    return _fetch_score_totals("range_id", club_competition_id, round_id, archer_account_id)
 
 def fetch_scores_per_round(club_competition_id=None, round_id=None, archer_account_id=None):
-    rows = _fetch_participating_base(club_competition_id, round_id, archer_account_id)
-    if not rows: return pd.DataFrame()
-    out = []
-    for r in rows:
-        out.append({
-            "participant": _participant_label(r),
-            "round_id": (r.get("event_context") or {}).get("round_id"),
-            "sum_score": _compute_sum_score(r)
-        })
-    df = pd.DataFrame(out)
-    return df.groupby(["participant","round_id"], as_index=False)["sum_score"].sum().sort_values("sum_score", ascending=False)
+    df = _fetch_score_totals("round_id", club_competition_id, round_id, archer_account_id)
+    if df.empty: return df
+    return df.sort_values("sum_score", ascending=False)
 
 # ---------------------------
 # Yearly normalized average
 # ---------------------------
 def _max_score_for_round(round_id):
     """
-    Derive max score for a round via event_context ends: (#unique (range_id,end_order)) * 6 * 10.
-    If your schema has a stored max per round, prefer that instead.
+    Max score for a round from the round_structure table (total ends * arrows per end * max score per arrow),
+    kept current by a trigger on event_context and served from the reference cache.
     """
     try:
-        q = supabase.table("event_context").select("round_id, range_id, end_order").eq("round_id", round_id).execute()
-        rows = q.data or []
-        if not rows:
-            return None
-        ends = {(r.get("range_id"), r.get("end_order")) for r in rows if r.get("end_order") is not None}
-        total_arrows = len(ends) * 6
-        return total_arrows * 10 if total_arrows else None
+        for row in get_table("round_structure"):
+            if row.get("round_id") == round_id:
+                return row.get("max_total_score") or None
+        return None
     except Exception as e:
         st.info(f"Could not derive max score for round {round_id}: {e}")
         return None
@@ -183,54 +199,100 @@ def fetch_yearly_normalized_average(yc_id=None, round_id=None, archer_account_id
     """
     Aggregate the same round across *all* club competitions inside a Yearly Club Championship,
     using the event_context.yearly_club_championship_id linkage from your schema.
+    Each competition's round total is normalized by the round's max score (A = B / C),
+    then averaged per archer, as in fetch_ranking_yearly_same_round.
     """
     if not yc_id or not round_id:
         st.info("Please select both a Yearly Club Championship and a Round.")
         return pd.DataFrame()
 
-    # Fetch participating rows filtered by yearly and round directly via event_context
-    rows = _fetch_participating_base(
-        club_competition_id=None,
-        round_id=round_id,
-        archer_account_id=archer_account_id,
-        yearly_championship_id=yc_id
-    )
-    if not rows:
+    # Group the yearly championship's cached score cube by participant and competition: round totals
+    try:
+        cube = get_score_cube(yearly_championship_id=yc_id)
+    except Exception as e:
+        st.warning(f"Error fetching participating data: {e}")
+        return pd.DataFrame()
+    totals = group_totals(cube, "club_competition_id", round_id=round_id, participating_id=archer_account_id or None)
+    if totals.empty:
         return pd.DataFrame()
 
     max_score = _max_score_for_round(round_id)
-    if not max_score:
-        st.info("Could not determine max score for the selected round — falling back to raw averages. # placeholder")
-        max_score = None
-
-    out = []
-    for r in rows:
-        s = _compute_sum_score(r)
-        norm = (s / max_score) if max_score else None
-        out.append({"participant": _participant_label(r), "sum_score": s, "normalized": norm})
-
-    df = pd.DataFrame(out)
-    if "normalized" in df.columns and df["normalized"].notna().any():
+    df = totals.assign(participant=[
+        _participant_label({"participating_id": pid, "fullname": cube["names"].get(pid)}) for pid in totals["participating_id"]
+    ])
+    if max_score:
+        df["normalized"] = df["sum_score"] / max_score
         agg = df.groupby("participant", as_index=False).agg(normalized_avg=("normalized","mean"))
         return agg.sort_values("normalized_avg", ascending=False)
     else:
+        st.info("Could not determine max score for the selected round — falling back to raw averages.")
         agg = df.groupby("participant", as_index=False).agg(raw_avg=("sum_score","mean"))
         return agg.sort_values("raw_avg", ascending=False)
 
 # ---------------------------
 # Rankings
 # ---------------------------
+def _fetch_leaderboard(club_competition_id=None, round_id=None, yearly_championship_id=None):
+    """
+    Read round_leaderboard: running totals per (club competition, round, archer) kept current
+    by a trigger on participating, so no score rows need to be scanned.
+    """
+    try:
+        query = supabase.table("round_leaderboard").select(
+            "club_competition_id, round_id, archer_id, total_score, ends_shot, "
+            "archer!inner(account!inner(fullname))"
+        )
+        if club_competition_id:
+            query = query.eq("club_competition_id", club_competition_id)
+        if yearly_championship_id:
+            query = query.eq("yearly_club_championship_id", yearly_championship_id)
+        if round_id:
+            query = query.eq("round_id", round_id)
+        res = query.order("total_score", desc=True).execute()
+        rows = res.data or []
+        for r in rows:
+            r["participating_id"] = r.get("archer_id")
+        return rows
+    except Exception as e:
+        st.warning(f"Error fetching leaderboard: {e}")
+        return []
+
 def fetch_ranking_in_round(club_competition_id=None, round_id=None):
-    rows = _fetch_participating_base(club_competition_id, round_id, None)
+    rows = _fetch_leaderboard(club_competition_id, round_id)
     if not rows: return pd.DataFrame()
     df = pd.DataFrame([
-        {"participant": _participant_label(r), "sum_score": _compute_sum_score(r)}
+        {"participant": _participant_label(r), "sum_score": r.get("total_score") or 0}
         for r in rows
     ])
     return df.groupby("participant", as_index=False)["sum_score"].sum().sort_values("sum_score", ascending=False)
 
 def fetch_ranking_yearly_same_round(yc_id=None, round_id=None):
-    return fetch_yearly_normalized_average(yc_id, round_id, None)
+    """
+    Rank archers on the same round across every club competition of a yearly championship.
+    Each competition's round total is normalized by the round's max score (A = B / C),
+    then averaged per archer.
+    """
+    if not yc_id or not round_id:
+        st.info("Please select both a Yearly Club Championship and a Round.")
+        return pd.DataFrame()
+
+    rows = _fetch_leaderboard(round_id=round_id, yearly_championship_id=yc_id)
+    if not rows:
+        return pd.DataFrame()
+
+    max_score = _max_score_for_round(round_id)
+    df = pd.DataFrame([
+        {"participant": _participant_label(r), "sum_score": r.get("total_score") or 0}
+        for r in rows
+    ])
+    if max_score:
+        df["normalized"] = df["sum_score"] / max_score
+        agg = df.groupby("participant", as_index=False).agg(normalized_avg=("normalized","mean"))
+        return agg.sort_values("normalized_avg", ascending=False)
+    else:
+        st.info("Could not determine max score for the selected round — falling back to raw averages.")
+        agg = df.groupby("participant", as_index=False).agg(raw_avg=("sum_score","mean"))
+        return agg.sort_values("raw_avg", ascending=False)
 
 # ---------------------------
 # Category percentile
@@ -240,27 +302,19 @@ def fetch_category_percentile_distribution(archer_account_id=None, category_id=N
         st.info("Please select a category.")
         return pd.DataFrame(), None
     try:
-        # Schema: archer_id, category_id, percentile
-        q = supabase.table("category_rating_percentile").select("archer_id, category_id, percentile").eq("category_id", category_id)
-        res = q.execute()
-        rows = res.data or []
+        # Sorted percentiles of the category, cached and refreshed incrementally from verified scores
+        dist = get_category_distribution(category_id)
     except Exception as e:
         st.warning(f"Could not load category rating distribution: {e}")
         return pd.DataFrame(), None
 
-    if not rows:
+    if not len(dist["archer_ids"]):
         return pd.DataFrame(), None
 
-    df = pd.DataFrame(rows).rename(columns={"archer_id":"archer_account_id","percentile":"c_score"})
-    df = df[["archer_account_id","c_score"]].dropna()
+    df = pd.DataFrame({"archer_account_id": dist["archer_ids"], "c_score": dist["percentiles"]})
 
     my_percentile = None
-    if archer_account_id is not None and archer_account_id in set(df["archer_account_id"]):
-        d_sorted = df.sort_values("c_score").reset_index(drop=True)
-        idx_list = d_sorted.index[d_sorted["archer_account_id"] == archer_account_id].tolist()
-        if idx_list:
-            idx0 = idx_list[0]
-            m = len(d_sorted)
-            my_percentile = ((idx0 + 1) / m) * 100.0
+    if archer_account_id is not None:
+        my_percentile = archer_percentile(category_id, archer_account_id)
 
     return df, my_percentile
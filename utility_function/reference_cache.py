@@ -0,0 +1,96 @@
+"""
+Process-wide cache for reference tables.
+
+Equipment, disciplines, age divisions, categories, rounds (and their end
+structure), ranges, target faces, clubs and club competitions change a few times a month but are read on almost
+every rerun. Rows are kept for REFERENCE_CACHE_TTL seconds and shared by all
+sessions; the write helpers in category_utility / club_utility / event_utility
+call invalidate() so new rows show up immediately.
+"""
+from utility_function.initilize_dbconnection import supabase
+import streamlit as st
+import threading
+import time
+import os
+
+REFERENCE_CACHE_TTL = int(os.getenv("REFERENCE_CACHE_TTL", "3600"))
+
+REFERENCE_TABLES = (
+    "equipment", "discipline", "age_division", "category",
+    "round", "round_structure", "range", "target_face", "club", "club_competition",
+)
+
+
+@st.cache_resource
+def _get_cache_state():
+    """Shared state for every session in this process"""
+    return {
+        "lock": threading.Lock(),
+        "entries": {},   # table -> {"rows": [...], "loaded_at": float}
+        "versions": {t: 0 for t in REFERENCE_TABLES},
+        "hits": {t: 0 for t in REFERENCE_TABLES},
+        "misses": {t: 0 for t in REFERENCE_TABLES},
+    }
+
+
+def get_table(table):
+    """
+    Get all rows of a reference table, loading it from Supabase on a miss.
+
+    Args:
+        table: One of REFERENCE_TABLES
+
+    Returns:
+        list of row dicts (shared between sessions, do not modify)
+    """
+    if table not in REFERENCE_TABLES:
+        raise ValueError(f"{table} is not a cached reference table")
+
+    state = _get_cache_state()
+    with state["lock"]:
+        entry = state["entries"].get(table)
+        if entry and time.monotonic() - entry["loaded_at"] < REFERENCE_CACHE_TTL:
+            state["hits"][table] += 1
+            return entry["rows"]
+        state["misses"][table] += 1
+        version = state["versions"][table]
+
+    rows = supabase.table(table).select("*").execute().data or []
+
+    with state["lock"]:
+        # Skip storing if the table was invalidated while we were loading it
+        if state["versions"][table] == version:
+            state["entries"][table] = {"rows": rows, "loaded_at": time.monotonic()}
+    return rows
+
+
+def invalidate(*tables):
+    """Drop cached rows so the next read reloads them. Invalidates every table when none are given."""
+    state = _get_cache_state()
+    with state["lock"]:
+        for table in tables or REFERENCE_TABLES:
+            state["versions"][table] += 1
+            state["entries"].pop(table, None)
+
+
+def get_cache_stats():
+    """
+    Get hit/miss counters for each reference table.
+
+    Returns:
+        dict mapping table name to {"hits", "misses", "version", "cached", "age_seconds"}
+    """
+    state = _get_cache_state()
+    now = time.monotonic()
+    with state["lock"]:
+        stats = {}
+        for table in REFERENCE_TABLES:
+            entry = state["entries"].get(table)
+            stats[table] = {
+                "hits": state["hits"][table],
+                "misses": state["misses"][table],
+                "version": state["versions"][table],
+                "cached": entry is not None,
+                "age_seconds": round(now - entry["loaded_at"], 1) if entry else None,
+            }
+        return stats
@@ -0,0 +1,273 @@
+"""
+Persistent cache of chatbot replies.
+
+Replies are stored in a local SQLite file keyed on (model, normalized prompt), so
+a repeated question is answered without calling the model, across reruns,
+sessions and restarts. Prompts are normalized (case, punctuation, whitespace,
+contractions such as "what's") before lookup; when there is no exact match, a
+small in-memory index of the cached prompts finds rewordings with the same
+content words in the same order, differing only in stopwords ("what is a recurve
+bow" / "what's the recurve bow?"). Questions that differ in any content word
+("maximum" / "minimum", "indoor" / "outdoor") never share a reply. Entries expire after RESPONSE_CACHE_TTL
+seconds and the least recently used ones are evicted beyond
+RESPONSE_CACHE_MAX_ENTRIES entries or RESPONSE_CACHE_MAX_BYTES of reply text.
+"""
+import streamlit as st
+import unicodedata
+import threading
+import sqlite3
+import time
+import re
+import os
+
+APP_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESPONSE_CACHE_PATH = os.getenv("RESPONSE_CACHE_PATH", os.path.join(APP_ROOT, "cache", "chatbot_responses.sqlite3"))
+RESPONSE_CACHE_TTL = int(os.getenv("RESPONSE_CACHE_TTL", "604800"))
+RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "2000"))
+RESPONSE_CACHE_MAX_BYTES = int(os.getenv("RESPONSE_CACHE_MAX_BYTES", str(20 * 1024 * 1024)))
+
+# Paraphrase matching needs at least this many content words, so short prompts only match exactly
+MIN_SIMILARITY_TERMS = 2
+
+# Expanded before tokenizing, so "what's" and "what is" share a key; "'s" as a possessive
+# becomes the stopword "is" and drops out of the content words like the bare "s" would
+CONTRACTIONS = (
+    (re.compile(r"\bcan't\b"), "can not"),
+    (re.compile(r"\bwon't\b"), "will not"),
+    (re.compile(r"n't\b"), " not"),
+    (re.compile(r"'s\b"), " is"),
+    (re.compile(r"'re\b"), " are"),
+    (re.compile(r"'m\b"), " am"),
+    (re.compile(r"'ll\b"), " will"),
+    (re.compile(r"'ve\b"), " have"),
+    (re.compile(r"'d\b"), " would"),
+)
+
+# Question words are kept: "what is a clout" and "how is a clout scored" must not match
+STOPWORDS = frozenset(
+    "a an the is are was were be been am of to in on at for from by with and or "
+    "do does did can could would should i me my you your it its this that these those please tell about".split()
+)
+
+
+def normalize_prompt(prompt):
+    """Cache key of a prompt: lower case, contractions expanded, punctuation removed, whitespace collapsed (accents are kept)"""
+    text = unicodedata.normalize("NFKC", prompt).lower().replace("\u2019", "'")
+    for pattern, expansion in CONTRACTIONS:
+        text = pattern.sub(expansion, text)
+    return " ".join(re.findall(r"\w+", text))
+
+
+def _content_terms(prompt_key):
+    """Content words of a normalized prompt, in order"""
+    return tuple(t for t in prompt_key.split() if len(t) > 1 and t not in STOPWORDS)
+
+
+def _connect():
+    os.makedirs(os.path.dirname(RESPONSE_CACHE_PATH), exist_ok=True)
+    connection = sqlite3.connect(RESPONSE_CACHE_PATH, check_same_thread=False, isolation_level=None)
+    connection.execute("PRAGMA journal_mode=WAL")
+    connection.execute("""
+        CREATE TABLE IF NOT EXISTS response_cache (
+            model TEXT NOT NULL,
+            prompt_key TEXT NOT NULL,
+            prompt TEXT NOT NULL,
+            response TEXT NOT NULL,
+            size INTEGER NOT NULL,
+            created_at REAL NOT NULL,
+            last_used_at REAL NOT NULL,
+            hits INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (model, prompt_key)
+        )
+    """)
+    connection.execute("CREATE INDEX IF NOT EXISTS response_cache_last_used ON response_cache (last_used_at)")
+    return connection
+
+
+@st.cache_resource
+def _get_cache_state():
+    """SQLite connection and similarity indexes shared by every session in this process"""
+    return {
+        "lock": threading.Lock(),
+        "connection": _connect(),
+        "indexes": {},   # model -> {"terms": {prompt_key: content words}, "postings": {content words: set of prompt_key}}
+        "hits": 0,
+        "similar_hits": 0,
+        "misses": 0,
+    }
+
+
+def _index_for(state, model):
+    """Similarity index of one model's cached prompts, loaded from SQLite on first use (lock held)"""
+    index = state["indexes"].get(model)
+    if index is None:
+        index = {"terms": {}, "postings": {}}
+        rows = state["connection"].execute(
+            "SELECT prompt_key FROM response_cache WHERE model = ? AND created_at >= ?",
+            (model, time.time() - RESPONSE_CACHE_TTL),
+        ).fetchall()
+        for (prompt_key,) in rows:
+            _index_add(index, prompt_key)
+        state["indexes"][model] = index
+    return index
+
+
+def _index_add(index, prompt_key):
+    terms = _content_terms(prompt_key)
+    index["terms"][prompt_key] = terms
+    index["postings"].setdefault(terms, set()).add(prompt_key)
+
+
+def _index_remove(state, model, prompt_key):
+    index = state["indexes"].get(model)
+    if index is None:
+        return
+    terms = index["terms"].pop(prompt_key, None)
+    keys = index["postings"].get(terms)
+    if keys is not None:
+        keys.discard(prompt_key)
+        if not keys:
+            del index["postings"][terms]
+
+
+def _most_similar(index, prompt_key):
+    """
+    Cached prompt with the same content words in the same order, i.e. one whose differing
+    words are all stopwords, or None. Of several, the one sharing the most words is returned.
+    """
+    terms = _content_terms(prompt_key)
+    if len(terms) < MIN_SIMILARITY_TERMS:
+        return None
+    words = set(prompt_key.split())
+    return max(index["postings"].get(terms, ()), key=lambda key: (len(words & set(key.split())), key), default=None)
+
+
+def lookup_response(prompt, model):
+    """
+    Find a cached reply for a prompt, exactly or as a close paraphrase.
+
+    Returns:
+        dict with "response" and "match" ("exact" or "similar"), or None on a miss.
+        The cached question is not returned: the cache is shared by every user.
+    """
+    prompt_key = normalize_prompt(prompt)
+    if not prompt_key:
+        return None
+
+    state = _get_cache_state()
+    now = time.time()
+    try:
+        with state["lock"]:
+            connection = state["connection"]
+            match = "exact"
+            row = connection.execute(
+                "SELECT prompt_key, prompt, response, created_at FROM response_cache WHERE model = ? AND prompt_key = ?",
+                (model, prompt_key),
+            ).fetchone()
+            if row is None or row[3] < now - RESPONSE_CACHE_TTL:
+                similar_key = _most_similar(_index_for(state, model), prompt_key)
+                row = None
+                if similar_key is not None:
+                    match = "similar"
+                    row = connection.execute(
+                        "SELECT prompt_key, prompt, response, created_at FROM response_cache WHERE model = ? AND prompt_key = ?",
+                        (model, similar_key),
+                    ).fetchone()
+                    if row is None or row[3] < now - RESPONSE_CACHE_TTL:
+                        _index_remove(state, model, similar_key)
+                        row = None
+
+            if row is None:
+                state["misses"] += 1
+                return None
+
+            connection.execute(
+                "UPDATE response_cache SET last_used_at = ?, hits = hits + 1 WHERE model = ? AND prompt_key = ?",
+                (now, model, row[0]),
+            )
+            state["hits"] += 1
+            if match == "similar":
+                state["similar_hits"] += 1
+    except sqlite3.Error as e:
+        print(f"Error reading response cache: {e}")
+        return None
+
+    return {"response": row[2], "match": match}
+
+
+def store_response(prompt, model, response):
+    """Cache a completed reply, then drop expired entries and evict least recently used ones over the limits"""
+    prompt_key = normalize_prompt(prompt)
+    if not prompt_key or not response:
+        return
+
+    state = _get_cache_state()
+    now = time.time()
+    try:
+        with state["lock"]:
+            connection = state["connection"]
+            connection.execute(
+                "INSERT OR REPLACE INTO response_cache (model, prompt_key, prompt, response, size, created_at, last_used_at, hits) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, 0)",
+                (model, prompt_key, prompt, response, len(response.encode("utf-8")), now, now),
+            )
+            if model in state["indexes"]:
+                _index_add(state["indexes"][model], prompt_key)
+
+            cutoff = now - RESPONSE_CACHE_TTL
+            evicted = connection.execute(
+                "SELECT model, prompt_key FROM response_cache WHERE created_at < ?", (cutoff,)
+            ).fetchall()
+            entries, total_bytes = connection.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM response_cache WHERE created_at >= ?", (cutoff,)
+            ).fetchone()
+            if entries > RESPONSE_CACHE_MAX_ENTRIES or total_bytes > RESPONSE_CACHE_MAX_BYTES:
+                for old_model, old_key, size in connection.execute(
+                    "SELECT model, prompt_key, size FROM response_cache WHERE created_at >= ? ORDER BY last_used_at",
+                    (cutoff,),
+                ).fetchall():
+                    if entries <= RESPONSE_CACHE_MAX_ENTRIES and total_bytes <= RESPONSE_CACHE_MAX_BYTES:
+                        break
+                    entries -= 1
+                    total_bytes -= size
+                    evicted.append((old_model, old_key))
+
+            if evicted:
+                connection.executemany("DELETE FROM response_cache WHERE model = ? AND prompt_key = ?", evicted)
+                for old_model, old_key in evicted:
+                    _index_remove(state, old_model, old_key)
+    except sqlite3.Error as e:
+        print(f"Error writing response cache: {e}")
+
+
+def clear_response_cache():
+    """Remove every cached reply"""
+    state = _get_cache_state()
+    with state["lock"]:
+        state["connection"].execute("DELETE FROM response_cache")
+        state["indexes"].clear()
+
+
+def get_response_cache_stats():
+    """
+    Get response cache metrics for this process.
+
+    Returns:
+        dict with stored entries and bytes, hit/similar-hit/miss counters and hit rate
+    """
+    state = _get_cache_state()
+    with state["lock"]:
+        entries, total_bytes = state["connection"].execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM response_cache"
+        ).fetchone()
+        lookups = state["hits"] + state["misses"]
+        return {
+            "entries": entries,
+            "bytes": total_bytes,
+            "max_entries": RESPONSE_CACHE_MAX_ENTRIES,
+            "max_bytes": RESPONSE_CACHE_MAX_BYTES,
+            "hits": state["hits"],
+            "similar_hits": state["similar_hits"],
+            "misses": state["misses"],
+            "hit_rate": round(state["hits"] / lookups, 3) if lookups else None,
+        }
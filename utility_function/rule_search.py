@@ -0,0 +1,335 @@
+"""
+Full-text search over the bundled AA RULES PDFs.
+
+build_index() extracts the text of every rules PDF once, splits each page into
+paragraph-sized passages and writes a BM25 inverted index per PDF (a "segment")
+under search_index/rules/. Segments are named after the PDF's content hash, so a
+rebuild only re-extracts PDFs that changed. The postings, passage lengths and
+passage text are plain NumPy / byte files that the app memory-maps, so loading
+the index costs almost nothing and a search touches only the postings of the
+query terms.
+
+Run it offline with:
+    python -m utility_function.rule_search
+The app also brings the index up to date on the first search after a PDF changes.
+"""
+from pypdf import PdfReader
+import streamlit as st
+import numpy as np
+import hashlib
+import shutil
+import json
+import mmap
+import re
+import os
+
+APP_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PDF_DIR = os.path.join(APP_ROOT, "pdfs")
+RULE_PDF_PREFIX = "AA RULES"
+INDEX_DIR = os.getenv("RULE_INDEX_DIR", os.path.join(APP_ROOT, "search_index", "rules"))
+
+PASSAGE_MIN_WORDS = 25
+PASSAGE_MAX_WORDS = 150
+SNIPPET_CHARS = 280
+
+# BM25 parameters
+K1 = 1.2
+B = 0.75
+
+TOKEN_PATTERN = re.compile(r"\d+(?:\.\d+)+|[a-z0-9]+")
+# A new paragraph starts at a rule number ("4.2.1", "Schedule 4B"), an item marker ("(a)") or a blank line
+PARAGRAPH_START = re.compile(r"^(\d+(\.\d+)+\b|Schedule\b|Article\b|\([a-z0-9]{1,3}\)\s)")
+STOPWORDS = frozenset(
+    "a an and are as at be by for from has have in is it its of on or that the this to was were will with".split()
+)
+
+
+def tokenize(text):
+    """Lower-case words and rule numbers of a text, without stopwords"""
+    return [t for t in TOKEN_PATTERN.findall(text.lower()) if t not in STOPWORDS]
+
+
+def _file_digest(path):
+    with open(path, "rb") as f:
+        return hashlib.sha1(f.read()).hexdigest()[:12]
+
+
+def _rule_pdfs():
+    """(name, path) of every rules PDF, in file name order"""
+    if not os.path.exists(PDF_DIR):
+        return []
+    return [
+        (name, os.path.join(PDF_DIR, name))
+        for name in sorted(os.listdir(PDF_DIR))
+        if name.startswith(RULE_PDF_PREFIX) and name.lower().endswith(".pdf")
+    ]
+
+
+def _boilerplate_lines(pages):
+    """Lines repeated on most pages (running headers and footers), with digits ignored"""
+    if len(pages) < 3:
+        return set()
+    counts = {}
+    for lines in pages:
+        for key in {re.sub(r"\d+", "#", line) for line in lines if line}:
+            counts[key] = counts.get(key, 0) + 1
+    return {key for key, count in counts.items() if count >= len(pages) / 2}
+
+
+def _page_passages(lines, boilerplate):
+    """Split the lines of one page into passages of PASSAGE_MIN_WORDS..PASSAGE_MAX_WORDS words"""
+    paragraphs, current = [], []
+    for line in lines:
+        if re.sub(r"\d+", "#", line) in boilerplate:
+            continue
+        if not line or PARAGRAPH_START.match(line):
+            if current:
+                paragraphs.append(" ".join(current))
+            current = [line] if line else []
+        else:
+            current.append(line)
+    if current:
+        paragraphs.append(" ".join(current))
+
+    passages, buffer = [], []
+    for paragraph in paragraphs:
+        buffer.extend(paragraph.split())
+        if len(buffer) >= PASSAGE_MIN_WORDS:
+            for start in range(0, len(buffer), PASSAGE_MAX_WORDS):
+                passages.append(" ".join(buffer[start:start + PASSAGE_MAX_WORDS]))
+            buffer = []
+    if buffer:
+        if passages and len(buffer) < PASSAGE_MIN_WORDS:
+            passages[-1] = f"{passages[-1]} {' '.join(buffer)}"
+        else:
+            passages.append(" ".join(buffer))
+    return passages
+
+
+def _write_segment(name, path, segment_dir):
+    """Extract one PDF and write its passages and postings into segment_dir"""
+    reader = PdfReader(path)
+    pages = [[line.strip() for line in (page.extract_text() or "").splitlines()] for page in reader.pages]
+    boilerplate = _boilerplate_lines(pages)
+
+    texts, page_numbers, lengths = [], [], []
+    postings = {}   # term -> {passage: term frequency}
+    for page_number, lines in enumerate(pages, start=1):
+        for text in _page_passages(lines, boilerplate):
+            tokens = tokenize(text)
+            if not tokens:
+                continue
+            passage = len(texts)
+            texts.append(text)
+            page_numbers.append(page_number)
+            lengths.append(len(tokens))
+            for token in tokens:
+                term_postings = postings.setdefault(token, {})
+                term_postings[passage] = term_postings.get(passage, 0) + 1
+
+    terms = sorted(postings)
+    offsets = np.zeros(len(terms) + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum([len(postings[t]) for t in terms])
+    docs = np.fromiter((p for t in terms for p in postings[t]), dtype=np.int32, count=int(offsets[-1]))
+    tfs = np.fromiter((f for t in terms for f in postings[t].values()), dtype=np.int32, count=int(offsets[-1]))
+
+    encoded = [t.encode("utf-8") for t in texts]
+    text_offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    text_offsets[1:] = np.cumsum([len(t) for t in encoded])
+
+    os.makedirs(segment_dir)
+    np.save(os.path.join(segment_dir, "offsets.npy"), offsets)
+    np.save(os.path.join(segment_dir, "docs.npy"), docs)
+    np.save(os.path.join(segment_dir, "tfs.npy"), tfs)
+    np.save(os.path.join(segment_dir, "lengths.npy"), np.array(lengths, dtype=np.int32))
+    np.save(os.path.join(segment_dir, "pages.npy"), np.array(page_numbers, dtype=np.int32))
+    np.save(os.path.join(segment_dir, "text_offsets.npy"), text_offsets)
+    with open(os.path.join(segment_dir, "text.bin"), "wb") as f:
+        f.write(b"".join(encoded))
+    with open(os.path.join(segment_dir, "meta.json"), "w", encoding="utf-8") as f:
+        json.dump({"source": name, "pages": len(pages), "passages": len(texts), "terms": terms}, f)
+
+
+def build_index():
+    """
+    Bring the on-disk index in line with the rules PDFs, re-extracting only new or changed files.
+
+    Returns:
+        dict with "built" and "reused" PDF names
+    """
+    os.makedirs(INDEX_DIR, exist_ok=True)
+    manifest = {}
+    built, reused = [], []
+    for name, path in _rule_pdfs():
+        segment = f"{os.path.splitext(name)[0]}-{_file_digest(path)}"
+        segment_dir = os.path.join(INDEX_DIR, segment)
+        if os.path.exists(os.path.join(segment_dir, "meta.json")):
+            reused.append(name)
+        else:
+            # Build beside the index and rename, so a reader never sees half a segment
+            tmp_dir = f"{segment_dir}.{os.getpid()}.tmp"
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            _write_segment(name, path, tmp_dir)
+            shutil.rmtree(segment_dir, ignore_errors=True)
+            os.replace(tmp_dir, segment_dir)
+            built.append(name)
+        manifest[name] = segment
+
+    manifest_path = os.path.join(INDEX_DIR, "manifest.json")
+    try:
+        with open(manifest_path, encoding="utf-8") as f:
+            previous = json.load(f)
+    except (OSError, ValueError):
+        previous = None
+    if manifest != previous:
+        tmp_path = f"{manifest_path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(manifest, f, indent=2)
+        os.replace(tmp_path, manifest_path)
+
+    # Drop segments of PDFs that were removed or replaced
+    for entry in os.listdir(INDEX_DIR):
+        if entry not in manifest.values() and os.path.isdir(os.path.join(INDEX_DIR, entry)) and not entry.endswith(".tmp"):
+            shutil.rmtree(os.path.join(INDEX_DIR, entry), ignore_errors=True)
+    return {"built": built, "reused": reused}
+
+
+def _pdf_signature():
+    return tuple((name, os.stat(path).st_mtime_ns, os.stat(path).st_size) for name, path in _rule_pdfs())
+
+
+@st.cache_resource(show_spinner=False)
+def _ensure_index(signature):
+    """Run build_index once per PDF folder state; returns the manifest modification time"""
+    build_index()
+    return os.stat(os.path.join(INDEX_DIR, "manifest.json")).st_mtime_ns
+
+
+@st.cache_resource(show_spinner=False)
+def _load_index(manifest_mtime_ns):
+    """Memory-map every segment and compute the collection statistics BM25 needs"""
+    with open(os.path.join(INDEX_DIR, "manifest.json"), encoding="utf-8") as f:
+        manifest = json.load(f)
+
+    segments = []
+    for name, segment in manifest.items():
+        segment_dir = os.path.join(INDEX_DIR, segment)
+        with open(os.path.join(segment_dir, "meta.json"), encoding="utf-8") as f:
+            meta = json.load(f)
+        if not meta["passages"]:
+            continue
+        arrays = {
+            key: np.load(os.path.join(segment_dir, f"{key}.npy"), mmap_mode="r")
+            for key in ("offsets", "docs", "tfs", "lengths", "pages", "text_offsets")
+        }
+        with open(os.path.join(segment_dir, "text.bin"), "rb") as f:
+            text = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        segments.append({
+            "name": name,
+            "vocabulary": {term: i for i, term in enumerate(meta["terms"])},
+            "text": text,
+            **arrays,
+        })
+
+    passage_count = sum(len(s["lengths"]) for s in segments)
+    total_length = sum(int(np.sum(s["lengths"], dtype=np.int64)) for s in segments)
+    return {
+        "segments": segments,
+        "passage_count": passage_count,
+        "average_length": total_length / passage_count if passage_count else 0.0,
+    }
+
+
+def get_rule_index():
+    """Get the memory-mapped index, rebuilding changed segments first; None when there is nothing to search"""
+    signature = _pdf_signature()
+    if not signature:
+        return None
+    try:
+        return _load_index(_ensure_index(signature))
+    except Exception as e:
+        print(f"Error loading rule search index: {e}")
+        return None
+
+
+def _passage_text(segment, passage):
+    start, end = int(segment["text_offsets"][passage]), int(segment["text_offsets"][passage + 1])
+    return segment["text"][start:end].decode("utf-8")
+
+
+def _snippet(text, terms):
+    """About SNIPPET_CHARS characters around the first query term, with the terms in bold (markdown)"""
+    pattern = re.compile(r"\b(" + "|".join(re.escape(t) for t in sorted(terms, key=len, reverse=True)) + r")\b", re.IGNORECASE)
+    match = pattern.search(text)
+    start = max(0, (match.start() if match else 0) - SNIPPET_CHARS // 3)
+    if start:
+        start = text.find(" ", start) + 1
+    snippet = text[start:start + SNIPPET_CHARS]
+    if start + SNIPPET_CHARS < len(text):
+        snippet = snippet[:snippet.rfind(" ")] + " …"
+    if start:
+        snippet = "… " + snippet
+    snippet = re.sub(r"([*_`$#\[\]])", r"\\\1", snippet)
+    return pattern.sub(lambda m: f"**{m.group(0)}**", snippet)
+
+
+def search_rules(query, limit=10):
+    """
+    Rank rule passages for a query with BM25.
+
+    Args:
+        query: Free text, e.g. "arrow touching line" or "4.2.1"
+        limit: Number of results
+
+    Returns:
+        list of {"document", "page", "score", "snippet"} (best first; snippet is markdown)
+    """
+    index = get_rule_index()
+    terms = list(dict.fromkeys(tokenize(query)))
+    if not index or not index["segments"] or not terms:
+        return []
+
+    # Document frequencies over all segments, so scores are comparable between PDFs
+    term_ids = [[s["vocabulary"].get(t) for t in terms] for s in index["segments"]]
+    document_frequency = np.zeros(len(terms))
+    for segment, ids in zip(index["segments"], term_ids):
+        for j, term_id in enumerate(ids):
+            if term_id is not None:
+                document_frequency[j] += segment["offsets"][term_id + 1] - segment["offsets"][term_id]
+    passage_count = index["passage_count"]
+    idf = np.log(1 + (passage_count - document_frequency + 0.5) / (document_frequency + 0.5))
+
+    candidates = []
+    for segment, ids in zip(index["segments"], term_ids):
+        if all(term_id is None for term_id in ids):
+            continue
+        length_norm = K1 * (1 - B + B * segment["lengths"] / index["average_length"])
+        scores = np.zeros(len(segment["lengths"]))
+        for j, term_id in enumerate(ids):
+            if term_id is None:
+                continue
+            start, end = segment["offsets"][term_id], segment["offsets"][term_id + 1]
+            docs = segment["docs"][start:end]
+            tfs = segment["tfs"][start:end].astype(np.float64)
+            scores[docs] += idf[j] * tfs * (K1 + 1) / (tfs + length_norm[docs])
+
+        top = min(limit, int(np.count_nonzero(scores)))
+        for passage in np.argpartition(-scores, top - 1)[:top] if top else []:
+            candidates.append((float(scores[passage]), segment, int(passage)))
+
+    candidates.sort(key=lambda c: c[0], reverse=True)
+    return [
+        {
+            "document": segment["name"],
+            "page": int(segment["pages"][passage]),
+            "score": round(score, 2),
+            "snippet": _snippet(_passage_text(segment, passage), terms),
+        }
+        for score, segment, passage in candidates[:limit]
+    ]
+
+
+if __name__ == "__main__":
+    print("Building rule search index...")
+    result = build_index()
+    print(f"Indexed {len(result['built'])} PDF(s), reused {len(result['reused'])} in {INDEX_DIR}")
@@ -0,0 +1,201 @@
+"""
+Columnar in-memory score cube for the Performance page.
+
+Competition scores for one club competition (or one yearly championship) are
+loaded once through the keyset reader and kept as NumPy arrays: the six arrow
+scores as an (n, 6) int8 matrix plus integer-coded archer / competition / round /
+range / end columns, about 20 bytes per end (~3.5 MB per million arrows).
+Every "View Sum Score" option is a vectorized group-by over the same cube, so
+switching views does not touch the network. Cubes are shared by all sessions,
+kept for SCORE_CUBE_TTL seconds and dropped by invalidate() when scores are saved.
+"""
+from utility_function.participating_reader import iter_participating_chunks
+import streamlit as st
+import numpy as np
+import pandas as pd
+import threading
+import time
+import os
+
+SCORE_CUBE_TTL = int(os.getenv("SCORE_CUBE_TTL", "300"))
+
+ARROW_COLUMNS = [
+    "score_1st_arrow", "score_2nd_arrow", "score_3rd_arrow",
+    "score_4th_arrow", "score_5th_arrow", "score_6th_arrow",
+]
+
+# Columns of the cube that can be filtered on or grouped by
+DIMENSIONS = ("participating_id", "club_competition_id", "round_id", "range_id", "end_order")
+
+
+@st.cache_resource
+def _get_cube_state():
+    """Shared state for every session in this process"""
+    return {
+        "lock": threading.Lock(),
+        "entries": {},   # (club_competition_id, yearly_championship_id) -> {"cube": {...}, "loaded_at": float}
+        "version": 0,
+        "hits": 0,
+        "misses": 0,
+    }
+
+
+def _encode(values):
+    """Integer-code a column: (codes in the smallest int dtype, uniques)"""
+    codes, uniques = pd.factorize(pd.Series(values, dtype="object"), use_na_sentinel=False)
+    dtype = np.int8 if len(uniques) <= np.iinfo(np.int8).max else np.int16 if len(uniques) <= np.iinfo(np.int16).max else np.int32
+    return codes.astype(dtype), np.asarray(uniques, dtype="object")
+
+
+def _load_cube(club_competition_id=None, yearly_championship_id=None):
+    """Read competition scores chunk by chunk straight into column arrays"""
+    select_cols = (
+        "participating_id, event_context_id, type, " + ",".join(ARROW_COLUMNS) + ", "
+        "event_context!inner(club_competition_id,yearly_club_championship_id,round_id,range_id,end_order), "
+        "archer!inner(account!inner(fullname))"
+    )
+
+    def apply_filters(query):
+        query = query.eq("type", "competition")
+        if club_competition_id:
+            query = query.eq("event_context.club_competition_id", club_competition_id)
+        if yearly_championship_id:
+            query = query.eq("event_context.yearly_club_championship_id", yearly_championship_id)
+        return query
+
+    arrow_chunks = []
+    columns = {dim: [] for dim in DIMENSIONS}
+    names = {}
+    for chunk in iter_participating_chunks(select_cols, apply_filters):
+        arrow_chunks.append(np.array(
+            [[r.get(c) or 0 for c in ARROW_COLUMNS] for r in chunk], dtype=np.int8
+        ).reshape(-1, len(ARROW_COLUMNS)))
+        for r in chunk:
+            ctx = r.get("event_context") or {}
+            columns["participating_id"].append(r.get("participating_id"))
+            for dim in DIMENSIONS[1:]:
+                columns[dim].append(ctx.get(dim))
+            account = (r.get("archer") or {}).get("account") or {}
+            names.setdefault(r.get("participating_id"), account.get("fullname"))
+
+    cube = {
+        "arrows": np.concatenate(arrow_chunks) if arrow_chunks else np.zeros((0, len(ARROW_COLUMNS)), dtype=np.int8),
+        "names": names,
+    }
+    for dim in DIMENSIONS:
+        cube[dim + "_codes"], cube[dim + "_values"] = _encode(columns[dim])
+    # End totals are needed by every view, so compute them once (max 6 * 10 fits in int16)
+    cube["end_totals"] = cube["arrows"].sum(axis=1, dtype=np.int16)
+    return cube
+
+
+def get_score_cube(club_competition_id=None, yearly_championship_id=None):
+    """
+    Get the score cube for a club competition or yearly championship, loading it on a miss.
+    One of the ids is required: an unscoped cube would hold every competition score.
+
+    Returns:
+        dict of NumPy arrays (shared between sessions, do not modify):
+        arrows (n, 6) int8, end_totals (n,) int16, "<dimension>_codes" / "<dimension>_values"
+        for each of DIMENSIONS, and names {participating_id: fullname}
+    """
+    if not club_competition_id and not yearly_championship_id:
+        raise ValueError("get_score_cube needs a club competition or yearly championship id")
+    key = (club_competition_id or None, yearly_championship_id or None)
+    state = _get_cube_state()
+    with state["lock"]:
+        entry = state["entries"].get(key)
+        if entry and time.monotonic() - entry["loaded_at"] < SCORE_CUBE_TTL:
+            state["hits"] += 1
+            return entry["cube"]
+        state["misses"] += 1
+        version = state["version"]
+
+    cube = _load_cube(*key)
+
+    with state["lock"]:
+        # Skip storing if scores were saved while we were loading
+        if state["version"] == version:
+            state["entries"][key] = {"cube": cube, "loaded_at": time.monotonic()}
+    return cube
+
+
+def invalidate():
+    """Drop every cached cube so the next read reloads scores"""
+    state = _get_cube_state()
+    with state["lock"]:
+        state["version"] += 1
+        state["entries"].clear()
+
+
+def _mask(cube, filters):
+    """Boolean row mask for {dimension: value} filters (None values are ignored)"""
+    mask = np.ones(len(cube["end_totals"]), dtype=bool)
+    for dim, value in filters.items():
+        if value is None:
+            continue
+        matches = np.flatnonzero(cube[dim + "_values"] == value)
+        if not len(matches):
+            return np.zeros_like(mask)
+        mask &= cube[dim + "_codes"] == matches[0]
+    return mask
+
+
+def group_totals(cube, group_by=None, **filters):
+    """
+    Sum and count end totals per participant (and per group_by value when given).
+
+    Args:
+        cube: Result of get_score_cube
+        group_by: One of DIMENSIONS other than participating_id, or None
+        **filters: {dimension: value} equality filters, e.g. round_id=3
+
+    Returns:
+        DataFrame with columns participating_id, [group_by], sum_score, count
+    """
+    mask = _mask(cube, filters)
+    archer_codes = cube["participating_id_codes"][mask].astype(np.int64)
+    columns = {}
+    if group_by:
+        group_codes = cube[group_by + "_codes"][mask].astype(np.int64)
+        keys = archer_codes * len(cube[group_by + "_values"]) + group_codes
+    else:
+        keys = archer_codes
+
+    unique_keys, inverse = np.unique(keys, return_inverse=True)
+    sums = np.bincount(inverse, weights=cube["end_totals"][mask], minlength=len(unique_keys))
+    counts = np.bincount(inverse, minlength=len(unique_keys))
+
+    if group_by:
+        width = len(cube[group_by + "_values"])
+        columns["participating_id"] = cube["participating_id_values"][unique_keys // width]
+        columns[group_by] = cube[group_by + "_values"][unique_keys % width]
+    else:
+        columns["participating_id"] = cube["participating_id_values"][unique_keys]
+    columns["sum_score"] = sums.astype(np.int64)
+    columns["count"] = counts
+    return pd.DataFrame(columns)
+
+
+def get_cube_stats():
+    """
+    Get hit/miss counters and the size of each cached cube.
+
+    Returns:
+        dict with hits, misses, version and cubes: [{"club_competition_id", "yearly_championship_id",
+        "rows", "bytes", "age_seconds"}]
+    """
+    state = _get_cube_state()
+    now = time.monotonic()
+    with state["lock"]:
+        cubes = []
+        for (club_competition_id, yearly_championship_id), entry in state["entries"].items():
+            cube = entry["cube"]
+            cubes.append({
+                "club_competition_id": club_competition_id,
+                "yearly_championship_id": yearly_championship_id,
+                "rows": len(cube["end_totals"]),
+                "bytes": sum(v.nbytes for v in cube.values() if isinstance(v, np.ndarray)),
+                "age_seconds": round(now - entry["loaded_at"], 1),
+            })
+        return {"hits": state["hits"], "misses": state["misses"], "version": state["version"], "cubes": cubes}
@@ -1,4 +1,6 @@
 from utility_function.initilize_dbconnection import supabase
+from utility_function.participating_reader import iter_participating_chunks
+from utility_function import score_cube
 import streamlit as st
 import pandas as pd
 
@@ -55,35 +57,41 @@ def get_recorder_scores(club_competition_id, round_id=None, range_id=None, parti
     """
     try:
         # Build query with joins
-        query = supabase.table("participating").select(
-            "*, event_context!inner(club_competition_id, round_id, end_order, range_id), archer!inner(account!inner(fullname))"
-        ).eq(
-            "event_context.club_competition_id", club_competition_id
-        ).eq(
-            "type", "competition"
-        )
-        
-        # Add optional filters
-        if round_id:
-            query = query.eq("event_context.round_id", round_id)
-        if range_id:
-            query = query.eq("event_context.range_id", range_id)
-        if participating_id:
-            query = query.eq("participating_id", participating_id)
-        
-        response = query.execute()
-        
-        return response.data if response.data else []
+        def apply_filters(query):
+            query = query.eq(
+                "event_context.club_competition_id", club_competition_id
+            ).eq(
+                "type", "competition"
+            )
+            
+            # Add optional filters
+            if round_id:
+                query = query.eq("event_context.round_id", round_id)
+            if range_id:
+                query = query.eq("event_context.range_id", range_id)
+            if participating_id:
+                query = query.eq("participating_id", participating_id)
+            return query
+        
+        # Page through by primary key so large competitions are not truncated at max-rows
+        return [
+            row
+            for chunk in iter_participating_chunks(
+                "*, event_context!inner(club_competition_id, round_id, end_order, range_id), archer!inner(account!inner(fullname))",
+                apply_filters
+            )
+            for row in chunk
+        ]
     except Exception as e:
         st.error(f"Error fetching recorder scores: {str(e)}")
         return []
 
-def update_participating_scores(updates: list[dict]) -> bool:
+def update_participating_scores(updates: list[dict]) -> dict:
     """
-    Update participating scores in the database
+    Update participating scores in the database with a single bulk call
     
     Args:
-        updates: List of dictionaries with updated participating records
+        updates: List of dictionaries with updated participating records (only the rows that changed)
         example:
         [
             {
@@ -96,51 +104,59 @@ def update_participating_scores(updates: list[dict]) -> bool:
                 'score_6th_arrow': 10,
                 'status': 'verified'  # Optional, only for recorder updates
     Returns:
-        Boolean indicating success
+        Dict with overall success and per-row results in the same order as updates:
+        {"success": bool, "updated_count": int,
+         "results": [{"participating_id", "event_context_id", "type", "success", "error"}]}
     """
+    if not updates:
+        return {"success": True, "updated_count": 0, "results": []}
+    
+    # Plain Python values so the payload is JSON serializable (DataFrame rows hold numpy types)
+    rows = []
+    for update in updates:
+        row = {
+            'participating_id': int(update['participating_id']),
+            'event_context_id': int(update['event_context_id']),
+            'type': str(update['type'])
+        }
+        for field in ['score_1st_arrow', 'score_2nd_arrow', 'score_3rd_arrow',
+                      'score_4th_arrow', 'score_5th_arrow', 'score_6th_arrow']:
+            row[field] = int(update.get(field) or 0)
+        if 'status' in update:
+            row['status'] = str(update['status'])
+        rows.append(row)
+    
     try:
-        for update in updates:
-            # Calculate sum_score
-            sum_score = (
-                update.get('score_1st_arrow', 0) +
-                update.get('score_2nd_arrow', 0) +
-                update.get('score_3rd_arrow', 0) +
-                update.get('score_4th_arrow', 0) +
-                update.get('score_5th_arrow', 0) +
-                update.get('score_6th_arrow', 0)
-            )
-            
-            # Prepare update data
-            update_data = {
-                'score_1st_arrow': update.get('score_1st_arrow'),
-                'score_2nd_arrow': update.get('score_2nd_arrow'),
-                'score_3rd_arrow': update.get('score_3rd_arrow'),
-                'score_4th_arrow': update.get('score_4th_arrow'),
-                'score_5th_arrow': update.get('score_5th_arrow'),
-                'score_6th_arrow': update.get('score_6th_arrow'),
-                'sum_score': sum_score,
-                'updated_at': 'now()'
-            }
-            
-            # Add status if it's a recorder update
-            if 'status' in update:
-                update_data['status'] = update['status']
-            
-            # Update the record
-            supabase.table("participating").update(
-                update_data
-            ).eq(
-                "participating_id", update['participating_id']
-            ).eq(
-                "event_context_id", update['event_context_id']
-            ).eq(
-                "type", update['type']
-            ).execute()
-        
-        return True
+        # sum_score is recomputed by the update_participating_scores SQL function
+        response = supabase.rpc("update_participating_scores", {"p_updates": rows}).execute()
+        updated_keys = {
+            (r['participating_id'], r['event_context_id'], r['type']) for r in (response.data or [])
+        }
+        error = None
+        if updated_keys:
+            # Performance views read cached score cubes; drop them so new scores show up
+            score_cube.invalidate()
     except Exception as e:
         st.error(f"Error updating scores: {str(e)}")
-        return False
+        updated_keys = set()
+        error = str(e)
+    
+    results = []
+    for row in rows:
+        ok = (row['participating_id'], row['event_context_id'], row['type']) in updated_keys
+        results.append({
+            'participating_id': row['participating_id'],
+            'event_context_id': row['event_context_id'],
+            'type': row['type'],
+            'success': ok,
+            'error': None if ok else (error or "Score record not found")
+        })
+    
+    return {
+        "success": all(r['success'] for r in results),
+        "updated_count": len(updated_keys),
+        "results": results
+    }
 
 def format_participating_data_for_display(records, include_archer_name=False):
     """
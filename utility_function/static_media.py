@@ -0,0 +1,293 @@
+"""
+Static media for the home page.
+
+Posters are converted once per process (and again only when a file in posters/
+changes) into resized JPEG variants and small thumbnails under static/posters/.
+Documentation PDFs are linked into static/pdfs/, and page-range previews are cut
+from a memory-mapped copy of each PDF that is opened once per process (and
+remapped when the file changes). At most PDF_PREVIEW_MAX_FILES previews are
+kept; the least recently used ones are removed.
+Streamlit serves static/ at app/static/ (server.enableStaticServing in
+.streamlit/config.toml), so pages reference files by URL and browsers download
+and cache each one once instead of receiving base64 data URLs on every rerun.
+"""
+from PIL import Image, ImageOps
+from pypdf import PdfReader, PdfWriter
+from urllib.parse import quote
+import streamlit as st
+import threading
+import hashlib
+import shutil
+import mmap
+import time
+import os
+
+APP_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+STATIC_DIR = os.path.join(APP_ROOT, "static")
+STATIC_URL = "app/static"
+
+POSTER_DIR = os.path.join(APP_ROOT, "posters")
+POSTER_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.gif', '.webp')
+POSTER_MAX_SIZE = (1280, 1280)
+THUMBNAIL_SIZE = (160, 120)
+
+PDF_DIR = os.path.join(APP_ROOT, "pdfs")
+PDF_PREVIEW_MAX_FILES = int(os.getenv("PDF_PREVIEW_MAX_FILES", "200"))
+
+
+def _folder_signature(folder, extensions):
+    """(name, mtime, size) of every matching file, so edits to the folder change the cache key"""
+    if not os.path.exists(folder):
+        return ()
+    return tuple(
+        (entry.name, entry.stat().st_mtime_ns, entry.stat().st_size)
+        for entry in sorted(os.scandir(folder), key=lambda e: e.name)
+        if entry.is_file() and entry.name.lower().endswith(extensions)
+    )
+
+
+def _file_digest(path):
+    with open(path, "rb") as f:
+        return hashlib.sha1(f.read()).hexdigest()[:12]
+
+
+def _remove_stale(folder, keep):
+    for fn in os.listdir(folder):
+        path = os.path.join(folder, fn)
+        if fn not in keep and os.path.isfile(path) and not fn.endswith(".tmp"):
+            os.remove(path)
+
+
+def _save_jpeg(image, path, quality):
+    """Write atomically so concurrent sessions never serve a half-written file"""
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    image.save(tmp_path, "JPEG", quality=quality, optimize=True, progressive=True)
+    os.replace(tmp_path, path)
+
+
+def _to_rgb(image):
+    """Flatten transparency onto white, since JPEG has no alpha channel"""
+    image = ImageOps.exif_transpose(image)
+    if image.mode in ("RGBA", "LA", "P"):
+        image = image.convert("RGBA")
+        background = Image.new("RGB", image.size, "white")
+        background.paste(image, mask=image.getchannel("A"))
+        return background
+    return image.convert("RGB")
+
+
+@st.cache_resource(show_spinner=False)
+def _build_poster_variants(signature):
+    """Create the poster and thumbnail files for a folder signature; returns their URLs"""
+    out_dir = os.path.join(STATIC_DIR, "posters")
+    os.makedirs(out_dir, exist_ok=True)
+
+    posters = []
+    keep = set()
+    for name, _, _ in signature:
+        path = os.path.join(POSTER_DIR, name)
+        digest = _file_digest(path)
+        # Content hash in the file name: a changed poster gets a new URL, so browsers can cache forever
+        stem = f"{os.path.splitext(name)[0]}-{digest}"
+        poster_name, thumb_name = f"{stem}.jpg", f"{stem}-thumb.jpg"
+        keep.update((poster_name, thumb_name))
+
+        if not (os.path.exists(os.path.join(out_dir, poster_name)) and os.path.exists(os.path.join(out_dir, thumb_name))):
+            with Image.open(path) as img:
+                img = _to_rgb(img)
+                poster = img.copy()
+                poster.thumbnail(POSTER_MAX_SIZE)
+                _save_jpeg(poster, os.path.join(out_dir, poster_name), quality=82)
+                _save_jpeg(ImageOps.fit(img, THUMBNAIL_SIZE), os.path.join(out_dir, thumb_name), quality=75)
+
+        posters.append({
+            "url": f"{STATIC_URL}/posters/{poster_name}",
+            "thumbnail_url": f"{STATIC_URL}/posters/{thumb_name}",
+        })
+
+    # Drop variants of posters that were removed or replaced
+    _remove_stale(out_dir, keep)
+    return posters
+
+
+def get_poster_urls():
+    """
+    Get static URLs of the home page posters, processing new or changed files first.
+
+    Returns:
+        list of {"url": resized poster, "thumbnail_url": thumbnail} in file name order
+    """
+    signature = _folder_signature(POSTER_DIR, POSTER_EXTENSIONS)
+    if not signature:
+        return []
+    try:
+        return _build_poster_variants(signature)
+    except Exception as e:
+        print(f"Error processing posters: {e}")
+        return []
+
+
+@st.cache_resource(show_spinner=False)
+def _publish_pdfs(signature):
+    """Hard-link (or copy) each PDF into static/pdfs/ under a content-hashed name"""
+    out_dir = os.path.join(STATIC_DIR, "pdfs")
+    os.makedirs(out_dir, exist_ok=True)
+
+    documents = []
+    keep = set()
+    for name, mtime_ns, size in signature:
+        path = os.path.join(PDF_DIR, name)
+        static_name = f"{os.path.splitext(name)[0]}-{_file_digest(path)}.pdf"
+        static_path = os.path.join(out_dir, static_name)
+        keep.add(static_name)
+        if not os.path.exists(static_path):
+            tmp_path = f"{static_path}.{os.getpid()}.tmp"
+            try:
+                os.link(path, tmp_path)
+            except OSError:
+                shutil.copyfile(path, tmp_path)
+            os.replace(tmp_path, static_path)
+
+        documents.append({
+            "name": name,
+            "path": path,
+            "static_name": static_name,
+            "url": f"{STATIC_URL}/pdfs/{quote(static_name)}",
+            "size": size,
+            "mtime_ns": mtime_ns,
+        })
+
+    _remove_stale(out_dir, keep)
+    _release_pdfs({document["path"] for document in documents})
+    preview_dir = os.path.join(out_dir, "previews")
+    if os.path.isdir(preview_dir):
+        stems = tuple(f"{os.path.splitext(n)[0]}-p" for n in keep)
+        _remove_stale(preview_dir, {fn for fn in os.listdir(preview_dir) if fn.startswith(stems)})
+    return documents
+
+
+def get_pdf_documents():
+    """
+    Get the documentation PDFs, published for static serving.
+
+    Returns:
+        list of {"name", "url", "size", ...} in file name order (no PDF bytes are read by the page)
+    """
+    signature = _folder_signature(PDF_DIR, (".pdf",))
+    if not signature:
+        _release_pdfs(set())
+        return []
+    try:
+        return _publish_pdfs(signature)
+    except Exception as e:
+        print(f"Error publishing PDFs: {e}")
+        return []
+
+
+@st.cache_resource
+def _get_pdf_state():
+    """Open PDF mappings shared by every session in this process"""
+    return {"lock": threading.Lock(), "open": {}}   # path -> {"mtime_ns", "mapped", "reader", "lock"}
+
+
+def _close_pdf(pdf):
+    """Unmap a replaced PDF once no session is reading it"""
+    with pdf["lock"]:
+        pdf["mapped"].close()
+
+
+def _release_pdfs(keep_paths):
+    """Unmap PDFs that were removed from the pdfs folder"""
+    state = _get_pdf_state()
+    with state["lock"]:
+        released = [state["open"].pop(path) for path in list(state["open"]) if path not in keep_paths]
+    for pdf in released:
+        _close_pdf(pdf)
+
+
+def _open_pdf(path, mtime_ns):
+    """
+    Memory-map a PDF once per process; the OS pages in only what is read.
+    A changed file (new mtime_ns) is remapped and its old mapping released.
+    """
+    state = _get_pdf_state()
+    with state["lock"]:
+        pdf = state["open"].get(path)
+        # A session still holding an older document dict keeps using the newer mapping
+        if pdf is not None and pdf["mtime_ns"] >= mtime_ns:
+            return pdf
+        with open(path, "rb") as f:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        state["open"][path] = {"mtime_ns": mtime_ns, "mapped": mapped, "reader": PdfReader(mapped), "lock": threading.Lock()}
+        stale, pdf = pdf, state["open"][path]
+    if stale is not None:
+        _close_pdf(stale)
+    return pdf
+
+
+def _read_pdf(document, read):
+    """
+    Call read(reader) for a document from get_pdf_documents. The reader seeks in the shared
+    mapping, so one session at a time; if the mapping was replaced meanwhile, use the new one.
+    """
+    while True:
+        pdf = _open_pdf(document["path"], document["mtime_ns"])
+        with pdf["lock"]:
+            if not pdf["mapped"].closed:
+                return read(pdf["reader"])
+
+
+def _evict_previews(preview_dir):
+    """Remove the least recently used previews beyond PDF_PREVIEW_MAX_FILES (by access time)"""
+    previews = []
+    for entry in os.scandir(preview_dir):
+        if entry.is_file() and entry.name.endswith(".pdf"):
+            try:
+                previews.append((entry.stat().st_atime, entry.path))
+            except FileNotFoundError:
+                continue
+    previews.sort()
+    for _, path in previews[:max(0, len(previews) - PDF_PREVIEW_MAX_FILES)]:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+def get_pdf_page_count(document):
+    """Number of pages of a document from get_pdf_documents"""
+    return _read_pdf(document, lambda reader: len(reader.pages))
+
+
+def get_pdf_preview_url(document, first_page, last_page):
+    """
+    Get a static URL for a PDF containing only pages first_page..last_page (1-based, inclusive).
+    Previews are written once and reused by every session; the least recently used ones are
+    removed beyond PDF_PREVIEW_MAX_FILES.
+    """
+    out_dir = os.path.join(STATIC_DIR, "pdfs", "previews")
+    preview_name = f"{os.path.splitext(document['static_name'])[0]}-p{first_page}-{last_page}.pdf"
+    preview_path = os.path.join(out_dir, preview_name)
+
+    try:
+        # Mark an existing preview as used (access time is not updated reliably on relatime/noatime mounts)
+        os.utime(preview_path, (time.time(), os.stat(preview_path).st_mtime))
+        return f"{STATIC_URL}/pdfs/previews/{quote(preview_name)}"
+    except FileNotFoundError:
+        pass
+
+    os.makedirs(out_dir, exist_ok=True)
+    tmp_path = f"{preview_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+
+    def write_preview(reader):
+        writer = PdfWriter()
+        for index in range(first_page - 1, last_page):
+            writer.add_page(reader.pages[index])
+        with open(tmp_path, "wb") as f:
+            writer.write(f)
+
+    _read_pdf(document, write_preview)
+    os.replace(tmp_path, preview_path)
+    _evict_previews(out_dir)
+
+    return f"{STATIC_URL}/pdfs/previews/{quote(preview_name)}"